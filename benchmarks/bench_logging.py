@@ -0,0 +1,108 @@
+"""
+Задержка /health при синхронной записи логов в event loop и при записи через
+очередь с фоновым потоком (settings.log_queue_enabled).
+
+    python -m benchmarks.bench_logging --requests 5000 --concurrency 50
+
+Чтобы ротация файлов (самая дорогая часть) случалась чаще, --max-bytes уменьшает
+maxBytes у RotatingFileHandler. stdout консольного handler'а уходит в /dev/null.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from typing import List
+
+from httpx import ASGITransport, AsyncClient
+
+from src.infrastructure.config import settings
+from src.infrastructure.logging_config.logging_config import setup_logging
+from src.infrastructure.logging_config.queue_logging import queue_logging
+
+MODES = {
+    # как было: handler'ы пишут файл прямо в event loop, каждая проба в логе
+    "direct": {"queue": False, "sampling": False},
+    "queue": {"queue": True, "sampling": False},
+    "queue+sampling": {"queue": True, "sampling": True},
+}
+
+
+def configure(mode: str, log_dir: str, max_bytes: int) -> None:
+    settings.log_queue_enabled = MODES[mode]["queue"]
+    setup_logging(log_dir=log_dir)
+    if not MODES[mode]["sampling"]:
+        logging.getLogger("my_app.health").filters.clear()
+    for handler in logging.getLogger("my_app").handlers + [
+        handler for listener in queue_logging.listeners for handler in listener.handlers
+    ]:
+        if isinstance(handler, RotatingFileHandler):
+            handler.maxBytes = max_bytes
+
+
+def percentile(latencies: List[float], q: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+
+async def measure(requests: int, concurrency: int) -> dict:
+    from src.presentation.api.app import create_app
+
+    app = create_app()
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            for _ in remaining:
+                t0 = time.perf_counter()
+                response = await client.get("/health")
+                latencies.append(time.perf_counter() - t0)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "p999_ms": percentile(latencies, 0.999),
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--max-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--mode", choices=list(MODES), action="append")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            for mode in args.mode or list(MODES):
+                with tempfile.TemporaryDirectory() as log_dir:
+                    configure(mode, log_dir, args.max_bytes)
+                    results[mode] = await measure(args.requests, args.concurrency)
+                    queue_logging.stop()
+        finally:
+            sys.stdout = out
+
+    print(f"requests: {args.requests}, concurrency: {args.concurrency}, maxBytes: {args.max_bytes}")
+    for mode, result in results.items():
+        print(
+            f"{mode:<15} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:.2f} ms  "
+            f"p99 {result['p99_ms']:.2f} ms  p99.9 {result['p999_ms']:.2f} ms  max {result['max_ms']:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Сравнение старого пути сериализации списков (CommentResponse на строку +
+валидация response_model в FastAPI) с FieldPlan + orjson.
+
+    python -m benchmarks.bench_serialization --rows 1000 --requests 300
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.domain.entities.comment import Comment
+from src.presentation.api.dependencies import get_get_all_comments_use_case
+from src.presentation.api.routes.comments import router as comments_router
+from src.presentation.schemas.comment_schemas import CommentResponse
+
+
+def make_comments(rows: int) -> List[Comment]:
+    base = datetime(2024, 1, 1, 12, 0, 0, 123456)
+    return [
+        Comment(
+            id=i,
+            user_id=i % 97 + 1,
+            comment=f"comment number {i} with some typical text payload",
+            created_at=base + timedelta(seconds=i),
+            updated_at=base + timedelta(seconds=i, microseconds=500),
+        )
+        for i in range(1, rows + 1)
+    ]
+
+
+class StaticUseCase:
+    def __init__(self, comments: List[Comment]):
+        self.comments = comments
+
+    async def execute(self, limit: int = 100, offset: int = 0, after_id=None) -> List[Comment]:
+        return self.comments
+
+
+def build_legacy_app(use_case: StaticUseCase) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/comments/", response_model=List[CommentResponse])
+    async def get_all_comments(use_case: StaticUseCase = Depends(lambda: use_case)):
+        comments = await use_case.execute()
+        return [
+            CommentResponse(
+                id=comment.id,
+                user_id=comment.user_id,
+                comment=comment.comment,
+                created_at=comment.created_at,
+                updated_at=comment.updated_at,
+            )
+            for comment in comments
+        ]
+
+    return app
+
+
+def build_fast_app(use_case: StaticUseCase) -> FastAPI:
+    app = FastAPI()
+    app.include_router(comments_router)
+    app.dependency_overrides[get_get_all_comments_use_case] = lambda: use_case
+    return app
+
+
+async def measure(app: FastAPI, requests: int, limit: int) -> dict:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        first = await client.get("/comments/", params={"limit": limit})
+        first.raise_for_status()
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            response = await client.get("/comments/", params={"limit": limit})
+            latencies.append(time.perf_counter() - t0)
+            response.raise_for_status()
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "body": first.json(),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    use_case = StaticUseCase(make_comments(args.rows))
+    legacy = await measure(build_legacy_app(use_case), args.requests, args.rows)
+    fast = await measure(build_fast_app(use_case), args.requests, args.rows)
+
+    assert legacy["body"] == fast["body"], "fast renderer output differs from response_model output"
+
+    print(f"rows per response: {args.rows}, requests: {args.requests}")
+    for name, result in (("pydantic", legacy), ("fieldplan", fast)):
+        print(f"{name:<10} {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms")
+    print(f"speedup: {fast['rps'] / legacy['rps']:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Бенчмарки репозиториев, use case'ов и сериализации на локальном Postgres.
+
+    python -m benchmarks.suite --dataset 10k                 # прогон и сравнение с baseline
+    python -m benchmarks.suite --dataset 10k --save          # записать baseline
+    python -m benchmarks.suite --dataset 1m -k repo.comments # только бенчмарки с подстрокой в имени
+
+Baseline - benchmarks/baselines/<набор>.json; он привязан к машине, поэтому в git не хранится.
+Если ops/sec упал или p50 вырос больше чем на --threshold, код выхода 1.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.suite import dataset
+from benchmarks.suite.cases import build_cases
+from benchmarks.suite.harness import compare, load_baseline, measure, save_baseline
+
+BASELINES = Path(__file__).resolve().parent.parent / "baselines"
+
+
+async def run(args: argparse.Namespace) -> int:
+    size = await dataset.prepare(args.dataset)
+
+    # приложение импортируется после переключения settings.database_name на БД набора
+    from src.infrastructure.database.connection import db_connection
+    from src.infrastructure.repositories.postgres_comm_repository import PostgresCommentRepository
+
+    await db_connection.connect()
+    try:
+        page = await PostgresCommentRepository(db_connection).get_all(limit=1000)
+        cases = build_cases(size, lambda: dataset.restore(args.dataset), page)
+        results = {}
+        for case in cases:
+            if args.filter and not any(pattern in case.name for pattern in args.filter):
+                continue
+            result = results[case.name] = await measure(
+                case, warmup=args.warmup, min_ops=args.min_ops, max_ops=args.max_ops, min_time=args.min_time
+            )
+            print(
+                f"{case.name:<42} {result['ops_per_sec']:>10.1f} ops/s  p50 {result['p50_ms']:>8.3f} ms  "
+                f"p95 {result['p95_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms"
+            )
+    finally:
+        await db_connection.disconnect()
+
+    baseline_path = Path(args.baseline) if args.baseline else BASELINES / f"{args.dataset}.json"
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    if args.save:
+        baseline = load_baseline(baseline_path) if args.filter else None
+        # при --filter остальные бенчмарки в baseline сохраняются как были
+        merged = {**(baseline or {}).get("results", {}), **results}
+        save_baseline(baseline_path, args.dataset, merged)
+        print(f"\nbaseline saved: {baseline_path}")
+        return 0
+
+    baseline = load_baseline(baseline_path)
+    if baseline is None:
+        print(f"\nno baseline at {baseline_path}, run with --save to create one")
+        return 0
+    regressions = compare(baseline["results"], results, args.threshold)
+    print(f"\nbaseline: {baseline_path} ({baseline['environment']['commit']}, {baseline['environment']['created_at']})")
+    if not regressions:
+        print(f"no regressions over {args.threshold:.0%}")
+        return 0
+    print(f"{len(regressions)} regression(s) over {args.threshold:.0%}:")
+    for item in regressions:
+        print(
+            f"  {item['name']:<42} {item['metric']:<12} {item['baseline']:>10.3f} -> "
+            f"{item['current']:>10.3f} ({item['change']:+.1%})"
+        )
+    return 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument("--dataset", choices=list(dataset.DATASETS), default="10k")
+    parser.add_argument("-k", "--filter", action="append", help="substring of benchmark names to run")
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--baseline", help="baseline path (default: benchmarks/baselines/<dataset>.json)")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown, 0.15 = 15%%")
+    parser.add_argument("--output", help="also write raw results to this JSON file")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--min-ops", type=int, default=20)
+    parser.add_argument("--max-ops", type=int, default=2000)
+    parser.add_argument("--min-time", type=float, default=1.0)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Бенчмарки трёх уровней:
+- repo.*      - методы Postgres-репозиториев напрямую, без кеша и батчинга;
+- use_case.*  - use case'ы, собранные как в API (dependencies: кеш + батчинг);
+- render.*    - сущности -> FieldPlan -> JSON-тело ответа, без БД в измеряемой части.
+Идентификаторы выбираются из seeded Random, так что прогоны сравнимы между собой.
+"""
+import itertools
+import random
+from typing import Any, AsyncIterator, Callable, List
+
+from src.domain.entities.comment import Comment
+from src.domain.entities.user import User
+from src.infrastructure.database.connection import db_connection
+from src.infrastructure.repositories.postgres_comm_repository import PostgresCommentRepository
+from src.infrastructure.repositories.postgres_user_repository import PostgresUserRepository
+from src.presentation.api import dependencies
+from src.presentation.api.renderers import FieldPlan, dumps, render_entities, render_entity
+from src.presentation.schemas.comment_schemas import CommentResponse
+from src.presentation.schemas.user_schemas import UserResponse
+
+from benchmarks.suite.harness import Case
+
+COMMENT_FIELDS = FieldPlan(CommentResponse)
+USER_FIELDS = FieldPlan(UserResponse)
+
+
+async def _drain(stream: AsyncIterator[bytes]) -> int:
+    size = 0
+    async for chunk in stream:
+        size += len(chunk)
+    return size
+
+
+def build_cases(size: dict, restore: Callable[[], Any], page: List[Comment]) -> List[Case]:
+    users, comments = size["users"], size["comments"]
+    rng = random.Random(42)
+    unique = itertools.count()
+    user_repo = PostgresUserRepository(db_connection)
+    comment_repo = PostgresCommentRepository(db_connection)
+
+    def user_id() -> int:
+        return rng.randint(1, users)
+
+    def comment_id() -> int:
+        return rng.randint(1, comments)
+
+    def new_user() -> User:
+        n = next(unique)
+        return User(id=None, email=f"bench{n}@new.example.com", name=f"Bench {n}")
+
+    async def created_user() -> int:
+        return (await user_repo.create(new_user())).id
+
+    async def created_comment() -> int:
+        return (await comment_repo.create(Comment(id=None, user_id=user_id(), comment="to delete"))).id
+
+    async def created_comments() -> List[int]:
+        created = await comment_repo.create_many([Comment(id=None, user_id=user_id(), comment="to delete") for _ in range(100)])
+        return [comment.id for comment in created]
+
+    async def own_comment() -> Comment:
+        # комментарий i принадлежит пользователю i % users + 1 (см. dataset)
+        cid = comment_id()
+        return Comment(id=cid, user_id=cid % users + 1, comment=f"comment number {cid} with some typical text payload")
+
+    async def clear_caches() -> None:
+        dependencies.user_cache.clear()
+        dependencies.comment_cache.clear()
+
+    def case(name: str, run, setup=None, writes: bool = False) -> Case:
+        return Case(name, run, setup=setup, teardown=restore if writes else None)
+
+    cases = [
+        # репозиторий пользователей
+        case("repo.users.get_by_id", lambda _: user_repo.get_by_id(user_id())),
+        case("repo.users.get_many[100]", lambda _: user_repo.get_many([user_id() for _ in range(100)])),
+        case("repo.users.get_by_email", lambda _: user_repo.get_by_email(f"user{user_id()}@bench.example.com")),
+        case("repo.users.get_existing_ids[100]", lambda _: user_repo.get_existing_ids([user_id() for _ in range(100)])),
+        case(
+            "repo.users.get_existing_emails[100]",
+            lambda _: user_repo.get_existing_emails([f"user{user_id()}@bench.example.com" for _ in range(100)]),
+        ),
+        case("repo.users.get_all[100]", lambda _: user_repo.get_all(limit=100)),
+        case("repo.users.get_all_offset[100]", lambda _: user_repo.get_all(limit=100, offset=users // 2)),
+        case("repo.users.get_all_after[100]", lambda _: user_repo.get_all(limit=100, after_id=users // 2)),
+        case("repo.users.count.exact", lambda _: user_repo.count("exact")),
+        case("repo.users.count.estimated", lambda _: user_repo.count("estimated")),
+        case("repo.users.create", lambda _: user_repo.create(new_user()), writes=True),
+        case("repo.users.create_many[100]", lambda _: user_repo.create_many([new_user() for _ in range(100)]), writes=True),
+        case(
+            "repo.users.update",
+            lambda uid: user_repo.update(User(id=uid, email=f"user{uid}@bench.example.com", name=f"User {uid}")),
+            setup=lambda: _value(user_id()),
+        ),
+        case(
+            "repo.users.update_fields",
+            lambda uid: user_repo.update_fields(uid, name=f"User {uid}"),
+            setup=lambda: _value(user_id()),
+        ),
+        case("repo.users.delete", user_repo.delete, setup=created_user, writes=True),
+        case("repo.users.export.ndjson", lambda _: _drain(user_repo.export("ndjson"))),
+        # репозиторий комментариев
+        case("repo.comments.get_by_id", lambda _: comment_repo.get_by_id(comment_id())),
+        case("repo.comments.get_many[100]", lambda _: comment_repo.get_many([comment_id() for _ in range(100)])),
+        case("repo.comments.get_all[100]", lambda _: comment_repo.get_all(limit=100)),
+        case("repo.comments.get_all[1000]", lambda _: comment_repo.get_all(limit=1000)),
+        case("repo.comments.get_all_offset[100]", lambda _: comment_repo.get_all(limit=100, offset=comments // 2)),
+        case("repo.comments.get_all_after[100]", lambda _: comment_repo.get_all(limit=100, after_id=comments // 2)),
+        case("repo.comments.get_by_user_id[100]", lambda _: comment_repo.get_by_user_id(user_id(), limit=100)),
+        case(
+            "repo.comments.get_by_user_id_after[100]",
+            lambda _: comment_repo.get_by_user_id(user_id(), limit=100, after_id=comments // 2),
+        ),
+        case("repo.comments.count.exact", lambda _: comment_repo.count("exact")),
+        case("repo.comments.count.estimated", lambda _: comment_repo.count("estimated")),
+        case("repo.comments.count.capped", lambda _: comment_repo.count("capped", cap=10000)),
+        case("repo.comments.count.by_user.exact", lambda _: comment_repo.count("exact", user_id=user_id())),
+        case("repo.comments.count.by_user.estimated", lambda _: comment_repo.count("estimated", user_id=user_id())),
+        # слово из каждого комментария - худший случай, ранжируются search_max_candidates строк
+        case("repo.comments.search[common]", lambda _: comment_repo.search("typical", limit=20)),
+        case("repo.comments.search[rare]", lambda _: comment_repo.search(f"number {comment_id()}", limit=20)),
+        case("repo.comments.search.by_user", lambda _: comment_repo.search("payload", user_id=user_id(), limit=20)),
+        case("repo.comments.user_stats", lambda _: comment_repo.get_user_stats(user_id())),
+        case("repo.comments.activity[day]", lambda _: comment_repo.get_activity("day")),
+        case("repo.comments.activity[month].by_user", lambda _: comment_repo.get_activity("month", user_id=user_id())),
+        case("repo.comments.create", lambda _: comment_repo.create(Comment(id=None, user_id=user_id(), comment="new")), writes=True),
+        case(
+            "repo.comments.create_many[100]",
+            lambda _: comment_repo.create_many([Comment(id=None, user_id=user_id(), comment="new") for _ in range(100)]),
+            writes=True,
+        ),
+        case("repo.comments.update", comment_repo.update, setup=own_comment),
+        case(
+            "repo.comments.update_owned",
+            lambda c: comment_repo.update_owned(c.id, c.user_id, c.comment),
+            setup=own_comment,
+        ),
+        case("repo.comments.delete", comment_repo.delete, setup=created_comment, writes=True),
+        case("repo.comments.delete_many[100]", comment_repo.delete_many, setup=created_comments, writes=True),
+        case("repo.comments.export.csv[user]", lambda _: _drain(comment_repo.export("csv", user_id=user_id()))),
+        # use case'ы в сборке API; кеш чистится перед каждым прогоном, иначе меряется только LRU
+        case(
+            "use_case.users.create",
+            lambda _: dependencies.get_create_user_use_case().execute(*_email_name(next(unique))),
+            writes=True,
+        ),
+        case(
+            "use_case.users.bulk_create[100]",
+            lambda _: dependencies.get_bulk_create_users_use_case().execute(
+                [(i, *_email_name(next(unique))) for i in range(100)]
+            ),
+            writes=True,
+        ),
+        case("use_case.users.get", lambda _: dependencies.get_get_user_use_case().execute(user_id()), setup=clear_caches),
+        case("use_case.users.get_all[100]", lambda _: dependencies.get_get_all_users_use_case().execute(limit=100)),
+        case(
+            "use_case.users.update",
+            lambda uid: dependencies.get_update_user_use_case().execute(uid, name=f"User {uid}"),
+            setup=lambda: _value(user_id()),
+        ),
+        case(
+            "use_case.users.delete",
+            lambda uid: dependencies.get_delete_user_use_case().execute(uid),
+            setup=created_user,
+            writes=True,
+        ),
+        case(
+            "use_case.comments.create",
+            lambda _: dependencies.get_create_comment_use_case().execute(user_id(), "new"),
+            writes=True,
+        ),
+        case(
+            "use_case.comments.bulk_create[100]",
+            lambda _: dependencies.get_bulk_create_comments_use_case().execute(
+                [(i, user_id(), "new") for i in range(100)]
+            ),
+            writes=True,
+        ),
+        case("use_case.comments.get", lambda _: dependencies.get_get_comment_use_case().execute(comment_id()), setup=clear_caches),
+        case("use_case.comments.get_all[100]", lambda _: dependencies.get_get_all_comments_use_case().execute(limit=100)),
+        case(
+            "use_case.comments.get_by_user_id[100]",
+            lambda _: dependencies.get_get_all_comments_by_user_id_use_case().execute(user_id(), limit=100),
+            setup=clear_caches,
+        ),
+        case(
+            "use_case.comments.update",
+            lambda c: dependencies.get_update_comment_use_case().execute(c.comment, c.user_id, c.id),
+            setup=own_comment,
+        ),
+        case(
+            "use_case.comments.delete",
+            lambda cid: dependencies.get_delete_comment_use_case().execute(cid),
+            setup=created_comment,
+            writes=True,
+        ),
+        case(
+            "use_case.comments.export.ndjson[user]",
+            lambda _: _drain(dependencies.get_export_comments_use_case().execute("ndjson", user_id=user_id())),
+        ),
+    ]
+
+    # сериализация: те же строки, что отдаёт get_all, в колоночном батче и списком сущностей
+    entities = list(page)
+    users_page = [User(id=c.user_id, email=f"user{c.user_id}@bench.example.com", name=f"User {c.user_id}",
+                       created_at=c.created_at, updated_at=c.updated_at) for c in entities]
+    cases += [
+        case("render.comment", lambda _: _value(render_entity(entities[0], COMMENT_FIELDS).body)),
+        case("render.user", lambda _: _value(render_entity(users_page[0], USER_FIELDS).body)),
+        case(f"render.comments.batch[{len(page)}]", lambda _: _value(render_entities(page, COMMENT_FIELDS).body)),
+        case(f"render.comments.list[{len(entities)}]", lambda _: _value(render_entities(entities, COMMENT_FIELDS).body)),
+        case(f"render.users.list[{len(users_page)}]", lambda _: _value(render_entities(users_page, USER_FIELDS).body)),
+        case(
+            f"render.comments.pydantic[{len(entities)}]",
+            lambda _: _value(dumps([CommentResponse.model_validate(c, from_attributes=True).model_dump() for c in entities])),
+        ),
+    ]
+    return cases
+
+
+def _email_name(n: int):
+    return f"bench{n}@usecase.example.com", f"Bench {n}"
+
+
+async def _value(value: Any) -> Any:
+    return value
@@ -0,0 +1,90 @@
+"""
+Отдельная БД под каждый набор данных (<database_name>_bench_<набор>), схема - обычными
+миграциями. Данные генерируются на стороне Postgres (generate_series) и детерминированы:
+id пользователей 1..users, комментариев 1..comments, комментарий i принадлежит
+пользователю i % users + 1. Если в БД уже лежит нужный набор, повторно он не заливается.
+"""
+import asyncpg
+
+from src.infrastructure.config import settings
+from src.infrastructure.database.migration_runner import MigrationRunner
+
+DATASETS = {
+    "10k": {"users": 1_000, "comments": 10_000},
+    "1m": {"users": 10_000, "comments": 1_000_000},
+}
+
+SEED_USERS = """
+insert into users (email, name, created_at, updated_at)
+select 'user' || i || '@bench.example.com', 'User ' || i,
+       timestamp '2024-01-01' + i * interval '1 minute',
+       timestamp '2024-01-01' + i * interval '1 minute'
+from generate_series(1, $1) as i
+"""
+
+SEED_COMMENTS = """
+insert into comments (user_id, comment, created_at, updated_at)
+select i % $1 + 1, 'comment number ' || i || ' with some typical text payload',
+       timestamp '2024-01-01' + i * interval '1 second',
+       timestamp '2024-01-01' + i * interval '1 second'
+from generate_series(1, $2) as i
+"""
+
+
+def database_name(dataset: str) -> str:
+    return f"{settings.database_name}_bench_{dataset}"
+
+
+def _connect(database: str):
+    return asyncpg.connect(
+        host=settings.database_host,
+        port=settings.database_port,
+        database=database,
+        user=settings.database_user,
+        password=settings.database_password,
+    )
+
+
+async def prepare(dataset: str) -> dict:
+    """Создаёт и заполняет БД набора и переключает на неё settings.database_name."""
+    size = DATASETS[dataset]
+    name = database_name(dataset)
+
+    conn = await _connect(settings.database_name)
+    try:
+        if not await conn.fetchval("select 1 from pg_database where datname = $1", name):
+            await conn.execute(f'create database "{name}"')
+    finally:
+        await conn.close()
+
+    settings.database_name = name
+    await MigrationRunner().migrate()
+
+    conn = await _connect(name)
+    try:
+        users = await conn.fetchval("select count(*) from users")
+        comments = await conn.fetchval("select count(*) from comments")
+        if (users, comments) != (size["users"], size["comments"]):
+            print(f"Seeding {dataset}: {size['users']} users, {size['comments']} comments")
+            await conn.execute("truncate table users, comments restart identity cascade")
+            await conn.execute(SEED_USERS, size["users"])
+            await conn.execute(SEED_COMMENTS, size["users"], size["comments"])
+            # даты набора в прошлом - строки легли в comments_default, разносим по месяцам
+            await conn.execute("select ensure_comment_partitions()")
+            await conn.execute("analyze users; analyze comments")
+    finally:
+        await conn.close()
+    return size
+
+
+async def restore(dataset: str) -> None:
+    """Убирает строки, созданные бенчмарками записи, и сдвигает sequence обратно (после prepare)."""
+    size = DATASETS[dataset]
+    conn = await _connect(settings.database_name)
+    try:
+        await conn.execute("delete from comments where id > $1", size["comments"])
+        await conn.execute("delete from users where id > $1", size["users"])
+        await conn.execute("select setval(pg_get_serial_sequence('comments', 'id'), $1)", size["comments"])
+        await conn.execute("select setval(pg_get_serial_sequence('users', 'id'), $1)", size["users"])
+    finally:
+        await conn.close()
@@ -0,0 +1,109 @@
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# метрики, по которым сравнение с baseline ищет регрессии: (поле, чем больше - тем лучше);
+# хвостовые перцентили субмиллисекундных операций слишком шумные для порога
+COMPARED = (("ops_per_sec", True), ("p50_ms", False))
+
+
+class Case:
+    """
+    Один бенчмарк. run(arg) - измеряемая операция; setup() (не измеряется) готовит ей аргумент,
+    teardown() вызывается один раз после всех прогонов (вернуть данные к исходным).
+    """
+
+    __slots__ = ("name", "run", "setup", "teardown")
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Any], Awaitable[Any]],
+        setup: Optional[Callable[[], Awaitable[Any]]] = None,
+        teardown: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.teardown = teardown
+
+
+def percentile(latencies: List[float], q: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+
+async def measure(case: Case, warmup: int = 10, min_ops: int = 20, max_ops: int = 2000, min_time: float = 1.0) -> dict:
+    """Прогоняет операцию последовательно: не меньше min_ops и min_time, не больше max_ops."""
+    for _ in range(warmup):
+        await case.run(await case.setup() if case.setup else None)
+
+    latencies: List[float] = []
+    busy = 0.0
+    started = time.perf_counter()
+    while len(latencies) < max_ops and (len(latencies) < min_ops or time.perf_counter() - started < min_time):
+        arg = await case.setup() if case.setup else None
+        t0 = time.perf_counter()
+        await case.run(arg)
+        elapsed = time.perf_counter() - t0
+        latencies.append(elapsed)
+        busy += elapsed
+    if case.teardown:
+        await case.teardown()
+
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / busy,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def environment() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def save_baseline(path: Path, dataset: str, results: Dict[str, dict]) -> None:
+    data = {"dataset": dataset, "environment": environment(), "results": results}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+def load_baseline(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def compare(baseline: Dict[str, dict], results: Dict[str, dict], threshold: float) -> List[dict]:
+    """Изменения хуже threshold (доля, 0.1 = 10%) относительно baseline, по бенчмаркам из обоих наборов."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED:
+            old, new = before[metric], result[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append({"name": name, "metric": metric, "baseline": old, "current": new, "change": change})
+    return regressions
@@ -0,0 +1,383 @@
+"""
+Генератор нагрузки на API: смесь запросов к /users и /comments или повтор записанного трафика.
+
+    python -m scripts.loadgen --rate 200 --duration 30                        # в процессе, через ASGI
+    python -m scripts.loadgen --url http://127.0.0.1:8000 --rate 500 --duration 60
+    python -m scripts.loadgen --mix users.get=5,comments.by_user=3,comments.create=1
+    python -m scripts.loadgen --concurrency 32 --duration 10                  # closed loop, максимум rps
+    python -m scripts.loadgen --record traffic.jsonl --rate 100 --duration 10
+    python -m scripts.loadgen --replay traffic.jsonl --speed 2
+    python -m scripts.loadgen --header "Accept-Encoding: identity"            # без сжатия ответов
+
+Open loop (--rate): запросы приходят пуассоновским потоком независимо от того, успевает ли
+сервер, а задержка считается от запланированного момента отправки - очередь перед сервером
+попадает в перцентили, а не прячется (coordinated omission). Если в полёте больше
+--max-in-flight запросов, новые не отправляются и считаются в dropped.
+
+Формат --replay/--record - JSONL, строка на запрос:
+    {"offset": 0.0125, "method": "GET", "path": "/users/42", "params": {}, "json": null, "headers": {}}
+offset - секунды от начала (делится на --speed); без offset запросы идут с --rate.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_MIX = (
+    "users.get=4,users.list=1,users.create=1,users.update=1,"
+    "comments.get=4,comments.list=1,comments.by_user=4,comments.create=2,comments.update=1"
+)
+
+_IDS = re.compile(r"/\d+(?=/|$)")
+
+
+class Request:
+    __slots__ = ("method", "path", "route", "params", "json", "headers")
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        route: Optional[str] = None,
+        params: Optional[dict] = None,
+        json: Any = None,
+        headers: Optional[dict] = None,
+    ):
+        self.method = method
+        self.path = path
+        # route - шаблон пути для отчёта: GET /users/{id}, а не тысяча строк по id
+        self.route = route or f"{method} {_IDS.sub('/{id}', path)}"
+        self.params = params or {}
+        self.json = json
+        self.headers = headers or {}
+
+    def to_dict(self, offset: float) -> dict:
+        return {
+            "offset": round(offset, 6),
+            "method": self.method,
+            "path": self.path,
+            "params": self.params,
+            "json": self.json,
+            "headers": self.headers,
+        }
+
+
+class Fixtures:
+    """id существующих пользователей и комментариев, на которые ссылаются сценарии."""
+
+    def __init__(self):
+        self.users: List[int] = []
+        self.comments: List[Tuple[int, int]] = []
+        self.unique = itertools.count()
+        self.run_id = f"{os.getpid()}-{int(time.time())}"
+
+    async def load(self, client: httpx.AsyncClient, seed_users: int, seed_comments: int) -> None:
+        users = (await client.get("/users/", params={"limit": 1000})).json()
+        comments = (await client.get("/comments/", params={"limit": 1000})).json()
+        for _ in range(max(0, seed_users - len(users))):
+            users.append((await client.post("/users/", json=self.new_user())).json())
+        self.users = [user["id"] for user in users]
+        for index in range(max(0, seed_comments - len(comments))):
+            user_id = self.users[index % len(self.users)]
+            response = await client.post("/comments/", json={"user_id": user_id, "comment": "seed"})
+            comments.append(response.json())
+        self.comments = [(comment["id"], comment["user_id"]) for comment in comments]
+
+    def new_user(self) -> dict:
+        n = next(self.unique)
+        return {"email": f"load-{self.run_id}-{n}@loadgen.example.com", "name": f"Load {n}"}
+
+
+SCENARIOS: Dict[str, Callable[[Fixtures, random.Random], Request]] = {
+    "users.get": lambda f, rng: Request("GET", f"/users/{rng.choice(f.users)}"),
+    "users.list": lambda f, rng: Request("GET", "/users/", params={"limit": 100}),
+    "users.create": lambda f, rng: Request("POST", "/users/", json=f.new_user()),
+    "users.update": lambda f, rng: (lambda user_id: Request(
+        "PUT", f"/users/{user_id}", json={"name": f"Updated {user_id}"}
+    ))(rng.choice(f.users)),
+    "comments.get": lambda f, rng: Request("GET", f"/comments/{rng.choice(f.comments)[0]}"),
+    "comments.list": lambda f, rng: Request("GET", "/comments/", params={"limit": 100}),
+    "comments.by_user": lambda f, rng: Request(
+        "GET", f"/comments/user/{rng.choice(f.users)}", params={"limit": 100}
+    ),
+    "comments.create": lambda f, rng: Request(
+        "POST", "/comments/", json={"user_id": rng.choice(f.users), "comment": "load test comment"}
+    ),
+    "comments.update": lambda f, rng: (lambda comment: Request(
+        "PUT", f"/comments/{comment[0]}", json={"user_id": comment[1], "comment": "updated by load test"}
+    ))(rng.choice(f.comments)),
+}
+
+
+def parse_mix(spec: str) -> Tuple[List[str], List[float]]:
+    names, weights = [], []
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}, available: {', '.join(SCENARIOS)}")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+def mix_requests(fixtures: Fixtures, spec: str, rng: random.Random) -> Iterator[Request]:
+    names, weights = parse_mix(spec)
+    while True:
+        yield SCENARIOS[rng.choices(names, weights)[0]](fixtures, rng)
+
+
+def poisson_offsets(rate: float, rng: random.Random) -> Iterator[float]:
+    offset = 0.0
+    while True:
+        offset += rng.expovariate(rate)
+        yield offset
+
+
+def load_replay(path: str, speed: float, rate: float, rng: random.Random) -> Iterator[Tuple[float, Request]]:
+    arrivals = poisson_offsets(rate, rng)
+    with open(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            offset = entry["offset"] / speed if "offset" in entry else next(arrivals)
+            yield offset, Request(
+                entry.get("method", "GET").upper(),
+                entry["path"],
+                params=entry.get("params"),
+                json=entry.get("json"),
+                headers=entry.get("headers"),
+            )
+
+
+class RouteStats:
+    __slots__ = ("latencies", "statuses", "exceptions", "bytes")
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.exceptions: Counter = Counter()
+        # тела ответов как пришли по сети, т.е. после сжатия
+        self.bytes = 0
+
+    def to_dict(self, elapsed: float) -> dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        errors = sum(n for status, n in self.statuses.items() if status >= 500) + sum(self.exceptions.values())
+        return {
+            "count": count,
+            "rps": count / elapsed if elapsed else 0.0,
+            "errors": errors,
+            "error_rate": errors / count if count else 0.0,
+            "client_errors": sum(n for status, n in self.statuses.items() if 400 <= status < 500),
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "p999_ms": _percentile(latencies, 0.999),
+            "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+            "bytes": self.bytes,
+            "kb_per_request": self.bytes / count / 1024 if count else 0.0,
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items())},
+            "exceptions": dict(self.exceptions),
+        }
+
+
+def _percentile(latencies: List[float], q: float) -> float:
+    if not latencies:
+        return 0.0
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+
+class LoadRun:
+    def __init__(self, client: httpx.AsyncClient, headers: Dict[str, str], max_in_flight: int, record=None):
+        self.client = client
+        self.headers = headers
+        self.max_in_flight = max_in_flight
+        self.record = record
+        self.routes: Dict[str, RouteStats] = {}
+        self.dropped = 0
+        self.elapsed = 0.0
+        self._in_flight: set = set()
+
+    async def send(self, request: Request, scheduled: float) -> None:
+        stats = self.routes.get(request.route)
+        if stats is None:
+            stats = self.routes[request.route] = RouteStats()
+        try:
+            response = await self.client.request(
+                request.method,
+                request.path,
+                params=request.params,
+                json=request.json,
+                headers={**self.headers, **request.headers},
+            )
+            await response.aread()
+            stats.statuses[response.status_code] += 1
+            stats.bytes += response.num_bytes_downloaded
+        except Exception as e:
+            stats.exceptions[type(e).__name__] += 1
+        stats.latencies.append(time.perf_counter() - scheduled)
+
+    async def open_loop(self, arrivals: Iterator[Tuple[float, Request]], duration: float) -> None:
+        started = time.perf_counter()
+        for offset, request in arrivals:
+            if duration and offset > duration:
+                break
+            scheduled = started + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.record:
+                self.record.write(json.dumps(request.to_dict(offset)) + "\n")
+            if len(self._in_flight) >= self.max_in_flight:
+                self.dropped += 1
+                continue
+            task = asyncio.create_task(self.send(request, scheduled))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight)
+        self.elapsed = time.perf_counter() - started
+
+    async def closed_loop(self, requests: Iterator[Request], concurrency: int, duration: float) -> None:
+        started = time.perf_counter()
+        deadline = started + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                request = next(requests)
+                if self.record:
+                    self.record.write(json.dumps(request.to_dict(time.perf_counter() - started)) + "\n")
+                await self.send(request, time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        self.elapsed = time.perf_counter() - started
+
+    def report(self) -> dict:
+        total = RouteStats()
+        for stats in self.routes.values():
+            total.latencies.extend(stats.latencies)
+            total.statuses.update(stats.statuses)
+            total.exceptions.update(stats.exceptions)
+            total.bytes += stats.bytes
+        return {
+            "elapsed_s": self.elapsed,
+            "dropped": self.dropped,
+            "total": total.to_dict(self.elapsed),
+            "routes": {route: stats.to_dict(self.elapsed) for route, stats in sorted(self.routes.items())},
+        }
+
+
+def print_report(report: dict) -> None:
+    print(f"elapsed {report['elapsed_s']:.1f}s, dropped (over --max-in-flight): {report['dropped']}")
+    header = f"{'route':<32} {'count':>7} {'rps':>8} {'err%':>6} {'4xx':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'p99.9':>8} {'max':>8} {'kB/req':>8}"
+    print(header)
+    print("-" * len(header))
+    for route, row in [*report["routes"].items(), ("TOTAL", report["total"])]:
+        print(
+            f"{route:<32} {row['count']:>7} {row['rps']:>8.1f} {row['error_rate'] * 100:>5.1f}% "
+            f"{row['client_errors']:>5} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+            f"{row['p999_ms']:>8.2f} {row['max_ms']:>8.2f} {row['kb_per_request']:>8.2f}"
+        )
+    print("latencies in ms; kB/req - response body on the wire (compressed if negotiated)")
+
+
+@contextlib.asynccontextmanager
+async def open_client(url: Optional[str], max_in_flight: int):
+    if url:
+        limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+            yield client
+        return
+
+    # в процессе: то же приложение, что у uvicorn, но без сети; lifespan ASGITransport не
+    # запускает, поэтому пул поднимаем сами
+    from src.infrastructure.database.connection import db_connection
+    from src.presentation.api.app import create_app
+
+    await db_connection.connect()
+    try:
+        transport = httpx.ASGITransport(app=create_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadgen", timeout=30.0) as client:
+            yield client
+    finally:
+        await db_connection.disconnect()
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    headers = dict(_parse_header(value) for value in args.header or ())
+    record = open(args.record, "w") if args.record else None
+    try:
+        async with open_client(args.url, args.max_in_flight) as client:
+            load = LoadRun(client, headers, args.max_in_flight, record)
+            if args.replay:
+                await load.open_loop(load_replay(args.replay, args.speed, args.rate or 100.0, rng), args.duration)
+                return load.report()
+
+            fixtures = Fixtures()
+            await fixtures.load(client, args.seed_users, args.seed_comments)
+            requests = mix_requests(fixtures, args.mix, rng)
+            if args.rate:
+                await load.open_loop(zip(poisson_offsets(args.rate, rng), requests), args.duration)
+            else:
+                await load.closed_loop(requests, args.concurrency, args.duration)
+            return load.report()
+    finally:
+        if record:
+            record.close()
+
+
+def _parse_header(value: str) -> Tuple[str, str]:
+    name, _, header = value.partition(":")
+    return name.strip(), header.strip()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m scripts.loadgen")
+    parser.add_argument("--url", help="base URL of a running server; in-process ASGI when omitted")
+    parser.add_argument("--rate", type=float, help="open loop: mean arrivals per second (Poisson)")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed loop workers when --rate is not set")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds; 0 replays the whole file")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario=weight,... of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--replay", help="JSONL file with requests to replay instead of --mix")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier for recorded offsets")
+    parser.add_argument("--record", help="write sent requests as JSONL usable with --replay")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--header", action="append", help="extra header, e.g. 'X-Client-Id: loadgen'")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--seed-users", type=int, default=50, help="create users up to this many before the run")
+    parser.add_argument("--seed-comments", type=int, default=200)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.url:
+        report = asyncio.run(run(args))
+    else:
+        # логи приложения в консоль перемешались бы с отчётом
+        out = sys.stdout
+        with open(os.devnull, "w") as devnull:
+            sys.stdout = devnull
+            try:
+                report = asyncio.run(run(args))
+            finally:
+                sys.stdout = out
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
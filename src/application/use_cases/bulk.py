@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass
+class BulkRowResult:
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchGetResult:
+    id: int
+    item: Optional[Any] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchDeleteResult:
+    id: int
+    deleted: bool = False
+    error: Optional[str] = None
@@ -1,32 +1,83 @@
-from typing import List, Optional
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
 
+from src.application.use_cases.bulk import BatchDeleteResult, BatchGetResult, BulkRowResult
 from src.domain.entities.comment import Comment
-from src.domain.exceptions import EntityAlreadyExists, EntityNotFound, ValidationError
+from src.domain.entities.comment_search_hit import CommentSearchHit
+from src.domain.entities.comment_stats import ACTIVITY_BUCKETS, ActivityBucket, UserCommentStats
+from src.domain.entities.total_count import TOTAL_MODES, TotalCount
+from src.domain.exceptions import EntityAlreadyExists, EntityNotFound, PreconditionFailed, ValidationError
 from src.domain.repositories.comment_repository import CommentRepository
 from src.domain.repositories.user_repository import UserRepository
 
 
 class CreateCommentUseCase:
-    def __init__(self, commetn_repository: CommentRepository, user_repository: UserRepository):
+    def __init__(self, commetn_repository: CommentRepository):
         self.comment_repository = commetn_repository
-        self.user_repository = user_repository
 
     async def execute(self, user_id: int, comment: str) -> Comment:
         if not comment or not user_id:
             raise ValidationError('User_id and Comment are required')
-        existing_user = await self.user_repository.get_by_id(user_id)
-        if not existing_user:
-            raise EntityNotFound(f"User with id {user_id} not found")
         comment = Comment(id=None, user_id=user_id, comment=comment)
-        return await self.comment_repository.create(comment)
+        created_comment = await self.comment_repository.create(comment)
+        if not created_comment:
+            raise EntityNotFound(f"User with id {user_id} not found")
+        return created_comment
        
 
+class BulkCreateCommentsUseCase:
+    def __init__(self, comment_repository: CommentRepository, user_repository: UserRepository):
+        self.comment_repository = comment_repository
+        self.user_repository = user_repository
+
+    async def execute(self, rows: List[Tuple[int, int, str]]) -> List[BulkRowResult]:
+        """Создаёт один чанк комментариев; rows - (index, user_id, comment)."""
+        results = {}
+        candidates = []
+        for index, user_id, comment in rows:
+            if not comment or not user_id:
+                results[index] = BulkRowResult(index=index, error='User_id and Comment are required')
+            else:
+                candidates.append((index, user_id, comment))
+
+        if candidates:
+            # одна set-based проверка внешних ключей на весь чанк
+            existing = await self.user_repository.get_existing_ids(
+                list({user_id for _, user_id, _ in candidates})
+            )
+            valid = []
+            for index, user_id, comment in candidates:
+                if user_id in existing:
+                    valid.append((index, Comment(id=None, user_id=user_id, comment=comment)))
+                else:
+                    results[index] = BulkRowResult(
+                        index=index, error=f"User with id {user_id} not found"
+                    )
+            candidates = valid
+
+        if candidates:
+            try:
+                created = await self.comment_repository.create_many(
+                    [comment for _, comment in candidates]
+                )
+            except EntityNotFound as e:
+                for index, _ in candidates:
+                    results[index] = BulkRowResult(index=index, error=str(e))
+            else:
+                for (index, _), comment in zip(candidates, created):
+                    results[index] = BulkRowResult(index=index, id=comment.id)
+
+        return [results[index] for index, _, _ in rows]
+
+
 class GetAllCommentsUseCase:
     def __init__(self, comment_repository: CommentRepository):
         self.comment_repository = comment_repository
 
-    async def execute(self, limit: int = 100, offset: int = 0) -> List[Comment]:
-        return await self.comment_repository.get_all(limit=limit, offset=offset)
+    async def execute(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
+        return await self.comment_repository.get_all(limit=limit, offset=offset, after_id=after_id)
     
     
 class GetCommentUseCase:
@@ -40,55 +91,182 @@ class GetCommentUseCase:
         return comment        
 
 
+class BatchGetCommentsUseCase:
+    def __init__(self, comment_repository: CommentRepository):
+        self.comment_repository = comment_repository
+
+    async def execute(self, comment_ids: List[int]) -> List[BatchGetResult]:
+        """Один запрос where id = any($1); результат на каждый id в порядке запроса, без повторов."""
+        if not comment_ids:
+            raise ValidationError("ids are required")
+        found = {comment.id: comment for comment in await self.comment_repository.get_many(comment_ids)}
+        return [
+            BatchGetResult(id=comment_id, item=found[comment_id])
+            if comment_id in found
+            else BatchGetResult(id=comment_id, error=f"Comment with id {comment_id} not found")
+            for comment_id in dict.fromkeys(comment_ids)
+        ]
+
+
 class GetAllCommentsUserIdUseCase:
     def __init__(self, comment_repository: CommentRepository, user_repository: UserRepository):
         self.comment_repository = comment_repository
         self.user_repository = user_repository
     
-    async def execute(self, user_id: int, limit: int = 100, offset: int = 0) -> List[Comment]:
+    async def execute(
+        self, user_id: int, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
         existing_user = await self.user_repository.get_by_id(user_id)
         if not existing_user:
             raise EntityNotFound(f"User with id {user_id} not found")
-        return await self.comment_repository.get_by_user_id(user_id=user_id, limit=limit, offset=offset)
+        return await self.comment_repository.get_by_user_id(
+            user_id=user_id, limit=limit, offset=offset, after_id=after_id
+        )
         
 
 
 
-class UpdateCommentUseCase:
+class CountCommentsUseCase:
+    def __init__(self, comment_repository: CommentRepository):
+        self.comment_repository = comment_repository
+
+    async def execute(
+        self, mode: str = "exact", user_id: Optional[int] = None, cap: Optional[int] = None
+    ) -> TotalCount:
+        if mode not in TOTAL_MODES:
+            raise ValidationError(f"Unknown total mode: {mode}")
+        return await self.comment_repository.count(mode, user_id=user_id, cap=cap)
+
+
+class GetUserCommentStatsUseCase:
     def __init__(self, comment_repository: CommentRepository, user_repository: UserRepository):
         self.comment_repository = comment_repository
         self.user_repository = user_repository
-        
-    async def execute(self, comment: str, user_id: int, comment_id: int) -> Comment:        
+
+    async def execute(self, user_id: int) -> UserCommentStats:
         existing_user = await self.user_repository.get_by_id(user_id)
         if not existing_user:
             raise EntityNotFound(f"User with id {user_id} not found")
-                
-        existing_comment = await self.comment_repository.get_by_id(comment_id)
-        if not existing_comment:
+        return await self.comment_repository.get_user_stats(user_id)
+
+
+class GetCommentActivityUseCase:
+    def __init__(self, comment_repository: CommentRepository):
+        self.comment_repository = comment_repository
+
+    async def execute(
+        self,
+        bucket: str = "day",
+        user_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[ActivityBucket]:
+        if bucket not in ACTIVITY_BUCKETS:
+            raise ValidationError(f"Unknown bucket: {bucket}")
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError("date_from must not be later than date_to")
+        return await self.comment_repository.get_activity(
+            bucket, user_id=user_id, date_from=date_from, date_to=date_to
+        )
+
+
+class SearchCommentsUseCase:
+    def __init__(self, comment_repository: CommentRepository):
+        self.comment_repository = comment_repository
+
+    async def execute(
+        self,
+        query: str,
+        user_id: Optional[int] = None,
+        limit: int = 100,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> List[CommentSearchHit]:
+        query = query.strip() if query else ""
+        if not query:
+            raise ValidationError("Search query is required")
+        return await self.comment_repository.search(query, user_id=user_id, limit=limit, after=after)
+
+
+class UpdateCommentUseCase:
+    def __init__(self, comment_repository: CommentRepository):
+        self.comment_repository = comment_repository
+        
+    async def execute(
+        self,
+        comment: str,
+        user_id: int,
+        comment_id: int,
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> Comment:
+        result = await self.comment_repository.update_owned(
+            comment_id=comment_id,
+            user_id=user_id,
+            comment=comment or None,
+            expected_versions=expected_versions,
+        )
+        if not result.user_exists:
+            raise EntityNotFound(f"User with id {user_id} not found")
+
+        if not result.comment_exists:
             raise EntityNotFound(f"Comment with id {comment_id} not found")
 
-        if user_id != existing_comment.user_id:
+        # владение - до версии: чужой комментарий со старым ETag - 404, а не 412
+        if not result.owned:
             raise EntityNotFound(f"User with id {user_id} is not the owner of comment {comment_id}")
+
+        if not result.version_matches:
+            raise PreconditionFailed(f"Comment with id {comment_id} has been modified")
+
+        if not result.comment:
+            # удалён параллельно после чтения target
+            raise EntityNotFound(f"Comment with id {comment_id} not found")
         
-        if comment:
-            existing_comment.comment = comment
-                
-        updated_comment = await self.comment_repository.update(existing_comment)
-        if not updated_comment:
-            raise EntityNotFound(f"Comment with {comment_id} user_id is not found")
-        
-        return updated_comment
+        return result.comment
              
 
+class ExportCommentsUseCase:
+    def __init__(self, comment_repository: CommentRepository):
+        self.comment_repository = comment_repository
+
+    def execute(
+        self,
+        fmt: str,
+        user_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        if created_from and created_to and created_from > created_to:
+            raise ValidationError("created_from must not be later than created_to")
+        return self.comment_repository.export(
+            fmt, user_id=user_id, created_from=created_from, created_to=created_to
+        )
+
+
+class BatchDeleteCommentsUseCase:
+    def __init__(self, comment_repository: CommentRepository):
+        self.comment_repository = comment_repository
+
+    async def execute(self, comment_ids: List[int]) -> List[BatchDeleteResult]:
+        if not comment_ids:
+            raise ValidationError("ids are required")
+        unique_ids = list(dict.fromkeys(comment_ids))
+        deleted = {comment.id for comment in await self.comment_repository.delete_many(unique_ids)}
+        return [
+            BatchDeleteResult(id=comment_id, deleted=True)
+            if comment_id in deleted
+            else BatchDeleteResult(id=comment_id, error=f"Comment with id {comment_id} not found")
+            for comment_id in unique_ids
+        ]
+
+
 class DeleteCommentUseCase:
     def __init__(self, comment_repositoty: CommentRepository):
         self.comment_repository = comment_repositoty
 
     async def execute(self, comment_id: int) -> bool:
-        result = await self.comment_repository.delete(comment_id)
-        if not result:
+        deleted = await self.comment_repository.delete(comment_id)
+        if deleted is None:
             raise EntityNotFound(f"Comment with {comment_id} is not found")
-        return result 
+        return True 
 
         
\ No newline at end of file
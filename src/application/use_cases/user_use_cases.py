@@ -1,7 +1,10 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
+from src.application.use_cases.bulk import BatchGetResult, BulkRowResult
+from src.domain.entities.total_count import TOTAL_MODES, TotalCount
 from src.domain.entities.user import User
-from src.domain.exceptions import EntityAlreadyExists, EntityNotFound, ValidationError
+from src.domain.exceptions import EntityAlreadyExists, EntityNotFound, PreconditionFailed, ValidationError
 from src.domain.repositories.user_repository import UserRepository
 
 
@@ -12,12 +15,55 @@ class CreateUserUseCase:
     async def execute(self, email: str, name: str) -> User:
         if not email or not name:
             raise ValidationError("Email and name are required")
-        existing_user = await self.user_repository.get_by_email(email)
-        if existing_user:
-            raise EntityAlreadyExists(f"User with email {email} already exists")
 
         user = User(id=None, email=email, name=name)
-        return await self.user_repository.create(user)
+        created_user = await self.user_repository.create(user)
+        if not created_user:
+            raise EntityAlreadyExists(f"User with email {email} already exists")
+        return created_user
+
+
+class BulkCreateUsersUseCase:
+    def __init__(self, user_repository: UserRepository):
+        self.user_repository = user_repository
+
+    async def execute(self, rows: List[Tuple[int, str, str]]) -> List[BulkRowResult]:
+        """Создаёт один чанк пользователей; rows - (index, email, name)."""
+        results: Dict[int, BulkRowResult] = {}
+        candidates: Dict[str, Tuple[int, User]] = {}
+        for index, email, name in rows:
+            if not email or not name:
+                results[index] = BulkRowResult(index=index, error="Email and name are required")
+                continue
+            user = User(id=None, email=email, name=name)
+            if user.email in candidates:
+                results[index] = BulkRowResult(
+                    index=index, error=f"User with email {user.email} is duplicated in batch"
+                )
+                continue
+            candidates[user.email] = (index, user)
+
+        if candidates:
+            existing = await self.user_repository.get_existing_emails(list(candidates))
+            for email in existing:
+                index, _ = candidates.pop(email)
+                results[index] = BulkRowResult(
+                    index=index, error=f"User with email {email} already exists"
+                )
+
+        if candidates:
+            try:
+                created = await self.user_repository.create_many(
+                    [user for _, user in candidates.values()]
+                )
+            except EntityAlreadyExists as e:
+                for index, _ in candidates.values():
+                    results[index] = BulkRowResult(index=index, error=str(e))
+            else:
+                for (index, _), user in zip(candidates.values(), created):
+                    results[index] = BulkRowResult(index=index, id=user.id)
+
+        return [results[index] for index, _, _ in rows]
 
 
 class GetUserUseCase:
@@ -31,34 +77,80 @@ class GetUserUseCase:
         return user
 
 
+class GetUsersByIdsUseCase:
+    def __init__(self, user_repository: UserRepository):
+        self.user_repository = user_repository
+
+    async def execute(self, user_ids: List[int]) -> List[BatchGetResult]:
+        """Один запрос where id = any($1); результат на каждый id в порядке запроса, без повторов."""
+        if not user_ids:
+            raise ValidationError("ids are required")
+        found = {user.id: user for user in await self.user_repository.get_many(user_ids)}
+        return [
+            BatchGetResult(id=user_id, item=found[user_id])
+            if user_id in found
+            else BatchGetResult(id=user_id, error=f"User with id {user_id} not found")
+            for user_id in dict.fromkeys(user_ids)
+        ]
+
+
 class GetAllUsersUseCase:
     def __init__(self, user_repository: UserRepository):
         self.user_repository = user_repository
 
-    async def execute(self, limit: int = 100, offset: int = 0) -> List[User]:
-        return await self.user_repository.get_all(limit=limit, offset=offset)
+    async def execute(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> List[User]:
+        return await self.user_repository.get_all(limit=limit, offset=offset, after_id=after_id)
 
 
-class UpdateUserUseCase:
+class CountUsersUseCase:
     def __init__(self, user_repository: UserRepository):
         self.user_repository = user_repository
 
-    async def execute(self, user_id: int, email: Optional[str] = None, name: Optional[str] = None) -> User:
-        existing_user = await self.user_repository.get_by_id(user_id)
-        if not existing_user:
-            raise EntityNotFound(f"User with id {user_id} not found")
+    async def execute(self, mode: str = "exact", cap: Optional[int] = None) -> TotalCount:
+        if mode not in TOTAL_MODES:
+            raise ValidationError(f"Unknown total mode: {mode}")
+        return await self.user_repository.count(mode, cap=cap)
+
 
-        if email:
-            existing_user.email = email
-        if name:
-            existing_user.name = name
+class UpdateUserUseCase:
+    def __init__(self, user_repository: UserRepository):
+        self.user_repository = user_repository
 
-        updated_user = await self.user_repository.update(existing_user)
+    async def execute(
+        self,
+        user_id: int,
+        email: Optional[str] = None,
+        name: Optional[str] = None,
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> User:
+        updated_user = await self.user_repository.update_fields(
+            user_id, email=email, name=name, expected_versions=expected_versions
+        )
         if not updated_user:
+            # чтение только после неудачной условной записи: нет строки или другая версия
+            if expected_versions is not None and await self.user_repository.get_by_id(user_id):
+                raise PreconditionFailed(f"User with id {user_id} has been modified")
             raise EntityNotFound(f"User with id {user_id} not found")
         return updated_user
 
 
+class ExportUsersUseCase:
+    def __init__(self, user_repository: UserRepository):
+        self.user_repository = user_repository
+
+    def execute(
+        self,
+        fmt: str,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        if created_from and created_to and created_from > created_to:
+            raise ValidationError("created_from must not be later than created_to")
+        return self.user_repository.export(fmt, created_from=created_from, created_to=created_to)
+
+
 class DeleteUserUseCase:
     def __init__(self, user_repository: UserRepository):
         self.user_repository = user_repository
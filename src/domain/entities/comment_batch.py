@@ -0,0 +1,130 @@
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Union, overload
+
+from src.domain.entities.comment import Comment
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+# отсутствующее время: в array('q') нет None, поэтому храним минимальное значение
+_NO_TIME = -(2 ** 63)
+
+
+def _to_micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NO_TIME
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value: int) -> Optional[datetime]:
+    if value == _NO_TIME:
+        return None
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class CommentBatch(Sequence[Comment]):
+    """
+    Список комментариев, хранящийся по колонкам: id, user_id и время - в array('q'),
+    текст - в списке строк. Объекты Comment создаются только при обращении к элементу.
+    Время хранится как naive datetime в микросекундах от эпохи, как и в колонках timestamp.
+    """
+
+    __slots__ = ("ids", "user_ids", "comments", "created_at", "updated_at")
+
+    def __init__(self, comments: Iterable[Comment] = ()):
+        self.ids = array("q")
+        self.user_ids = array("q")
+        self.comments: List[str] = []
+        self.created_at = array("q")
+        self.updated_at = array("q")
+        for comment in comments:
+            self.append(comment)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> "CommentBatch":
+        """Строки (id, user_id, comment, created_at, updated_at) - например, записи asyncpg."""
+        batch = cls()
+        ids, user_ids, comments = batch.ids, batch.user_ids, batch.comments
+        created_at, updated_at = batch.created_at, batch.updated_at
+        for comment_id, user_id, text, created, updated in rows:
+            ids.append(comment_id)
+            user_ids.append(user_id)
+            comments.append(text)
+            created_at.append(_to_micros(created))
+            updated_at.append(_to_micros(updated))
+        return batch
+
+    def append(self, comment: Comment) -> None:
+        self.ids.append(comment.id)
+        self.user_ids.append(comment.user_id)
+        self.comments.append(comment.comment)
+        self.created_at.append(_to_micros(comment.created_at))
+        self.updated_at.append(_to_micros(comment.updated_at))
+
+    def column(self, name: str) -> Iterable[Any]:
+        """Значения одного поля Comment по всем строкам - без создания объектов Comment."""
+        if name == "id":
+            return self.ids
+        if name == "user_id":
+            return self.user_ids
+        if name == "comment":
+            return self.comments
+        if name in ("created_at", "updated_at"):
+            return map(_from_micros, getattr(self, name))
+        raise AttributeError(f"Comment has no field {name}")
+
+    def versions(self) -> Iterable[int]:
+        """updated_at по строкам в микросекундах от эпохи, как хранится, - без конвертации в datetime."""
+        return self.updated_at
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @overload
+    def __getitem__(self, index: int) -> Comment: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "CommentBatch": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Comment, "CommentBatch"]:
+        if isinstance(index, slice):
+            batch = CommentBatch()
+            batch.ids = self.ids[index]
+            batch.user_ids = self.user_ids[index]
+            batch.comments = self.comments[index]
+            batch.created_at = self.created_at[index]
+            batch.updated_at = self.updated_at[index]
+            return batch
+        return Comment(
+            self.ids[index],
+            self.user_ids[index],
+            self.comments[index],
+            _from_micros(self.created_at[index]),
+            _from_micros(self.updated_at[index]),
+        )
+
+    def __iter__(self) -> Iterator[Comment]:
+        for row in zip(
+            self.ids,
+            self.user_ids,
+            self.comments,
+            map(_from_micros, self.created_at),
+            map(_from_micros, self.updated_at),
+        ):
+            yield Comment(*row)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CommentBatch):
+            return (
+                self.ids == other.ids
+                and self.user_ids == other.user_ids
+                and self.comments == other.comments
+                and self.created_at == other.created_at
+                and self.updated_at == other.updated_at
+            )
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"CommentBatch({list(self)!r})"
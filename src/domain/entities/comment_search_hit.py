@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(slots=True)
+class CommentSearchHit:
+    """Комментарий из полнотекстового поиска: поля Comment + релевантность и фрагмент с подсветкой."""
+    id: int
+    user_id: int
+    comment: str
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    rank: float
+    snippet: str
@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Literal, Optional
+
+# размер корзины активности; недели начинаются с понедельника (date_trunc)
+ActivityBucketSize = Literal["day", "week", "month"]
+ACTIVITY_BUCKETS = ("day", "week", "month")
+
+
+@dataclass(slots=True)
+class ActivityBucket:
+    start: date
+    comment_count: int
+
+
+@dataclass(slots=True)
+class UserCommentStats:
+    user_id: int
+    comment_count: int
+    first_comment_day: Optional[date] = None
+    last_comment_day: Optional[date] = None
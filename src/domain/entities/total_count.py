@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+from typing import Literal
+
+# exact - count(*); estimated - оценка по статистике Postgres; capped - count(*) не дальше cap строк
+TotalMode = Literal["exact", "estimated", "capped"]
+TOTAL_MODES = ("exact", "estimated", "capped")
+
+
+@dataclass(slots=True)
+class TotalCount:
+    value: int
+    # False - value это оценка планировщика или достигнутый cap ("не меньше value")
+    exact: bool
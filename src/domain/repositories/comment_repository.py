@@ -1,15 +1,46 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
 
 from src.domain.entities.comment import Comment
+from src.domain.entities.comment_stats import ActivityBucket, UserCommentStats
+from src.domain.entities.comment_search_hit import CommentSearchHit
+from src.domain.entities.total_count import TotalCount
+
+
+@dataclass
+class CommentUpdateResult:
+    comment: Optional[Comment]
+    user_exists: bool
+    comment_exists: bool
+    # комментарий принадлежит user_id
+    owned: bool = True
+    # False - версия комментария не из expected_versions (If-Match), обновления не было
+    version_matches: bool = True
+
+
+@dataclass
+class DeletedComment:
+    id: int
+    # автор - по нему сбрасываются кэшированные счётчики комментариев пользователя
+    user_id: int
+
 
 class CommentRepository(ABC):
     @abstractmethod
-    async def create(self, comment: Comment) -> Comment:
+    async def create(self, comment: Comment) -> Optional[Comment]:
+        """Возвращает None, если автора комментария не существует."""
+        pass
+
+    @abstractmethod
+    async def create_many(self, comments: List[Comment]) -> List[Comment]:
         pass
 
     @abstractmethod
-    async def get_all(self, limit: int = 100, offset: int = 0) -> List[Comment]:
+    async def get_all(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
         pass
 
     @abstractmethod
@@ -17,13 +48,87 @@ class CommentRepository(ABC):
         pass
 
     @abstractmethod
-    async def get_by_user_id(self, user_id: int, limit: int = 100, offset: int = 0) -> List[Comment]:
+    async def get_many(self, comment_ids: List[int]) -> Sequence[Comment]:
+        pass
+
+    @abstractmethod
+    async def get_by_user_id(
+        self, user_id: int, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
+        pass
+
+    @abstractmethod
+    async def count(
+        self, mode: str = "exact", user_id: Optional[int] = None, cap: Optional[int] = None
+    ) -> TotalCount:
+        """Число комментариев (всех или пользователя) в режиме exact, estimated или capped."""
+        pass
+
+    @abstractmethod
+    async def get_user_stats(self, user_id: int) -> UserCommentStats:
+        """Число комментариев пользователя из rollup-таблиц, без прохода по comments."""
+        pass
+
+    @abstractmethod
+    async def get_activity(
+        self,
+        bucket: str = "day",
+        user_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[ActivityBucket]:
+        """Комментарии по корзинам day/week/month из rollup-таблиц; date_to не включается."""
+        pass
+
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        user_id: Optional[int] = None,
+        limit: int = 100,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> List[CommentSearchHit]:
+        """
+        Полнотекстовый поиск (синтаксис websearch: "фраза", or, -исключить), по убыванию
+        релевантности; after - (rank, id) последней строки предыдущей страницы.
+        """
         pass
 
     @abstractmethod
     async def update(self, comment: Comment) -> Optional[Comment]:
         pass
+
+    @abstractmethod
+    async def update_owned(
+        self,
+        comment_id: int,
+        user_id: int,
+        comment: Optional[str],
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> CommentUpdateResult:
+        """
+        Обновляет комментарий, только если он принадлежит user_id; comment=None не меняет текст.
+        expected_versions - допустимые updated_at (If-Match), None - без проверки версии.
+        """
+        pass
            
     @abstractmethod
-    async def delete(self, comment_id: int) -> bool:
+    async def delete(self, comment_id: int) -> Optional[DeletedComment]:
+        """Возвращает None, если комментария не было."""
+        pass
+
+    @abstractmethod
+    async def delete_many(self, comment_ids: List[int]) -> List[DeletedComment]:
+        """Удаляет комментарии одним запросом; возвращает те, что были удалены."""
+        pass
+
+    @abstractmethod
+    def export(
+        self,
+        fmt: str,
+        user_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        """Потоковая выгрузка комментариев в формате csv, ndjson или binary."""
         pass
@@ -1,31 +1,85 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Set
 
+from src.domain.entities.total_count import TotalCount
 from src.domain.entities.user import User
 
 
 class UserRepository(ABC):
     @abstractmethod
-    async def create(self, user: User) -> User:
+    async def create(self, user: User) -> Optional[User]:
+        """Возвращает None, если пользователь с таким email уже существует."""
+        pass
+
+    @abstractmethod
+    async def create_many(self, users: List[User]) -> List[User]:
         pass
 
     @abstractmethod
     async def get_by_id(self, user_id: int) -> Optional[User]:
         pass
 
+    @abstractmethod
+    async def get_many(self, user_ids: List[int]) -> List[User]:
+        pass
+
     @abstractmethod
     async def get_by_email(self, email: str) -> Optional[User]:
         pass
 
     @abstractmethod
-    async def get_all(self, limit: int = 100, offset: int = 0) -> List[User]:
+    async def get_existing_ids(self, user_ids: List[int]) -> Set[int]:
+        pass
+
+    @abstractmethod
+    async def get_existing_emails(self, emails: List[str]) -> Set[str]:
+        pass
+
+    @abstractmethod
+    async def get_all(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> List[User]:
+        pass
+
+    @abstractmethod
+    async def count(self, mode: str = "exact", cap: Optional[int] = None) -> TotalCount:
+        """Число пользователей в режиме exact, estimated или capped."""
         pass
 
     @abstractmethod
     async def update(self, user: User) -> Optional[User]:
         pass
 
+    @abstractmethod
+    async def update_fields(
+        self,
+        user_id: int,
+        email: Optional[str] = None,
+        name: Optional[str] = None,
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> Optional[User]:
+        """
+        Меняет только переданные поля. expected_versions - допустимые updated_at (If-Match):
+        если текущая версия не из списка, строка не меняется и возвращается None.
+        """
+        pass
+
     @abstractmethod
     async def delete(self, user_id: int) -> bool:
         pass
 
+    @abstractmethod
+    async def delete_many(self, user_ids: List[int]) -> List[int]:
+        """Удаляет пользователей одним запросом; возвращает id тех, что были удалены."""
+        pass
+
+    @abstractmethod
+    def export(
+        self,
+        fmt: str,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        """Потоковая выгрузка пользователей в формате csv, ndjson или binary."""
+        pass
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+class _Batch:
+    __slots__ = ("loop", "partition", "futures", "created_at", "dispatched")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, partition: Hashable, created_at: float):
+        self.loop = loop
+        self.partition = partition
+        self.futures: Dict[Hashable, asyncio.Future] = {}
+        self.created_at = created_at
+        self.dispatched = False
+
+
+class BatchLoader:
+    """
+    DataLoader: склеивает load(key), вызванные в пределах одного тика event loop
+    (или окна window секунд), в один вызов batch_fn со списком уникальных ключей.
+
+    batch_fn возвращает найденные сущности; key достаёт из сущности её ключ.
+    Ключам без результата возвращается None.
+
+    batch_fn выполняется в контексте (contextvars) вызова, открывшего пакет. partition
+    разделяет пакеты по контексту: load с разным partition() в один пакет не попадают.
+
+    Ключ, для которого loadable(key) ложно, сразу получает None и в пакет не попадает:
+    ключ, который batch_fn не примет (id вне int4), уронил бы весь пакет с чужими ключами.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Hashable]], Awaitable[List[Any]]],
+        key: Callable[[Any], Hashable] = lambda entity: entity.id,
+        window: float = 0.0,
+        max_batch_size: int = 500,
+        clock: Callable[[], float] = time.perf_counter,
+        partition: Callable[[], Hashable] = lambda: None,
+        loadable: Callable[[Hashable], bool] = lambda key: True,
+    ):
+        self.batch_fn = batch_fn
+        self.partition = partition
+        self.loadable = loadable
+        self.key = key
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._clock = clock
+        self._batches: Dict[Hashable, _Batch] = {}
+        self.requests = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.keys_loaded = 0
+        self.max_batch = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_query_time = 0.0
+
+    async def load(self, key: Hashable) -> Any:
+        if not self.loadable(key):
+            return None
+        loop = asyncio.get_running_loop()
+        partition = self.partition()
+        batch = self._batches.get(partition)
+        if batch is None or batch.loop is not loop:
+            batch = self._batches[partition] = _Batch(loop, partition, self._clock())
+            if self.window > 0:
+                loop.call_later(self.window, self._dispatch, batch)
+            else:
+                loop.call_soon(self._dispatch, batch)
+
+        self.requests += 1
+        future = batch.futures.get(key)
+        if future is None:
+            future = batch.futures[key] = loop.create_future()
+            if len(batch.futures) >= self.max_batch_size:
+                self._dispatch(batch)
+        else:
+            self.deduplicated += 1
+        # future общий для всех ожидающих ключ: отмена одного не должна отменять остальных
+        return await asyncio.shield(future)
+
+    def _dispatch(self, batch: _Batch) -> None:
+        if self._batches.get(batch.partition) is batch:
+            del self._batches[batch.partition]
+        if batch.dispatched:
+            return
+        batch.dispatched = True
+        batch.loop.create_task(self._run(batch))
+
+    async def _run(self, batch: _Batch) -> None:
+        keys = list(batch.futures)
+        started = self._clock()
+        wait = started - batch.created_at
+        self.batches += 1
+        self.keys_loaded += len(keys)
+        self.max_batch = max(self.max_batch, len(keys))
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        try:
+            entities = await self.batch_fn(keys)
+        except Exception as e:
+            self.errors += 1
+            for future in batch.futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.total_query_time += self._clock() - started
+
+        found = {self.key(entity): entity for entity in entities}
+        for key, future in batch.futures.items():
+            if not future.done():
+                future.set_result(found.get(key))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "deduplicated": self.deduplicated,
+            "batches": self.batches,
+            "keys_loaded": self.keys_loaded,
+            "avg_batch_size": self.keys_loaded / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch,
+            "avg_wait_ms": self.total_wait / self.batches * 1000 if self.batches else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+            "avg_query_ms": self.total_query_time / self.batches * 1000 if self.batches else 0.0,
+            "errors": self.errors,
+        }
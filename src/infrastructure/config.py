@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,9 +11,77 @@ class Settings(BaseSettings):
     database_name: str = "cleanarch_db"
     database_user: str = "postgres"
     database_password: str = "postgres"
+    database_pool_min_size: int = 1
+    database_pool_max_size: int = 20
+    database_acquire_timeout: float = 10.0
+    database_statement_cache_size: int = 1024
+    database_plan_cache_mode: str = "auto"
+    database_read_hosts: str = ""
+    database_read_strategy: str = "round_robin"
+    database_replica_max_lag_seconds: float = 1.0
+    database_replica_lag_check_interval: float = 1.0
+    database_read_your_writes_seconds: float = 5.0
+    database_connection_budget: int = 80
     app_host: str = "0.0.0.0"
     app_port: int = 8000
     debug: bool = False
+    app_workers: int = 0
+    app_reuse_port: bool = False
+    app_backlog: int = 2048
+    app_keepalive_timeout: int = 5
+    app_limit_concurrency: int = 0
+    app_limit_max_requests: int = 0
+    app_loop: str = "auto"
+    app_http: str = "auto"
+    app_graceful_timeout: int = 30
+    log_queue_enabled: bool = True
+    log_queue_size: int = 10000
+    log_format: str = "text"
+    # каталог файлов логов; пусто - logs/ в корне проекта
+    log_dir: str = ""
+    # каталог снимков метрик воркеров для общего /metrics; supervisor создаёт временный, если пусто
+    metrics_multiprocess_dir: str = ""
+    metrics_flush_interval_seconds: float = 1.0
+    slow_query_threshold_ms: float = 200.0
+    slow_query_explain_sample_rate: float = 0.1
+    slow_query_explain_interval_seconds: float = 60.0
+    slow_query_explain_timeout_seconds: float = 10.0
+    slow_query_redact_params: bool = True
+    pagination_default_limit: int = 100
+    pagination_max_limit: int = 1000
+    pagination_total_cap: int = 10000
+    pagination_exact_total_below: int = 1000
+    pagination_count_cache_ttl_seconds: float = 10.0
+    search_max_candidates: int = 10000
+    bulk_chunk_size: int = 1000
+    batch_max_ids: int = 1000
+    export_queue_size: int = 16
+    migration_lock_wait: bool = True
+    migration_lock_timeout_seconds: float = 5.0
+    migration_retries: int = 3
+    migration_retry_delay_seconds: float = 1.0
+    comment_partitions_ahead: int = 3
+    comment_partitions_lock_timeout_seconds: float = 5.0
+    comment_retention_months: int = 0
+    comment_retention_mode: str = "archive"
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 5
+    compression_zstd_level: int = 3
+    compression_route_levels: str = "/users/export=1,/comments/export=1"
+    compression_thread_threshold: int = 65536
+    # None - только при одном воркере: инвалидация не доходит до кэшей других воркеров
+    cache_enabled: Optional[bool] = None
+    # точные count кэшируются и при нескольких воркерах: устаревание у соседей - не дольше
+    # pagination_count_cache_ttl_seconds
+    count_cache_enabled: bool = True
+    cache_max_size: int = 10000
+    cache_ttl_seconds: float = 30.0
+    cache_negative_ttl_seconds: float = 5.0
+    batching_enabled: bool = True
+    batching_window_ms: float = 0.0
+    batching_max_size: int = 500
+    columnar_comment_lists: bool = True
 
 
 settings = Settings()
@@ -1,44 +1,316 @@
+import asyncio
 import asyncpg
-from typing import Optional
+import time
+from contextlib import suppress
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
 
+from src.infrastructure.cache import LRUTTLCache
 from src.infrastructure.config import settings
+from src.infrastructure.database.routing import ReadRouter, Replica, client_key, parse_hosts
+from src.infrastructure.database.slow_queries import SlowQueryLog
+from src.infrastructure.database.statements import (
+    Statement,
+    StatementRegistry,
+    statements,
+)
+from src.infrastructure.metrics import metrics
+
+Query = Union[str, Statement]
+
+# ошибки, после которых чтение с реплики повторяется на primary
+REPLICA_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.InterfaceError, asyncpg.CannotConnectNowError)
+
+PRIMARY = "primary"
+
+ACQUIRE_WAIT = metrics.histogram(
+    "db_pool_acquire_wait_seconds", "Time spent waiting for a pooled connection", ["pool"]
+)
+ACQUIRE_TIMEOUTS = metrics.counter(
+    "db_pool_acquire_timeouts_total", "Connection acquisitions that hit the timeout", ["pool"]
+)
+QUERY_DURATION = metrics.histogram(
+    "db_query_duration_seconds", "Query latency by repository statement", ["query"]
+)
+# запросы, не объявленные в реестре (выгрузки, COPY), идут одной меткой
+ADHOC_QUERY = "adhoc"
+
+
+def pool_max_size() -> int:
+    """
+    max_size пула одного процесса. database_connection_budget - соединений на один сервер БД
+    на все воркеры (APP_WORKERS выставляет supervisor), 0 - без ограничения. При reload
+    supervisor'а новый воркер поднимается до остановки старого - в бюджет входит ещё один пул.
+    """
+    budget = settings.database_connection_budget
+    if budget <= 0:
+        return settings.database_pool_max_size
+    processes = settings.app_workers + 1 if settings.app_workers > 0 else 1
+    return max(1, min(settings.database_pool_max_size, budget // processes))
+
+
+class _Acquire:
+    """pool.acquire с замером ожидания свободного соединения."""
+
+    __slots__ = ("pool", "name", "connection")
+
+    def __init__(self, pool: asyncpg.Pool, name: str):
+        self.pool = pool
+        self.name = name
+        self.connection = None
+
+    async def __aenter__(self):
+        started = time.perf_counter()
+        try:
+            self.connection = await self.pool.acquire(timeout=settings.database_acquire_timeout)
+        except asyncio.TimeoutError:
+            ACQUIRE_TIMEOUTS.inc(self.name)
+            raise
+        finally:
+            ACQUIRE_WAIT.observe(time.perf_counter() - started, self.name)
+        return self.connection
+
+    async def __aexit__(self, *exc_info):
+        await self.pool.release(self.connection)
 
 
 class DatabaseConnection:
-    def __init__(self):
+    def __init__(self, registry: StatementRegistry = statements):
         self.pool: Optional[asyncpg.Pool] = None
+        self.registry = registry
+        self.router = ReadRouter([])
+        self._lag_monitor: Optional[asyncio.Task] = None
+        self.slow_queries = SlowQueryLog(
+            explain=self._explain,
+            threshold=settings.slow_query_threshold_ms / 1000,
+            explain_sample_rate=settings.slow_query_explain_sample_rate,
+            explain_interval=settings.slow_query_explain_interval_seconds,
+            redact_params=settings.slow_query_redact_params,
+        )
+
+    def _create_pool(self, host: str, port: int, min_size: int):
+        return asyncpg.create_pool(
+            host=host,
+            port=port,
+            database=settings.database_name,
+            user=settings.database_user,
+            password=settings.database_password,
+            min_size=min(min_size, pool_max_size()),
+            max_size=pool_max_size(),
+            timeout=30.0,
+            command_timeout=60.0,
+            # запросы реестра живут в кэше statement'ов соединения: он вмещает весь реестр
+            # и не вытесняет записи по простою (по умолчанию asyncpg - через 300 с)
+            statement_cache_size=max(settings.database_statement_cache_size, len(self.registry)),
+            max_cached_statement_lifetime=0,
+            server_settings={"plan_cache_mode": settings.database_plan_cache_mode},
+        )
     
     async def connect(self):
         if not self.pool:
-            self.pool = await asyncpg.create_pool(
-                host=settings.database_host,
-                port=settings.database_port,
-                database=settings.database_name,
-                user=settings.database_user,
-                password=settings.database_password,
-                min_size=1,
-                max_size=20,
-                timeout=30.0,
-                command_timeout=60.0,
+            self.pool = await self._create_pool(
+                settings.database_host,
+                settings.database_port,
+                settings.database_pool_min_size,
             )
+            replicas = []
+            for host, port in parse_hosts(settings.database_read_hosts, settings.database_port):
+                # min_size=0: недоступная реплика не мешает старту, она просто не получит чтений
+                replica = Replica(host, port, await self._create_pool(host, port, 0))
+                await replica.check_lag()
+                replicas.append(replica)
+            self.router = ReadRouter(
+                replicas,
+                strategy=settings.database_read_strategy,
+                max_lag=settings.database_replica_max_lag_seconds,
+                recent_writes=LRUTTLCache(
+                    max_size=settings.cache_max_size,
+                    ttl=settings.database_read_your_writes_seconds,
+                ),
+            )
+            if replicas:
+                self._lag_monitor = asyncio.create_task(self._monitor_lag())
+
+    async def _monitor_lag(self) -> None:
+        while True:
+            await asyncio.sleep(settings.database_replica_lag_check_interval)
+            for replica in self.router.replicas:
+                await replica.check_lag()
     
     async def disconnect(self):
+        await self.slow_queries.drain()
+        if self._lag_monitor:
+            self._lag_monitor.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._lag_monitor
+            self._lag_monitor = None
+        for replica in self.router.replicas:
+            await replica.pool.close()
+        self.router = ReadRouter([])
         if self.pool:
             await self.pool.close()
             self.pool = None
     
-    async def execute(self, query: str, *args):
-        async with self.pool.acquire(timeout=10.0) as connection:
-            return await connection.execute(query, *args)
+    def acquire(self):
+        """Соединение primary для записи (транзакции, COPY в таблицу)."""
+        self.router.record_write(client_key.get())
+        return _Acquire(self.pool, PRIMARY)
+
+    def read_partition(self) -> Optional[str]:
+        """
+        Ключ пакета BatchLoader: клиенты с read-your-writes читают с primary и склеиваются
+        каждый отдельно, остальные - в общий пакет для реплик.
+        """
+        client = client_key.get()
+        return client if self.router.needs_primary(client) else None
+
+    def pool_stats(self) -> Dict[str, Dict[Tuple[str, ...], int]]:
+        pools = []
+        if self.pool:
+            pools.append((PRIMARY, self.pool))
+        pools.extend((replica.name, replica.pool) for replica in self.router.replicas)
+        stats = {"size": {}, "idle": {}, "in_use": {}, "max": {}}
+        for name, pool in pools:
+            size, idle = pool.get_size(), pool.get_idle_size()
+            stats["size"][(name,)] = size
+            stats["idle"][(name,)] = idle
+            stats["in_use"][(name,)] = size - idle
+            stats["max"][(name,)] = pool.get_max_size()
+        return stats
+    
+    async def _run(self, connection, method: str, query: Query, args: tuple, record_class=None):
+        if isinstance(query, str):
+            started = time.perf_counter()
+            try:
+                if method in ("execute", "fetchval"):
+                    return await getattr(connection, method)(query, *args)
+                return await getattr(connection, method)(query, *args, record_class=record_class)
+            finally:
+                elapsed = time.perf_counter() - started
+                QUERY_DURATION.observe(elapsed, ADHOC_QUERY)
+                self.slow_queries.observe(query, args, elapsed)
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            try:
+                return await self._run_cached(connection, method, query, args)
+            except (asyncpg.InvalidCachedStatementError, asyncpg.InvalidSQLStatementNameError):
+                # план устарел после изменения схемы или statement сброшен (DEALLOCATE/DISCARD) -
+                # сбрасываем кэш statement'ов и готовим заново; в транзакции повтор невозможен
+                if connection.is_in_transaction():
+                    raise
+                await connection.reload_schema_state()
+                return await self._run_cached(connection, method, query, args)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            query.record(elapsed, failed)
+            QUERY_DURATION.observe(elapsed, query.name)
+            self.slow_queries.observe(query.sql, args, elapsed, query.name)
+
+    async def _explain(self, sql: str, args: tuple):
+        async with _Acquire(self.pool, PRIMARY) as connection:
+            return await connection.fetchval(
+                f"explain (analyze, buffers, format json) {sql}",
+                *args,
+                timeout=settings.slow_query_explain_timeout_seconds,
+            )
+
+    @staticmethod
+    async def _run_cached(connection, method: str, query: Statement, args: tuple):
+        if method in ("execute", "fetchval"):
+            return await getattr(connection, method)(query.sql, *args)
+        return await getattr(connection, method)(query.sql, *args, record_class=query.record_class)
+
+    async def _dispatch(self, method: str, query: Query, args: tuple, record_class, connection):
+        if connection is not None:
+            return await self._run(connection, method, query, args, record_class)
+
+        client = client_key.get()
+        if not (isinstance(query, Statement) and query.readonly):
+            try:
+                async with _Acquire(self.pool, PRIMARY) as connection:
+                    return await self._run(connection, method, query, args, record_class)
+            finally:
+                self.router.record_write(client)
+
+        replica = self.router.choose(client)
+        if replica is not None:
+            replica.in_flight += 1
+            try:
+                async with _Acquire(replica.pool, replica.name) as connection:
+                    return await self._run(connection, method, query, args, record_class)
+            except REPLICA_ERRORS:
+                # реплика недоступна - до следующей проверки отставания читаем с primary
+                replica.lag = float("inf")
+            finally:
+                replica.in_flight -= 1
+        async with _Acquire(self.pool, PRIMARY) as connection:
+            return await self._run(connection, method, query, args, record_class)
+
+    async def execute(self, query: Query, *args, connection=None):
+        return await self._dispatch("execute", query, args, None, connection)
     
-    async def fetch(self, query: str, *args):
-        async with self.pool.acquire(timeout=10.0) as connection:
-            return await connection.fetch(query, *args)
+    async def fetch(self, query: Query, *args, record_class=None, connection=None):
+        return await self._dispatch("fetch", query, args, record_class, connection)
     
-    async def fetchrow(self, query: str, *args):
-        async with self.pool.acquire(timeout=10.0) as connection:
-            return await connection.fetchrow(query, *args)
+    async def fetchrow(self, query: Query, *args, record_class=None, connection=None):
+        return await self._dispatch("fetchrow", query, args, record_class, connection)
+
+    async def fetchval(self, query: Query, *args, connection=None):
+        return await self._dispatch("fetchval", query, args, None, connection)
+
+    async def copy_from_query_stream(
+        self, query: str, *args, queue_size: int = 16, **copy_options
+    ) -> AsyncIterator[bytes]:
+        """
+        Стримит результат COPY (query) TO STDOUT чанками.
+
+        Очередь ограничена: пока потребитель не заберёт данные, asyncpg не читает
+        сокет и сервер притормаживает COPY - память не растёт с размером выгрузки.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        async with _Acquire(self.pool, PRIMARY) as connection:
+            async def produce():
+                try:
+                    await connection.copy_from_query(
+                        query, *args, output=lambda data: queue.put(bytes(data)), **copy_options
+                    )
+                except asyncio.CancelledError:
+                    # потребитель ушёл: sentinel ему не нужен, а очередь может быть полной
+                    raise
+                except Exception:
+                    await queue.put(None)
+                    raise
+                await queue.put(None)
+
+            task = asyncio.create_task(produce())
+            try:
+                while True:
+                    chunk = await queue.get()
+                    if chunk is None:
+                        break
+                    yield chunk
+                await task
+            finally:
+                task.cancel()
+                # соединение вернётся в пул только после остановки COPY; asyncio.wait не
+                # глотает отмену самого вызывающего, в отличие от suppress(CancelledError)
+                await asyncio.wait([task])
 
 
 db_connection = DatabaseConnection()
 
+
+def _pool_gauge(stat: str):
+    return lambda: db_connection.pool_stats()[stat]
+
+
+metrics.gauge_function("db_pool_connections", "Open connections in the pool", ["pool"], _pool_gauge("size"))
+metrics.gauge_function("db_pool_idle_connections", "Idle connections in the pool", ["pool"], _pool_gauge("idle"))
+metrics.gauge_function(
+    "db_pool_in_use_connections", "Connections checked out of the pool", ["pool"], _pool_gauge("in_use")
+)
+metrics.gauge_function("db_pool_max_connections", "Maximum pool size", ["pool"], _pool_gauge("max"))
@@ -0,0 +1,80 @@
+import json
+from typing import Any, Optional, Sequence
+
+from src.domain.entities.total_count import TotalCount
+from src.infrastructure.config import settings
+from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.statements import statements
+
+# reltuples на момент последнего analyze, пересчитанный на текущий размер таблицы - так же
+# оценивает планировщик; у секционированной таблицы - сумма по партициям (у родителя своих
+# страниц нет). null, если ни одну партицию ещё не анализировали
+_RELTUPLES = """
+select sum(c.reltuples / c.relpages
+           * (pg_relation_size(c.oid) / current_setting('block_size')::int))::bigint
+from pg_class c
+where (c.oid = '{table}'::regclass or c.oid in (select relid from pg_partition_tree('{table}') where isleaf))
+  and c.reltuples >= 0 and c.relpages > 0
+"""
+
+
+class CountQueries:
+    """
+    Три способа посчитать строки таблицы под фильтром where (с параметрами $1..$n):
+    exact - count(*); capped - count(*) по не более чем cap строкам; estimated - reltuples
+    без фильтра или оценка планировщика (EXPLAIN) с фильтром. Оценка ниже
+    settings.pagination_exact_total_below заменяется точным подсчётом - он там дешёвый.
+    """
+
+    def __init__(self, name: str, table: str, where: str = "", params: int = 0):
+        self.params = params
+        self.exact = statements.register(
+            f"{name}.count", f"select count(*) from {table} {where}", readonly=True
+        )
+        self.capped = statements.register(
+            f"{name}.count_capped",
+            f"select count(*) from (select 1 from {table} {where} limit ${params + 1}) as capped",
+            readonly=True,
+        )
+        self.estimate = statements.register(
+            f"{name}.estimate",
+            f"explain (format json) select 1 from {table} {where}",
+            readonly=True,
+        )
+        self.reltuples = None if where else statements.register(
+            f"{name}.reltuples", _RELTUPLES.format(table=table), readonly=True
+        )
+
+    async def count(
+        self, db: DatabaseConnection, mode: str, args: Sequence[Any] = (), cap: Optional[int] = None
+    ) -> TotalCount:
+        if mode == "exact":
+            return TotalCount(await db.fetchval(self.exact, *args), exact=True)
+        if mode == "capped":
+            return await self._capped(db, args, cap or settings.pagination_total_cap)
+        if mode == "estimated":
+            estimate = await self._estimate(db, args)
+            exact_below = settings.pagination_exact_total_below
+            if estimate < exact_below:
+                counted = await self._capped(db, args, exact_below)
+                if counted.exact:
+                    return counted
+            return TotalCount(estimate, exact=False)
+        raise ValueError(f"Unknown count mode: {mode}")
+
+    async def _capped(self, db: DatabaseConnection, args: Sequence[Any], cap: int) -> TotalCount:
+        # на одну строку больше cap - чтобы отличить "ровно cap" от "больше"
+        value = await db.fetchval(self.capped, *args, cap + 1)
+        if value > cap:
+            return TotalCount(cap, exact=False)
+        return TotalCount(value, exact=True)
+
+    async def _estimate(self, db: DatabaseConnection, args: Sequence[Any]) -> int:
+        if self.reltuples is not None:
+            value = await db.fetchval(self.reltuples)
+            if value is not None:
+                return value
+        plan = await db.fetchval(self.estimate, *args)
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
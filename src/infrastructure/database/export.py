@@ -0,0 +1,32 @@
+from typing import Any, Dict, List, Tuple
+
+EXPORT_FORMATS = ("csv", "ndjson", "binary")
+
+
+def build_export_query(select_sql: str, fmt: str) -> Tuple[str, Dict[str, Any]]:
+    """Возвращает запрос и опции copy_from_query для формата выгрузки."""
+    if fmt == "csv":
+        return select_sql, {"format": "csv", "header": True}
+    if fmt == "binary":
+        return select_sql, {"format": "binary"}
+    if fmt == "ndjson":
+        # json не содержит сырых управляющих символов, поэтому csv с quote/delimiter
+        # из \x01/\x02 отдаёт строки row_to_json как есть, без экранирования text-формата
+        return (
+            f"select row_to_json(t) from ({select_sql}) t",
+            {"format": "csv", "quote": "\x01", "delimiter": "\x02"},
+        )
+    raise ValueError(f"Unsupported export format {fmt}")
+
+
+def build_where(conditions: List[Tuple[str, Any]]) -> Tuple[str, List[Any]]:
+    """conditions - пары ("created_at >= {}", value); None-значения пропускаются."""
+    clauses = []
+    args = []
+    for template, value in conditions:
+        if value is None:
+            continue
+        args.append(value)
+        clauses.append(template.format(f"${len(args)}"))
+    where = f"where {' and '.join(clauses)}" if clauses else ""
+    return where, args
@@ -1,7 +1,23 @@
 import asyncio
+import hashlib
 import asyncpg
 from pathlib import Path
 from src.infrastructure.config import settings
+from src.infrastructure.database.migration_script import ConcurrentIndex, concurrent_index, parse_options, split_statements
+from src.infrastructure.database.partitions import archive_comment_partitions, ensure_comment_partitions
+
+# блокировку не дождались - повторяем; остальные ошибки миграции не временные
+RETRYABLE = (asyncpg.exceptions.LockNotAvailableError, asyncpg.exceptions.DeadlockDetectedError)
+# ключ session advisory lock'а миграций - один на БД для всех реплик
+MIGRATION_LOCK_ID = int.from_bytes(hashlib.blake2b(b"schema_migrations", digest_size=8).digest(), "big", signed=True)
+
+
+def _child_index_name(table: str, index: str) -> str:
+    name = f"{table}_{index}".replace('"', "")
+    if len(name) > 63:
+        # длиннее NAMEDATALEN Postgres обрезает молча - обрезаем сами, с хешем от совпадений
+        name = f"{name[:54]}_{hashlib.blake2b(name.encode(), digest_size=4).hexdigest()}"
+    return name
 
 
 class MigrationRunner:
@@ -9,58 +25,110 @@ class MigrationRunner:
         self.migrations_dir = Path(migrations_dir)
         self.migrations_dir.mkdir(parents=True, exist_ok=True)
     
+    async def _connect(self):
+        return await asyncpg.connect(
+            host=settings.database_host,
+            port=settings.database_port,
+            database=settings.database_name,
+            user=settings.database_user,
+            password=settings.database_password,
+        )
+
     async def _ensure_migrations_table(self, conn):
         await conn.execute("""
             create table if not exists schema_migrations (
                 version varchar(255) primary key,
                 applied_at timestamp default current_timestamp
-            )
+            );
+            alter table schema_migrations add column if not exists checksum text;
         """)
     
     async def _get_applied_migrations(self, conn):
-        rows = await conn.fetch("select version from schema_migrations order by version")
-        return {row['version'] for row in rows}
-    
-    async def _get_pending_migrations(self, conn):
-        applied = await self._get_applied_migrations(conn)
-        all_migrations = sorted([
-            f.stem for f in self.migrations_dir.glob("*.sql")
-        ])
-        return [m for m in all_migrations if m not in applied]
+        rows = await conn.fetch("select version, checksum from schema_migrations order by version")
+        return {row['version']: row['checksum'] for row in rows}
+
+    def _get_migration_files(self):
+        """version -> (sql, checksum) в порядке применения."""
+        files = {}
+        for path in sorted(self.migrations_dir.glob("*.sql")):
+            sql = path.read_text()
+            # checksum не зависит от переводов строк (checkout на Windows)
+            checksum = hashlib.sha256(sql.replace("\r\n", "\n").encode()).hexdigest()
+            files[path.stem] = (sql, checksum)
+        return files
+
+    async def _is_current(self, conn, files) -> bool:
+        # одним запросом, без DDL и блокировок: все файлы применены с теми же checksum'ами.
+        # Рестарт десятка реплик не встаёт в очередь за advisory lock
+        try:
+            return await conn.fetchval(
+                """
+                select count(*) = cardinality($1::text[])
+                from schema_migrations m
+                join unnest($1::text[], $2::text[]) as f(version, checksum)
+                    on m.version = f.version and m.checksum = f.checksum
+                """,
+                list(files),
+                [checksum for _, checksum in files.values()],
+            )
+        except (asyncpg.exceptions.UndefinedTableError, asyncpg.exceptions.UndefinedColumnError):
+            # первый запуск или schema_migrations ещё без checksum
+            return False
+
+    def _verify_checksums(self, applied, files):
+        changed = [
+            version for version, checksum in applied.items()
+            if checksum is not None and version in files and files[version][1] != checksum
+        ]
+        if changed:
+            raise RuntimeError(f"Applied migrations were changed on disk: {', '.join(changed)}")
+
+    async def _lock(self, conn) -> bool:
+        """Одна реплика мигрирует, остальные ждут её (или пропускают при migration_lock_wait = false)."""
+        if not settings.migration_lock_wait:
+            return await conn.fetchval("select pg_try_advisory_lock($1)", MIGRATION_LOCK_ID)
+        if not await conn.fetchval("select pg_try_advisory_lock($1)", MIGRATION_LOCK_ID):
+            print("Waiting for another instance to finish migrations")
+            await conn.execute("select pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        return True
     
     async def migrate(self):
-        conn = await asyncpg.connect(
-            host=settings.database_host,
-            port=settings.database_port,
-            database=settings.database_name,
-            user=settings.database_user,
-            password=settings.database_password,
-        )
+        conn = await self._connect()
         
         try:
-            await self._ensure_migrations_table(conn)
-            pending = await self._get_pending_migrations(conn)
-            
-            if not pending:
-                print("No pending migrations")
+            files = self._get_migration_files()
+            if await self._is_current(conn, files):
+                print(f"✅ Schema is current ({len(files)} migration(s))")
                 return
-            
-            for migration_name in pending:
-                print(f"Applying migration: {migration_name}")
+
+            if not await self._lock(conn):
+                print("Another instance is applying migrations, skipping")
+                return
+            try:
+                await self._ensure_migrations_table(conn)
+                applied = await self._get_applied_migrations(conn)
+                self._verify_checksums(applied, files)
+                # применённые до появления checksum'ов - принимаем текущие файлы
+                await conn.executemany(
+                    "update schema_migrations set checksum = $2 where version = $1 and checksum is null",
+                    [(version, files[version][1]) for version, checksum in applied.items()
+                     if checksum is None and version in files],
+                )
+                pending = [version for version in files if version not in applied]
                 
-                migration_file = self.migrations_dir / f"{migration_name}.sql"
-                sql = migration_file.read_text()
+                if not pending:
+                    print("No pending migrations")
+                    return
                 
-                async with conn.transaction():
-                    await conn.execute(sql)
-                    await conn.execute(
-                        "insert into schema_migrations (version) values ($1)",
-                        migration_name
-                    )
+                for migration_name in pending:
+                    print(f"Applying migration: {migration_name}")
+                    sql, checksum = files[migration_name]
+                    await self._apply(conn, migration_name, sql, checksum)
+                    print(f"✅ Applied: {migration_name}")
                 
-                print(f"✅ Applied: {migration_name}")
-            
-            print(f"\n✅ Successfully applied {len(pending)} migration(s)")
+                print(f"\n✅ Successfully applied {len(pending)} migration(s)")
+            finally:
+                await conn.execute("select pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
         
         except Exception as e:
             print(f"❌ Migration failed: {e}")
@@ -68,21 +136,104 @@ class MigrationRunner:
         finally:
             await conn.close()
     
-    async def status(self):
-        conn = await asyncpg.connect(
-            host=settings.database_host,
-            port=settings.database_port,
-            database=settings.database_name,
-            user=settings.database_user,
-            password=settings.database_password,
+    async def _apply(self, conn, name: str, sql: str, checksum: str):
+        options = parse_options(sql)
+        timeouts = {"lock_timeout": options.lock_timeout or f"{int(settings.migration_lock_timeout_seconds * 1000)}ms"}
+        if options.statement_timeout:
+            timeouts["statement_timeout"] = options.statement_timeout
+        retries = settings.migration_retries if options.retries is None else options.retries
+
+        if options.transactional:
+            async def apply():
+                async with conn.transaction():
+                    await self._set_timeouts(conn, timeouts, local=True)
+                    await conn.execute(sql)
+                    await self._record(conn, name, checksum)
+
+            await self._retrying(name, retries, apply)
+            return
+
+        # по одному statement'у: несколько в одном запросе Postgres выполняет одной транзакцией.
+        # Выполненные до ошибки остаются - такие миграции пишутся идемпотентными
+        def notice(connection, message):
+            print(f"   {message.message}")
+
+        conn.add_log_listener(notice)
+        await self._set_timeouts(conn, timeouts, local=False)
+        try:
+            for statement in split_statements(sql):
+                await self._retrying(name, retries, lambda: self._execute_outside_transaction(conn, statement))
+            await self._record(conn, name, checksum)
+        finally:
+            await conn.execute("reset lock_timeout; reset statement_timeout")
+            conn.remove_log_listener(notice)
+
+    async def _execute_outside_transaction(self, conn, statement: str):
+        index = concurrent_index(statement)
+        if index:
+            await self._create_index_concurrently(conn, index, index.table, index.name)
+        else:
+            await conn.execute(statement)
+
+    async def _create_index_concurrently(self, conn, index: ConcurrentIndex, table: str, name: str):
+        # на секционированной таблице concurrently не поддерживается: индекс создаётся только
+        # на родителе (невалидным), concurrently строится на каждой партиции и подключается -
+        # после последней родительский становится валидным
+        children = await conn.fetch(
+            "select inhrelid::regclass::text as child from pg_inherits where inhparent = to_regclass($1)", table
         )
+        is_partitioned = await conn.fetchval("select relkind = 'p' from pg_class where oid = to_regclass($1)", table)
+        if not is_partitioned:
+            await self._drop_invalid_index(conn, name)
+            await conn.execute(index.create(table, name))
+            return
+        await conn.execute(index.create(table, name, only=True))
+        for row in children:
+            child_name = _child_index_name(row["child"], name)
+            await self._create_index_concurrently(conn, index, row["child"], child_name)
+            attached = await conn.fetchval(
+                "select 1 from pg_inherits where inhrelid = to_regclass($1) and inhparent = to_regclass($2)",
+                child_name,
+                name,
+            )
+            if not attached:
+                await conn.execute(f"alter index {name} attach partition {child_name}")
+            print(f"   {child_name} built and attached")
+
+    async def _drop_invalid_index(self, conn, index: str):
+        # прерванный create index concurrently оставляет невалидный индекс, а if not exists
+        # его молча пропустит
+        valid = await conn.fetchval("select indisvalid from pg_index where indexrelid = to_regclass($1)", index)
+        if valid is False:
+            print(f"   Dropping invalid index {index}")
+            await conn.execute(f"drop index concurrently {index}")
+
+    async def _set_timeouts(self, conn, timeouts: dict, local: bool):
+        for key, value in timeouts.items():
+            await conn.execute("select set_config($1, $2, $3)", key, value, local)
+
+    async def _record(self, conn, name: str, checksum: str):
+        await conn.execute("insert into schema_migrations (version, checksum) values ($1, $2)", name, checksum)
+
+    async def _retrying(self, name: str, retries: int, action):
+        for attempt in range(retries + 1):
+            try:
+                return await action()
+            except RETRYABLE as e:
+                if attempt == retries:
+                    raise
+                delay = settings.migration_retry_delay_seconds * 2 ** attempt
+                print(f"⏳ {name}: {e.__class__.__name__}, retry {attempt + 1}/{retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def status(self):
+        conn = await self._connect()
         
         try:
             await self._ensure_migrations_table(conn)
             applied = await self._get_applied_migrations(conn)
-            all_migrations = sorted([
-                f.stem for f in self.migrations_dir.glob("*.sql")
-            ])
+            files = self._get_migration_files()
+            all_migrations = list(files)
             
             if not all_migrations:
                 print("\n⚠️  No migration files found")
@@ -92,7 +243,12 @@ class MigrationRunner:
             print("\nMigration Status:")
             print("-" * 70)
             for migration in all_migrations:
-                status = "✅ Applied" if migration in applied else "⏳ Pending"
+                if migration not in applied:
+                    status = "⏳ Pending"
+                elif applied[migration] not in (None, files[migration][1]):
+                    status = "⚠️  Changed"
+                else:
+                    status = "✅ Applied"
                 print(f"{migration:<55} {status}")
             print("-" * 70)
             
@@ -102,6 +258,77 @@ class MigrationRunner:
         finally:
             await conn.close()
 
+    async def rebuild_rollups(self):
+        """Пересчитывает rollup-таблицы комментариев (миграция 007) из comments."""
+        conn = await self._connect()
+        try:
+            async with conn.transaction():
+                drifted = await conn.fetchval("select rebuild_comment_rollups()")
+            print(f"✅ Rollups rebuilt, {drifted} drifted row(s) fixed")
+            months = await conn.fetchval("select rebuild_comment_id_ranges()")
+            print(f"✅ Comment id ranges extended for {months} month(s)")
+        finally:
+            await conn.close()
+
+    async def prepare_partitioning(self):
+        """
+        Онлайн-подготовка comments к миграции 010: всё, что читает таблицу целиком, делается
+        без блокировки записи (concurrently, not valid + validate). После неё 010 меняет только
+        каталог. Верхняя граница старой партиции - на два месяца после данных, чтобы записи
+        между подготовкой и миграцией не нарушили ограничение.
+        """
+        conn = await self._connect()
+        try:
+            if await conn.fetchval("select relkind = 'p' from pg_class where oid = 'comments'::regclass"):
+                print("comments is already partitioned")
+                return
+            timeout = int(settings.comment_partitions_lock_timeout_seconds * 1000)
+            await conn.execute(f"set lock_timeout = {timeout}")
+
+            await conn.execute(
+                "update comments set created_at = coalesce(updated_at, localtimestamp) where created_at is null"
+            )
+            await self._drop_invalid_index(conn, "comments_id_created_at_idx")
+            print("Building comments_id_created_at_idx concurrently")
+            await conn.execute(
+                "create unique index concurrently if not exists comments_id_created_at_idx on comments (id, created_at)"
+            )
+            cutoff = await conn.fetchval(
+                "select date_trunc('month', greatest(localtimestamp, max(created_at))) + interval '2 months' from comments"
+            )
+            await self._add_validated_check(conn, "comments_created_at_not_null", "created_at is not null")
+            await self._add_validated_check(conn, "comments_legacy_upper_bound", f"created_at < '{cutoff}'")
+            print(f"✅ comments prepared for partitioning, legacy partition ends at {cutoff}")
+        finally:
+            await conn.close()
+
+    async def _add_validated_check(self, conn, name: str, check: str):
+        exists = await conn.fetchval(
+            "select 1 from pg_constraint where conrelid = 'comments'::regclass and conname = $1", name
+        )
+        if not exists:
+            # not valid - мгновенно; validate читает таблицу, не блокируя запись
+            await conn.execute(f"alter table comments add constraint {name} check ({check}) not valid")
+        print(f"Validating {name}")
+        await conn.execute(f"alter table comments validate constraint {name}")
+
+    async def maintain_partitions(self):
+        """Создаёт партиции comments наперёд и применяет retention; для cron."""
+        conn = await self._connect()
+        try:
+            for name in await ensure_comment_partitions(conn):
+                print(f"✅ Created: {name}")
+            for name in await archive_comment_partitions(conn):
+                print(f"✅ Detached: {name} ({settings.comment_retention_mode})")
+            rows = await conn.fetch(
+                "select partition::text, coalesce(from_ts || ' .. ' || to_ts, 'default') from comment_partitions()"
+            )
+            print("\nPartitions:")
+            for name, bounds in rows:
+                print(f"{name:<30} {bounds}")
+        finally:
+            await conn.close()
+
 
 async def main():
     import sys
@@ -109,6 +336,12 @@ async def main():
     
     if len(sys.argv) > 1 and sys.argv[1] == "status":
         await runner.status()
+    elif len(sys.argv) > 1 and sys.argv[1] == "rebuild-rollups":
+        await runner.rebuild_rollups()
+    elif len(sys.argv) > 1 and sys.argv[1] == "prepare-partitioning":
+        await runner.prepare_partitioning()
+    elif len(sys.argv) > 1 and sys.argv[1] == "partitions":
+        await runner.maintain_partitions()
     else:
         await runner.migrate()
 
@@ -0,0 +1,84 @@
+"""
+Разбор файла миграции: директивы в комментариях и разбиение на отдельные statement'ы.
+
+    -- migrate: no-transaction
+    -- migrate: lock_timeout=2s, statement_timeout=10min, retries=5
+
+no-transaction - statement'ы выполняются по одному вне транзакции (create index concurrently,
+call batched_update(...)); таймауты - значения в формате Postgres, retries - сколько раз
+повторить при lock_timeout или deadlock.
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+_DIRECTIVE = re.compile(r"^--\s*migrate:\s*(.+?)\s*$", re.M)
+# литералы и комментарии, внутри которых ';' не разделяет statement'ы, и сам разделитель
+_TOKENS = re.compile(
+    r"\$([A-Za-z_]\w*|)\$.*?\$\1\$|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/|;", re.S
+)
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_CONCURRENT_INDEX = re.compile(
+    r"^\s*create\s+(unique\s+)?index\s+concurrently\s+(?:if\s+not\s+exists\s+)?([\w.\"]+)"
+    r"\s+on\s+(?:only\s+)?([\w.\"]+)\s+(.+)$",
+    re.I | re.S,
+)
+
+
+@dataclass
+class MigrationOptions:
+    transactional: bool = True
+    lock_timeout: Optional[str] = None
+    statement_timeout: Optional[str] = None
+    retries: Optional[int] = None
+
+
+def parse_options(sql: str) -> MigrationOptions:
+    options = MigrationOptions()
+    for line in _DIRECTIVE.findall(sql):
+        for item in filter(None, re.split(r"[\s,]+", line)):
+            key, _, value = item.partition("=")
+            if key == "no-transaction" and not value:
+                options.transactional = False
+            elif key in ("lock_timeout", "statement_timeout") and value:
+                setattr(options, key, value)
+            elif key == "retries" and value.isdigit():
+                options.retries = int(value)
+            else:
+                raise ValueError(f"Unknown migration directive: {item}")
+    return options
+
+
+def split_statements(sql: str) -> List[str]:
+    """Statement'ы без завершающей ';'; куски из одних комментариев отбрасываются."""
+    statements, start = [], 0
+    for match in _TOKENS.finditer(sql):
+        if match.group() == ";":
+            statements.append(sql[start:match.start()])
+            start = match.end()
+    statements.append(sql[start:])
+    return [s.strip() for s in statements if _COMMENTS.sub("", s).strip()]
+
+
+@dataclass
+class ConcurrentIndex:
+    """create [unique] index concurrently name on table definition."""
+
+    name: str
+    table: str
+    definition: str
+    unique: bool = False
+
+    def create(self, table: str, name: str, only: bool = False) -> str:
+        return (
+            f"create {'unique ' if self.unique else ''}index {'' if only else 'concurrently '}"
+            f"if not exists {name} on {'only ' if only else ''}{table} {self.definition}"
+        )
+
+
+def concurrent_index(statement: str) -> Optional[ConcurrentIndex]:
+    match = _CONCURRENT_INDEX.match(_COMMENTS.sub("", statement))
+    if not match:
+        return None
+    unique, name, table, definition = match.groups()
+    return ConcurrentIndex(name, table, definition.strip(), unique=bool(unique))
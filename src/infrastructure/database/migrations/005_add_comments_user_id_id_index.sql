@@ -0,0 +1 @@
+create index if not exists idx_comments_user_id_id on comments(user_id, id);
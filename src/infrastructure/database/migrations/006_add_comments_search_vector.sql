@@ -0,0 +1,8 @@
+-- полнотекстовый поиск по комментариям; конфигурация 'simple' - без стемминга и стоп-слов,
+-- одинаково работает для русского и английского текста. Запросы поиска обязаны использовать
+-- ту же конфигурацию, иначе GIN-индекс не применяется.
+alter table comments
+    add column if not exists search_vector tsvector
+    generated always as (to_tsvector('simple', comment)) stored;
+
+create index if not exists idx_comments_search_vector on comments using gin (search_vector);
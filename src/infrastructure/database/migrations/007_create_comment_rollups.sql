@@ -0,0 +1,152 @@
+-- Rollup-таблицы комментариев: число комментариев пользователя и активность по дням.
+-- Поддерживаются триггерами на comments (statement-level с transition tables: COPY и
+-- insert ... select на N строк дают одно обновление на группу, а не N). Расхождение
+-- (ручные правки с выключенными триггерами, восстановление из дампа) чинит
+-- python -m src.infrastructure.database.migration_runner rebuild-rollups
+
+create table if not exists user_comment_stats (
+    user_id integer primary key references users(id) on delete cascade,
+    comment_count bigint not null default 0
+);
+
+create table if not exists user_comment_daily_stats (
+    user_id integer references users(id) on delete cascade,
+    day date not null,
+    comment_count bigint not null default 0,
+    primary key (user_id, day)
+);
+
+create table if not exists comment_daily_stats (
+    day date primary key,
+    comment_count bigint not null default 0
+);
+
+-- применяет дельту: direction = 1 для добавленных строк, -1 для удалённых;
+-- строки групп обновляются в порядке ключа, чтобы параллельные вставки не ловили deadlock
+create or replace function apply_comment_rollups(user_ids integer[], created timestamp[], direction integer)
+returns void language sql as $$
+    with delta as (
+        select user_id, created_at::date as day, count(*) * direction as n
+        from unnest(user_ids, created) as t(user_id, created_at)
+        group by user_id, created_at::date
+    ), users_delta as (
+        insert into user_comment_stats as s (user_id, comment_count)
+        select user_id, sum(n) from delta group by user_id order by user_id
+        on conflict (user_id) do update set comment_count = s.comment_count + excluded.comment_count
+    ), user_days_delta as (
+        insert into user_comment_daily_stats as s (user_id, day, comment_count)
+        select user_id, day, n from delta where day is not null order by user_id, day
+        on conflict (user_id, day) do update set comment_count = s.comment_count + excluded.comment_count
+    )
+    insert into comment_daily_stats as s (day, comment_count)
+    select day, sum(n) from delta where day is not null group by day order by day
+    on conflict (day) do update set comment_count = s.comment_count + excluded.comment_count
+$$;
+
+create or replace function comments_rollup_insert() returns trigger language plpgsql as $$
+begin
+    perform apply_comment_rollups(array_agg(user_id), array_agg(created_at), 1) from new_rows;
+    return null;
+end
+$$;
+
+create or replace function comments_rollup_delete() returns trigger language plpgsql as $$
+begin
+    perform apply_comment_rollups(array_agg(user_id), array_agg(created_at), -1) from old_rows;
+    return null;
+end
+$$;
+
+-- обычный update меняет только текст - триггер отфильтрован условием when и не срабатывает
+create or replace function comments_rollup_update() returns trigger language plpgsql as $$
+begin
+    perform apply_comment_rollups(array[old.user_id], array[old.created_at], -1);
+    perform apply_comment_rollups(array[new.user_id], array[new.created_at], 1);
+    return null;
+end
+$$;
+
+create or replace function comments_rollup_truncate() returns trigger language plpgsql as $$
+begin
+    delete from user_comment_daily_stats;
+    delete from user_comment_stats;
+    delete from comment_daily_stats;
+    return null;
+end
+$$;
+
+-- пересчёт с нуля; возвращает число rollup-строк, которые расходились с comments
+create or replace function rebuild_comment_rollups() returns bigint language plpgsql as $$
+declare
+    drifted bigint := 0;
+    n bigint;
+begin
+    -- запись в comments ждёт конца пересчёта, чтения не блокируются
+    lock table comments in share mode;
+
+    drop table if exists actual_user_days;
+    create temporary table actual_user_days on commit drop as
+    select user_id, created_at::date as day, count(*) as comment_count
+    from comments
+    group by user_id, created_at::date;
+
+    select count(*) into n
+    from (select user_id, sum(comment_count) as comment_count from actual_user_days group by user_id) a
+    full join (select * from user_comment_stats where comment_count <> 0) s using (user_id)
+    where a.comment_count is distinct from s.comment_count;
+    drifted := drifted + n;
+
+    select count(*) into n
+    from (select * from actual_user_days where day is not null) a
+    full join (select * from user_comment_daily_stats where comment_count <> 0) s using (user_id, day)
+    where a.comment_count is distinct from s.comment_count;
+    drifted := drifted + n;
+
+    select count(*) into n
+    from (select day, sum(comment_count) as comment_count from actual_user_days where day is not null group by day) a
+    full join (select * from comment_daily_stats where comment_count <> 0) s using (day)
+    where a.comment_count is distinct from s.comment_count;
+    drifted := drifted + n;
+
+    delete from user_comment_daily_stats;
+    delete from user_comment_stats;
+    delete from comment_daily_stats;
+
+    insert into user_comment_stats (user_id, comment_count)
+    select user_id, sum(comment_count) from actual_user_days group by user_id;
+
+    insert into user_comment_daily_stats (user_id, day, comment_count)
+    select user_id, day, comment_count from actual_user_days where day is not null;
+
+    insert into comment_daily_stats (day, comment_count)
+    select day, sum(comment_count) from actual_user_days where day is not null group by day;
+
+    return drifted;
+end
+$$;
+
+drop trigger if exists comments_rollup_insert on comments;
+create trigger comments_rollup_insert
+    after insert on comments
+    referencing new table as new_rows
+    for each statement execute function comments_rollup_insert();
+
+drop trigger if exists comments_rollup_delete on comments;
+create trigger comments_rollup_delete
+    after delete on comments
+    referencing old table as old_rows
+    for each statement execute function comments_rollup_delete();
+
+drop trigger if exists comments_rollup_update on comments;
+create trigger comments_rollup_update
+    after update of user_id, created_at on comments
+    for each row
+    when (old.user_id is distinct from new.user_id or old.created_at is distinct from new.created_at)
+    execute function comments_rollup_update();
+
+drop trigger if exists comments_rollup_truncate on comments;
+create trigger comments_rollup_truncate
+    after truncate on comments
+    for each statement execute function comments_rollup_truncate();
+
+select rebuild_comment_rollups();
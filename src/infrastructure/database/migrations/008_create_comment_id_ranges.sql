@@ -0,0 +1,87 @@
+-- Диапазон id комментариев по месяцам created_at. comments секционируется по created_at
+-- (миграция 010), а запросы приходят по id: условие created_at по этой таблице даёт
+-- Postgres отсечь партиции при выполнении. Диапазоны только расширяются (удаление строк их не
+-- сужает) - запрос по ним может заглянуть в лишний месяц, но не пропустит нужный.
+-- Триггеры - отдельной миграцией от заполнения (009): создание триггера блокирует запись,
+-- заполнение - полный проход по comments, и держать блокировку на его время нельзя.
+-- Если строки попали в comments в обход триггеров, диапазоны дополняет
+-- python -m src.infrastructure.database.migration_runner rebuild-rollups
+
+create table if not exists comment_id_ranges (
+    month date primary key,
+    min_id integer not null,
+    max_id integer not null
+);
+
+-- месяцы обновляются в порядке ключа - параллельные вставки не ловят deadlock
+create or replace function extend_comment_id_ranges(ids integer[], created timestamp[])
+returns void language sql as $$
+    insert into comment_id_ranges as r (month, min_id, max_id)
+    select date_trunc('month', created_at)::date, min(id), max(id)
+    from unnest(ids, created) as t(id, created_at)
+    where created_at is not null
+    group by 1
+    order by 1
+    on conflict (month) do update
+        set min_id = least(r.min_id, excluded.min_id), max_id = greatest(r.max_id, excluded.max_id)
+        where excluded.min_id < r.min_id or excluded.max_id > r.max_id
+$$;
+
+create or replace function comments_id_ranges_insert() returns trigger language plpgsql as $$
+begin
+    perform extend_comment_id_ranges(array_agg(id), array_agg(created_at)) from new_rows;
+    return null;
+end
+$$;
+
+-- дополняет диапазоны по текущим строкам comments; только расширяет, поэтому безопасна
+-- параллельно с записью (триггеры и пересчёт сливаются через least/greatest).
+-- Возвращает число изменённых месяцев
+create or replace function rebuild_comment_id_ranges() returns bigint language sql as $$
+    with actual as (
+        select date_trunc('month', created_at)::date as month, min(id) as min_id, max(id) as max_id
+        from comments
+        where created_at is not null
+        group by 1
+    ), changed as (
+        insert into comment_id_ranges as r (month, min_id, max_id)
+        select month, min_id, max_id from actual order by month
+        on conflict (month) do update
+            set min_id = least(r.min_id, excluded.min_id), max_id = greatest(r.max_id, excluded.max_id)
+            where excluded.min_id < r.min_id or excluded.max_id > r.max_id
+        returning 1
+    )
+    select count(*) from changed
+$$;
+
+create or replace function comments_id_ranges_truncate() returns trigger language plpgsql as $$
+begin
+    delete from comment_id_ranges;
+    return null;
+end
+$$;
+
+create or replace function comments_id_ranges_update() returns trigger language plpgsql as $$
+begin
+    perform extend_comment_id_ranges(array[new.id], array[new.created_at]);
+    return null;
+end
+$$;
+
+drop trigger if exists comments_id_ranges_insert on comments;
+create trigger comments_id_ranges_insert
+    after insert on comments
+    referencing new table as new_rows
+    for each statement execute function comments_id_ranges_insert();
+
+drop trigger if exists comments_id_ranges_update on comments;
+create trigger comments_id_ranges_update
+    after update of created_at on comments
+    for each row
+    when (old.created_at is distinct from new.created_at)
+    execute function comments_id_ranges_update();
+
+drop trigger if exists comments_id_ranges_truncate on comments;
+create trigger comments_id_ranges_truncate
+    after truncate on comments
+    for each statement execute function comments_id_ranges_truncate();
@@ -0,0 +1,6 @@
+-- Заполнение comment_id_ranges по уже существующим строкам. Только чтение comments -
+-- запись в таблицу не ждёт; строки, вставленные параллельно, уже учёл триггер из 008,
+-- а least/greatest сливает оба источника. Строки с created_at = null (в 004 колонка без
+-- not null) учтёт триггер на update, когда им проставят дату (миграция 010).
+
+select rebuild_comment_id_ranges();
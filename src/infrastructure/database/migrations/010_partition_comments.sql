@@ -0,0 +1,254 @@
+-- comments секционируется по месяцам created_at. Старая таблица не переписывается: она
+-- становится партицией comments_legacy (от MINVALUE до первого месяца после данных), новые
+-- строки идут в помесячные партиции comments_pYYYY_MM. Строки вне созданных партиций попадают
+-- в comments_default и разносятся по месяцам при следующем ensure_comment_partitions().
+--
+-- Онлайн-переход на большой таблице: сначала
+--     python -m src.infrastructure.database.migration_runner prepare-partitioning
+-- (concurrently строит индекс (id, created_at) и проверяет ограничения без блокировки записи),
+-- затем миграции - тогда здесь меняется только каталог. Без подготовки то же самое делается
+-- под блокировкой этой миграции - годится для небольших таблиц.
+--
+-- id уникален только вместе с created_at (ключ партиционирования обязан входить в primary key);
+-- id по-прежнему выдаёт одна sequence.
+
+-- партиции секционированной таблицы с границами; from_ts = -infinity для MINVALUE,
+-- у default-партиции границы null
+create or replace function comment_partitions(parent text default 'comments')
+returns table (partition regclass, from_ts timestamp, to_ts timestamp, is_default boolean)
+language sql stable as $$
+    select c.oid::regclass,
+           btrim(replace(b[1], 'MINVALUE', '-infinity'), '''')::timestamp,
+           btrim(replace(b[2], 'MAXVALUE', 'infinity'), '''')::timestamp,
+           b is null
+    from pg_inherits i
+    join pg_class c on c.oid = i.inhrelid
+    left join lateral regexp_match(pg_get_expr(c.relpartbound, c.oid), 'FROM \((.+)\) TO \((.+)\)') as b on true
+    where i.inhparent = parent::regclass
+    order by 2 nulls last
+$$;
+
+-- создаёт партиции с текущего месяца на months_ahead вперёд и для месяцев, строки которых
+-- оказались в comments_default (импорт задним числом, пропущенный запуск); такие строки
+-- переносятся в партицию своего месяца. Перенос идёт мимо comments, поэтому триггеры
+-- rollup'ов не срабатывают - строки те же. Возвращает созданные партиции.
+create or replace function ensure_comment_partitions(months_ahead integer default 3)
+returns setof text language plpgsql as $$
+declare
+    month_start timestamp;
+    name text;
+    this_month timestamp := date_trunc('month', localtimestamp);
+begin
+    -- воркеры на старте и cron могут прийти одновременно
+    perform pg_advisory_xact_lock(hashtext('comment_partitions'));
+    for month_start in
+        select generate_series(this_month, this_month + make_interval(months => months_ahead), interval '1 month')
+        union
+        select distinct date_trunc('month', created_at) from comments_default
+        order by 1
+    loop
+        if exists (
+            select 1 from comment_partitions()
+            where not is_default and month_start >= from_ts and month_start < to_ts
+        ) then
+            continue;
+        end if;
+        name := 'comments_p' || to_char(month_start, 'YYYY_MM');
+        if exists (
+            select 1 from comments_default
+            where created_at >= month_start and created_at < month_start + interval '1 month'
+        ) then
+            -- новая партиция не создаётся, пока её строки лежат в default
+            create temporary table if not exists moved_comments (
+                id integer, user_id integer, comment text, created_at timestamp, updated_at timestamp
+            ) on commit drop;
+            truncate moved_comments;
+            with moved as (
+                delete from comments_default
+                where created_at >= month_start and created_at < month_start + interval '1 month'
+                returning id, user_id, comment, created_at, updated_at
+            )
+            insert into moved_comments select * from moved;
+            execute format(
+                'create table %I partition of comments for values from (%L) to (%L)',
+                name, month_start, month_start + interval '1 month'
+            );
+            execute format(
+                'insert into %I (id, user_id, comment, created_at, updated_at) select * from moved_comments',
+                name
+            );
+        else
+            execute format(
+                'create table %I partition of comments for values from (%L) to (%L)',
+                name, month_start, month_start + interval '1 month'
+            );
+        end if;
+        return next name;
+    end loop;
+end
+$$;
+
+-- партиции, целиком старше keep_months месяцев от текущего, отцепляются от comments и
+-- подключаются к comments_archive (drop_archived - удаляются). rollup-счётчики и
+-- comment_id_ranges этих месяцев убираются: статистика считается по живым комментариям.
+-- Возвращает отцепленные партиции.
+create or replace function archive_comment_partitions(keep_months integer, drop_archived boolean default false)
+returns setof text language plpgsql as $$
+declare
+    cutoff timestamp := date_trunc('month', localtimestamp) - make_interval(months => keep_months);
+    part record;
+    name text;
+    fk text;
+begin
+    perform pg_advisory_xact_lock(hashtext('comment_partitions'));
+    for part in
+        select * from comment_partitions() where not is_default and to_ts <= cutoff
+    loop
+        -- после drop regclass уже не разрешается в имя
+        name := part.partition::text;
+        execute format('alter table comments detach partition %s', part.partition);
+
+        with gone as (
+            delete from user_comment_daily_stats
+            where day >= part.from_ts and day < part.to_ts
+            returning user_id, comment_count
+        ), per_user as (
+            select user_id, sum(comment_count) as n from gone group by user_id
+        )
+        update user_comment_stats s
+        set comment_count = s.comment_count - p.n
+        from per_user p
+        where s.user_id = p.user_id;
+        delete from comment_daily_stats where day >= part.from_ts and day < part.to_ts;
+        delete from comment_id_ranges where month >= part.from_ts and month < part.to_ts;
+
+        if drop_archived then
+            execute format('drop table %s', part.partition);
+        else
+            -- архив не ссылается на users: удаление пользователя не упирается в старые комментарии
+            for fk in select conname from pg_constraint where conrelid = part.partition and contype = 'f' loop
+                execute format('alter table %s drop constraint %I', part.partition, fk);
+            end loop;
+            execute format(
+                'alter table comments_archive attach partition %s for values from (%L) to (%L)',
+                part.partition, part.from_ts, part.to_ts
+            );
+        end if;
+        return next name;
+    end loop;
+end
+$$;
+
+create table if not exists comments_archive (
+    id integer not null,
+    user_id integer not null,
+    comment text not null,
+    created_at timestamp not null,
+    updated_at timestamp,
+    search_vector tsvector generated always as (to_tsvector('simple', comment)) stored
+) partition by range (created_at);
+
+do $$
+declare
+    bound text;
+    cutoff timestamp;
+begin
+    if (select relkind from pg_class where oid = 'comments'::regclass) = 'p' then
+        return;
+    end if;
+
+    -- подготовка онлайн (prepare-partitioning) уже сделала всё, что читает таблицу целиком;
+    -- иначе - здесь, под блокировкой
+    update comments set created_at = coalesce(updated_at, localtimestamp) where created_at is null;
+    create unique index if not exists comments_id_created_at_idx on comments (id, created_at);
+    select pg_get_expr(conbin, conrelid) into bound
+    from pg_constraint
+    where conrelid = 'comments'::regclass and conname = 'comments_legacy_upper_bound' and convalidated;
+    if bound is not null then
+        cutoff := substring(bound from '''(.*)''')::timestamp;
+    else
+        select date_trunc('month', greatest(localtimestamp, max(created_at))) + interval '1 month'
+        into cutoff
+        from comments;
+        alter table comments drop constraint if exists comments_legacy_upper_bound;
+        execute format(
+            'alter table comments add constraint comments_legacy_upper_bound check (created_at < %L)', cutoff
+        );
+    end if;
+    -- с проверенным ограничением comments_created_at_not_null set not null не сканирует таблицу
+    alter table comments alter column created_at set not null;
+    alter table comments drop constraint if exists comments_created_at_not_null;
+
+    alter table comments rename to comments_legacy;
+    drop trigger comments_rollup_insert on comments_legacy;
+    drop trigger comments_rollup_delete on comments_legacy;
+    drop trigger comments_rollup_update on comments_legacy;
+    drop trigger comments_rollup_truncate on comments_legacy;
+    drop trigger comments_id_ranges_insert on comments_legacy;
+    drop trigger comments_id_ranges_update on comments_legacy;
+    drop trigger comments_id_ranges_truncate on comments_legacy;
+    -- (user_id) покрывает индекс (user_id, id)
+    drop index if exists idx_users_id;
+    alter table comments_legacy drop constraint comments_pkey;
+    alter table comments_legacy add constraint comments_legacy_pkey primary key using index comments_id_created_at_idx;
+    -- имена индексов общие на схему - у секционированной таблицы остаются прежние
+    alter index idx_comments_user_id_id rename to comments_legacy_user_id_id_idx;
+    alter index idx_comments_search_vector rename to comments_legacy_search_vector_idx;
+
+    create table comments (
+        id integer not null default nextval('comments_id_seq'),
+        user_id integer not null,
+        comment text not null,
+        created_at timestamp not null default current_timestamp,
+        updated_at timestamp default current_timestamp,
+        search_vector tsvector generated always as (to_tsvector('simple', comment)) stored,
+        constraint comments_pkey primary key (id, created_at),
+        constraint comments_user_id_fkey foreign key (user_id) references users(id)
+    ) partition by range (created_at);
+    create index idx_comments_user_id_id on comments (user_id, id);
+    create index idx_comments_search_vector on comments using gin (search_vector);
+    alter sequence comments_id_seq owned by comments.id;
+
+    if exists (select 1 from comments_legacy) then
+        -- индексы и внешний ключ совпадают с родительскими и подключаются без перестройки,
+        -- граница подтверждена comments_legacy_upper_bound - без проверочного прохода
+        execute format(
+            'alter table comments attach partition comments_legacy for values from (minvalue) to (%L)', cutoff
+        );
+    else
+        drop table comments_legacy;
+    end if;
+    create table comments_default partition of comments default;
+
+    create trigger comments_rollup_insert
+        after insert on comments
+        referencing new table as new_rows
+        for each statement execute function comments_rollup_insert();
+    create trigger comments_rollup_delete
+        after delete on comments
+        referencing old table as old_rows
+        for each statement execute function comments_rollup_delete();
+    create trigger comments_rollup_update
+        after update of user_id, created_at on comments
+        for each row
+        when (old.user_id is distinct from new.user_id or old.created_at is distinct from new.created_at)
+        execute function comments_rollup_update();
+    create trigger comments_rollup_truncate
+        after truncate on comments
+        for each statement execute function comments_rollup_truncate();
+    create trigger comments_id_ranges_insert
+        after insert on comments
+        referencing new table as new_rows
+        for each statement execute function comments_id_ranges_insert();
+    create trigger comments_id_ranges_update
+        after update of created_at on comments
+        for each row
+        when (old.created_at is distinct from new.created_at)
+        execute function comments_id_ranges_update();
+    create trigger comments_id_ranges_truncate
+        after truncate on comments
+        for each statement execute function comments_id_ranges_truncate();
+end
+$$;
+
+select ensure_comment_partitions(3);
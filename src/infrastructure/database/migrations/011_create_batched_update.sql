@@ -0,0 +1,45 @@
+-- Пакетное обновление большой таблицы под нагрузкой: update идёт диапазонами ключа по
+-- batch_size, каждый диапазон - своя транзакция (блокировки строк держатся недолго, vacuum
+-- успевает за обновлёнными строками), между диапазонами - пауза pause_seconds.
+-- Вызывается из миграции с директивой no-transaction (commit внутри процедуры работает только
+-- вне транзакции):
+--     -- migrate: no-transaction
+--     call batched_update('comments', 'flag = false', 'flag is null', 5000, 0.05);
+-- condition обязано исключать уже обновлённые строки: после ошибки или повтора по
+-- lock_timeout процедура начинает сначала и пропускает сделанное.
+-- statement_timeout ограничивает весь call, а не отдельный пакет.
+
+create or replace procedure batched_update(
+    target regclass,
+    assignments text,
+    condition text default 'true',
+    batch_size integer default 10000,
+    pause_seconds double precision default 0,
+    key_column text default 'id'
+) language plpgsql as $$
+declare
+    lo bigint;
+    hi bigint;
+    last_key bigint;
+    updated bigint;
+    total bigint := 0;
+begin
+    execute format('select min(%1$I), max(%1$I) from %2$s', key_column, target) into lo, last_key;
+    while lo is not null and lo <= last_key loop
+        hi := lo + batch_size;
+        execute format(
+            'update %s set %s where %I >= $1 and %I < $2 and (%s)',
+            target, assignments, key_column, key_column, condition
+        ) using lo, hi;
+        get diagnostics updated = row_count;
+        total := total + updated;
+        commit;
+        raise notice 'batched_update %: keys % .. % of %, % row(s) updated', target, lo, hi - 1, last_key, total;
+        if pause_seconds > 0 then
+            perform pg_sleep(pause_seconds);
+        end if;
+        -- пропуск дыр в ключах - следующий диапазон начинается с существующего ключа
+        execute format('select min(%1$I) from %2$s where %1$I >= $1', key_column, target) into lo using hi;
+    end loop;
+end
+$$;
@@ -0,0 +1,84 @@
+-- Общий счётчик дня в comment_daily_stats был одной строкой на день: её обновляла каждая
+-- вставка комментария, и параллельные вставки стояли в очереди за row lock до commit
+-- (включая fsync). Теперь у дня до 16 строк-шардов: транзакция пишет в шард своего
+-- backend'а (pg_backend_pid() % 16), чтение суммирует шарды - запрос активности и так
+-- группирует по дню. Таблица - по строке на день, перестройка ключа проходит мгновенно.
+
+alter table comment_daily_stats add column if not exists shard smallint not null default 0;
+alter table comment_daily_stats drop constraint if exists comment_daily_stats_pkey;
+alter table comment_daily_stats add constraint comment_daily_stats_pkey primary key (day, shard);
+
+create or replace function apply_comment_rollups(user_ids integer[], created timestamp[], direction integer)
+returns void language sql as $$
+    with delta as (
+        select user_id, created_at::date as day, count(*) * direction as n
+        from unnest(user_ids, created) as t(user_id, created_at)
+        group by user_id, created_at::date
+    ), users_delta as (
+        insert into user_comment_stats as s (user_id, comment_count)
+        select user_id, sum(n) from delta group by user_id order by user_id
+        on conflict (user_id) do update set comment_count = s.comment_count + excluded.comment_count
+    ), user_days_delta as (
+        insert into user_comment_daily_stats as s (user_id, day, comment_count)
+        select user_id, day, n from delta where day is not null order by user_id, day
+        on conflict (user_id, day) do update set comment_count = s.comment_count + excluded.comment_count
+    )
+    insert into comment_daily_stats as s (day, shard, comment_count)
+    select day, pg_backend_pid() % 16, sum(n) from delta where day is not null group by day order by day
+    on conflict (day, shard) do update set comment_count = s.comment_count + excluded.comment_count
+$$;
+
+-- как в 007, но общий счётчик дня сравнивается суммой шардов и пересобирается в шард 0
+create or replace function rebuild_comment_rollups() returns bigint language plpgsql as $$
+declare
+    drifted bigint := 0;
+    n bigint;
+begin
+    -- запись в comments ждёт конца пересчёта, чтения не блокируются
+    lock table comments in share mode;
+
+    drop table if exists actual_user_days;
+    create temporary table actual_user_days on commit drop as
+    select user_id, created_at::date as day, count(*) as comment_count
+    from comments
+    group by user_id, created_at::date;
+
+    select count(*) into n
+    from (select user_id, sum(comment_count) as comment_count from actual_user_days group by user_id) a
+    full join (select * from user_comment_stats where comment_count <> 0) s using (user_id)
+    where a.comment_count is distinct from s.comment_count;
+    drifted := drifted + n;
+
+    select count(*) into n
+    from (select * from actual_user_days where day is not null) a
+    full join (select * from user_comment_daily_stats where comment_count <> 0) s using (user_id, day)
+    where a.comment_count is distinct from s.comment_count;
+    drifted := drifted + n;
+
+    select count(*) into n
+    from (select day, sum(comment_count) as comment_count from actual_user_days where day is not null group by day) a
+    full join (
+        select day, sum(comment_count) as comment_count
+        from comment_daily_stats
+        group by day
+        having sum(comment_count) <> 0
+    ) s using (day)
+    where a.comment_count is distinct from s.comment_count;
+    drifted := drifted + n;
+
+    delete from user_comment_daily_stats;
+    delete from user_comment_stats;
+    delete from comment_daily_stats;
+
+    insert into user_comment_stats (user_id, comment_count)
+    select user_id, sum(comment_count) from actual_user_days group by user_id;
+
+    insert into user_comment_daily_stats (user_id, day, comment_count)
+    select user_id, day, comment_count from actual_user_days where day is not null;
+
+    insert into comment_daily_stats (day, comment_count)
+    select day, sum(comment_count) from actual_user_days where day is not null group by day;
+
+    return drifted;
+end
+$$;
@@ -0,0 +1,34 @@
+-- extend_comment_id_ranges из 008 делала upsert строки месяца на каждую вставку: id растут,
+-- и почти каждая вставка расширяла max_id текущего месяца - параллельные вставки стояли в
+-- очереди за row lock этой строки до commit. ON CONFLICT DO UPDATE к тому же блокирует
+-- строку и тогда, когда его where ложно.
+-- Теперь сначала обычное чтение без блокировки: месяцы, чьи сохранённые диапазоны уже
+-- покрывают id вставки, не трогаются. А расширение идёт блоками по 1024 id - граница
+-- сдвигается сразу до края блока, и строка месяца пишется раз на ~1024 вставки. Диапазоны
+-- по-прежнему могут быть только шире настоящих: запрос заглянет в лишний месяц, но нужный
+-- не пропустит.
+
+create or replace function extend_comment_id_ranges(ids integer[], created timestamp[])
+returns void language sql as $$
+    with batch as (
+        select date_trunc('month', created_at)::date as month, min(id) as min_id, max(id) as max_id
+        from unnest(ids, created) as t(id, created_at)
+        where created_at is not null
+        group by 1
+    ), extending as (
+        select b.month, b.min_id, b.max_id
+        from batch b
+        left join comment_id_ranges r using (month)
+        where r.month is null or b.min_id < r.min_id or b.max_id > r.max_id
+    )
+    -- месяцы обновляются в порядке ключа - параллельные вставки не ловят deadlock
+    insert into comment_id_ranges as r (month, min_id, max_id)
+    select month,
+           min_id - min_id % 1024,
+           least(max_id::bigint - max_id % 1024 + 1023, 2147483647)::integer
+    from extending
+    order by month
+    on conflict (month) do update
+        set min_id = least(r.min_id, excluded.min_id), max_id = greatest(r.max_id, excluded.max_id)
+        where excluded.min_id < r.min_id or excluded.max_id > r.max_id
+$$;
@@ -0,0 +1,35 @@
+"""
+Обслуживание партиций comments (миграция 010): создание наперёд и retention.
+Работают на одном соединении в своей транзакции с lock_timeout: DDL на comments ждёт
+конца читающих транзакций, а очередь за ним блокирует все новые запросы к таблице -
+лучше не дождаться и повторить при следующем запуске.
+"""
+from typing import List
+
+from src.infrastructure.config import settings
+
+
+async def _call(conn, query: str, *args) -> List[str]:
+    async with conn.transaction():
+        await conn.execute(f"set local lock_timeout = {int(settings.comment_partitions_lock_timeout_seconds * 1000)}")
+        return [row[0] for row in await conn.fetch(query, *args)]
+
+
+async def ensure_comment_partitions(conn) -> List[str]:
+    """Партиции на comment_partitions_ahead месяцев вперёд; возвращает созданные."""
+    return await _call(conn, "select ensure_comment_partitions($1)", settings.comment_partitions_ahead)
+
+
+async def archive_comment_partitions(conn) -> List[str]:
+    """
+    Отцепляет партиции старше comment_retention_months (0 - хранить всё): в comments_archive
+    или удаляет при comment_retention_mode = drop. Возвращает отцепленные.
+    """
+    if settings.comment_retention_months <= 0:
+        return []
+    return await _call(
+        conn,
+        "select archive_comment_partitions($1, $2)",
+        settings.comment_retention_months,
+        settings.comment_retention_mode == "drop",
+    )
@@ -0,0 +1,29 @@
+import asyncpg
+
+from src.domain.entities.comment import Comment
+from src.domain.entities.comment_search_hit import CommentSearchHit
+from src.domain.entities.user import User
+
+
+# Запросы, читающие эти record_class, обязаны выбирать колонки в порядке полей сущности:
+# тогда сущность строится позиционно из значений записи, без поиска по именам колонок.
+
+class UserRecord(asyncpg.Record):
+    __slots__ = ()
+
+    def to_entity(self) -> User:
+        return User(*self.values())
+
+
+class CommentRecord(asyncpg.Record):
+    __slots__ = ()
+
+    def to_entity(self) -> Comment:
+        return Comment(*self.values())
+
+
+class CommentSearchRecord(asyncpg.Record):
+    __slots__ = ()
+
+    def to_entity(self) -> CommentSearchHit:
+        return CommentSearchHit(*self.values())
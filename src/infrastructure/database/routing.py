@@ -0,0 +1,156 @@
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from src.infrastructure.cache import MISSING, LRUTTLCache
+from src.infrastructure.config import settings
+
+ROUND_ROBIN = "round_robin"
+LEAST_BUSY = "least_busy"
+READ_STRATEGIES = (ROUND_ROBIN, LEAST_BUSY)
+
+# ключ клиента текущего запроса (заголовок X-Client-Id или адрес), ставится middleware
+client_key: ContextVar[Optional[str]] = ContextVar("client_key", default=None)
+# чтение заполняет общий кэш: реплика могла ещё не применить чужую запись, и устаревшая
+# строка прошла бы проверку generation и жила бы в кэше весь TTL
+cache_fill: ContextVar[bool] = ContextVar("cache_fill", default=False)
+
+LAG_QUERY = """
+select case
+    when not pg_is_in_recovery() then 0
+    when pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() then 0
+    else coalesce(extract(epoch from now() - pg_last_xact_replay_timestamp()), 0)
+end::float8 as lag
+"""
+
+
+def parse_hosts(value: str, default_port: int) -> List[Tuple[str, int]]:
+    """'replica1,replica2:5433' -> [('replica1', default_port), ('replica2', 5433)]"""
+    hosts = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        hosts.append((host, int(port) if port else default_port))
+    return hosts
+
+
+@contextmanager
+def reading_primary():
+    """Читающие запросы внутри блока идут на primary."""
+    token = cache_fill.set(True)
+    try:
+        yield
+    finally:
+        cache_fill.reset(token)
+
+
+class Replica:
+    __slots__ = ("host", "port", "pool", "lag", "in_flight", "reads", "lag_checked_at")
+
+    def __init__(self, host: str, port: int, pool: Optional[asyncpg.Pool] = None):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        # пока отставание не измерено, реплика считается непригодной
+        self.lag = float("inf")
+        self.in_flight = 0
+        self.reads = 0
+        self.lag_checked_at: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    async def check_lag(self, clock: Callable[[], float] = time.monotonic) -> float:
+        try:
+            async with self.pool.acquire(timeout=settings.database_acquire_timeout) as connection:
+                self.lag = await connection.fetchval(LAG_QUERY)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, TimeoutError):
+            self.lag = float("inf")
+        self.lag_checked_at = clock()
+        return self.lag
+
+
+class ReadRouter:
+    """
+    Выбирает пул для читающего запроса: реплику (round robin или наименее загруженную)
+    либо primary - если подходящих реплик нет, все отстают больше max_lag секунд
+    или этот клиент недавно писал (read-your-writes в пределах окна recent_writes),
+    а также для чтений, заполняющих кэш (reading_primary).
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        strategy: str = ROUND_ROBIN,
+        max_lag: float = 1.0,
+        recent_writes: Optional[LRUTTLCache] = None,
+    ):
+        if strategy not in READ_STRATEGIES:
+            raise ValueError(f"Unknown read strategy {strategy}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.recent_writes = LRUTTLCache(max_size=10000, ttl=5.0) if recent_writes is None else recent_writes
+        self._counter = itertools.count()
+        self.primary_reads = 0
+        self.lag_fallbacks = 0
+        self.read_your_writes_fallbacks = 0
+        self.cache_fill_reads = 0
+
+    def record_write(self, client: Optional[str]) -> None:
+        if client is not None and self.replicas:
+            self.recent_writes.set(client, True)
+
+    def needs_primary(self, client: Optional[str]) -> bool:
+        """Клиент недавно писал - его чтения идут на primary."""
+        return client is not None and bool(self.replicas) and self.recent_writes.get(client) is not MISSING
+
+    def choose(self, client: Optional[str]) -> Optional[Replica]:
+        """Реплика для чтения или None - читать с primary."""
+        if not self.replicas:
+            self.primary_reads += 1
+            return None
+        if self.needs_primary(client):
+            self.read_your_writes_fallbacks += 1
+            self.primary_reads += 1
+            return None
+        if cache_fill.get():
+            self.cache_fill_reads += 1
+            self.primary_reads += 1
+            return None
+        fresh = [replica for replica in self.replicas if replica.lag <= self.max_lag]
+        if not fresh:
+            self.lag_fallbacks += 1
+            self.primary_reads += 1
+            return None
+        if self.strategy == LEAST_BUSY:
+            replica = min(fresh, key=lambda replica: replica.in_flight)
+        else:
+            replica = fresh[next(self._counter) % len(fresh)]
+        replica.reads += 1
+        return replica
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "max_lag_seconds": self.max_lag,
+            "primary_reads": self.primary_reads,
+            "lag_fallbacks": self.lag_fallbacks,
+            "read_your_writes_fallbacks": self.read_your_writes_fallbacks,
+            "cache_fill_reads": self.cache_fill_reads,
+            "replicas": {
+                replica.name: {
+                    "lag_seconds": replica.lag if replica.lag != float("inf") else None,
+                    "in_flight": replica.in_flight,
+                    "reads": replica.reads,
+                }
+                for replica in self.replicas
+            },
+        }
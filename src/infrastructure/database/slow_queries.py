@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import sys
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger("slow_query")
+
+REPOSITORY_MODULES = "src.infrastructure.repositories"
+USE_CASE_MODULES = "src.application.use_cases"
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![$\w.])\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+_WRITES = re.compile(r"\b(insert|update|delete|merge|copy|truncate)\b")
+
+Explain = Callable[[str, Sequence[Any]], Awaitable[Any]]
+
+
+@lru_cache(maxsize=1024)
+def normalize(sql: str) -> str:
+    """SQL без комментариев, литералов и лишних пробелов - одинаковый у запросов одной формы."""
+    sql = _COMMENTS.sub(" ", sql)
+    sql = _STRINGS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _IN_LISTS.sub("(?)", sql)
+    return _SPACES.sub(" ", sql).strip().lower()
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    return hashlib.blake2b(normalize(sql).encode(), digest_size=8).hexdigest()
+
+
+def redact(args: Sequence[Any]) -> List[str]:
+    redacted = []
+    for value in args:
+        if isinstance(value, (list, tuple)):
+            redacted.append(f"<{type(value).__name__}[{len(value)}]>")
+        else:
+            redacted.append(f"<{type(value).__name__}>")
+    return redacted
+
+
+def _format_params(args: Sequence[Any], redacted: bool) -> List[str]:
+    if redacted:
+        return redact(args)
+    return [repr(value)[:200] for value in args]
+
+
+def find_callers(frame=None) -> Tuple[Optional[str], Optional[str]]:
+    """(use case, метод репозитория), из которых выполняется текущий запрос."""
+    frame = frame or sys._getframe(1)
+    use_case = repository = None
+    while frame is not None and use_case is None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(REPOSITORY_MODULES) or module.startswith(USE_CASE_MODULES):
+            owner = frame.f_locals.get("self")
+            name = frame.f_code.co_name
+            caller = f"{type(owner).__name__}.{name}" if owner is not None else name
+            if module.startswith(USE_CASE_MODULES):
+                use_case = caller
+            elif repository is None:
+                repository = caller
+        frame = frame.f_back
+    return use_case, repository
+
+
+def seq_scans(plan: Any) -> Set[str]:
+    """Таблицы, которые план EXPLAIN (format json) читает последовательным сканированием."""
+    found = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            if node.get("Node Type") == "Seq Scan":
+                found.add(node.get("Relation Name", "?"))
+            stack.extend(node.get("Plans", ()))
+            if "Plan" in node:
+                stack.append(node["Plan"])
+    return found
+
+
+class SlowQueryStats:
+    __slots__ = (
+        "fingerprint", "sql", "name", "count", "total_time", "max_time",
+        "last_params", "use_case", "repository", "plan", "plan_captured_at", "seq_scans",
+    )
+
+    def __init__(self, fingerprint: str, sql: str, name: Optional[str]):
+        self.fingerprint = fingerprint
+        self.sql = sql
+        self.name = name
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_params: List[str] = []
+        self.use_case: Optional[str] = None
+        self.repository: Optional[str] = None
+        self.plan: Any = None
+        self.plan_captured_at: Optional[float] = None
+        self.seq_scans: List[str] = []
+
+    def to_dict(self, include_plan: bool = False) -> Dict[str, Any]:
+        data = {
+            "fingerprint": self.fingerprint,
+            "statement": self.name,
+            "sql": normalize(self.sql),
+            "count": self.count,
+            "total_ms": self.total_time * 1000,
+            "avg_ms": self.total_time / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max_time * 1000,
+            "last_params": self.last_params,
+            "use_case": self.use_case,
+            "repository": self.repository,
+            "seq_scans": self.seq_scans,
+        }
+        if include_plan:
+            data["plan"] = self.plan
+        return data
+
+
+class SlowQueryLog:
+    """
+    Запросы дольше threshold секунд пишутся в лог slow_query и агрегируются по fingerprint.
+    Для части из них (explain_sample_rate, не чаще explain_interval на fingerprint) в фоне
+    снимается EXPLAIN (ANALYZE, BUFFERS) - только для чистых select, чтобы не повторять запись.
+    """
+
+    def __init__(
+        self,
+        explain: Optional[Explain] = None,
+        threshold: float = 0.2,
+        explain_sample_rate: float = 0.1,
+        explain_interval: float = 60.0,
+        redact_params: bool = True,
+        max_fingerprints: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.explain = explain
+        self.threshold = threshold
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_interval = explain_interval
+        self.redact_params = redact_params
+        self.max_fingerprints = max_fingerprints
+        self._clock = clock
+        self._stats: "OrderedDict[str, SlowQueryStats]" = OrderedDict()
+        self._explaining: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def observe(self, sql: str, args: Sequence[Any], elapsed: float, name: Optional[str] = None) -> None:
+        if elapsed < self.threshold:
+            return
+        key = fingerprint(sql)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = SlowQueryStats(key, sql, name)
+            while len(self._stats) > self.max_fingerprints:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(key)
+        stats.count += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        stats.last_params = _format_params(args, self.redact_params)
+        stats.use_case, stats.repository = find_callers(sys._getframe(1))
+
+        logger.warning(
+            "slow query %.1fms fp=%s statement=%s use_case=%s repository=%s params=%s sql=%s",
+            elapsed * 1000, key, name, stats.use_case, stats.repository,
+            stats.last_params, normalize(sql),
+        )
+        if self._should_explain(stats):
+            self._explaining.add(key)
+            task = asyncio.get_running_loop().create_task(self._capture_plan(stats, args))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _should_explain(self, stats: SlowQueryStats) -> bool:
+        if self.explain is None or stats.fingerprint in self._explaining:
+            return False
+        sql = normalize(stats.sql)
+        if _WRITES.search(sql) or sql.startswith("explain"):
+            return False
+        if stats.plan_captured_at is not None and self._clock() - stats.plan_captured_at < self.explain_interval:
+            return False
+        return random.random() < self.explain_sample_rate
+
+    async def _capture_plan(self, stats: SlowQueryStats, args: Sequence[Any]) -> None:
+        try:
+            plan = await self.explain(stats.sql, args)
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            stats.plan = plan
+            stats.plan_captured_at = self._clock()
+            stats.seq_scans = sorted(seq_scans(plan))
+            logger.warning(
+                "plan fp=%s statement=%s seq_scans=%s plan=%s",
+                stats.fingerprint, stats.name, stats.seq_scans, json.dumps(plan, separators=(",", ":")),
+            )
+        except Exception:
+            logger.exception("EXPLAIN failed for fp=%s", stats.fingerprint)
+        finally:
+            self._explaining.discard(stats.fingerprint)
+
+    async def drain(self) -> None:
+        """Дождаться фоновых EXPLAIN (для тестов и остановки приложения)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def top(self, limit: int = 20, order_by: str = "total") -> List[SlowQueryStats]:
+        key = {
+            "total": lambda stats: stats.total_time,
+            "max": lambda stats: stats.max_time,
+            "count": lambda stats: stats.count,
+        }[order_by]
+        return sorted(self._stats.values(), key=key, reverse=True)[:limit]
+
+    def clear(self) -> None:
+        self._stats.clear()
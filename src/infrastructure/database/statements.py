@@ -0,0 +1,94 @@
+from typing import Any, Dict, Iterator, Optional, Type
+
+import asyncpg
+
+
+class Statement:
+    """SQL-запрос репозитория с именем и статистикой выполнения."""
+
+    __slots__ = (
+        "name", "sql", "record_class", "readonly",
+        "calls", "errors", "total_time", "max_time",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        sql: str,
+        record_class: Optional[Type[asyncpg.Record]] = None,
+        readonly: bool = False,
+    ):
+        self.name = name
+        self.sql = sql
+        self.record_class = record_class
+        # только читающие запросы могут уйти на реплику
+        self.readonly = readonly
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed: float, failed: bool = False) -> None:
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if failed:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": self.total_time / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max_time * 1000,
+            "total_ms": self.total_time * 1000,
+        }
+
+    def __repr__(self) -> str:
+        return f"Statement({self.name!r})"
+
+
+class StatementRegistry:
+    """
+    Реестр запросов репозиториев. Запросы выполняются через кэш prepared statement'ов
+    asyncpg на соединении: parse/plan - один раз за жизнь соединения, а не на каждую
+    выдачу из пула. Кэш соединения не меньше реестра и не вытесняет записи по времени
+    (см. DatabaseConnection._create_pool), поэтому зарегистрированные запросы из него не выпадают.
+    """
+
+    def __init__(self):
+        self._statements: Dict[str, Statement] = {}
+
+    def register(
+        self,
+        name: str,
+        sql: str,
+        record_class: Optional[Type[asyncpg.Record]] = None,
+        readonly: bool = False,
+    ) -> Statement:
+        existing = self._statements.get(name)
+        if existing is not None:
+            if (
+                existing.sql != sql
+                or existing.record_class is not record_class
+                or existing.readonly != readonly
+            ):
+                raise ValueError(f"Statement {name} is already registered with different SQL")
+            return existing
+        statement = self._statements[name] = Statement(name, sql, record_class, readonly)
+        return statement
+
+    def __getitem__(self, name: str) -> Statement:
+        return self._statements[name]
+
+    def __iter__(self) -> Iterator[Statement]:
+        return iter(self._statements.values())
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: statement.stats() for name, statement in sorted(self._statements.items())}
+
+
+statements = StatementRegistry()
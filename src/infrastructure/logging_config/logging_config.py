@@ -1,26 +1,55 @@
+import atexit
 import logging
 import logging.config
 import yaml
 from pathlib import Path
 import os
 
+from src.infrastructure.config import settings
+from src.infrastructure.logging_config.queue_logging import (
+    JsonFormatter,
+    RequestIdFilter,
+    configured_loggers,
+    queue_logging,
+)
+
+
+def _apply_pipeline(config: dict) -> None:
+    loggers = configured_loggers(list(config.get("loggers", {})))
+    handlers = {handler for logger in loggers for handler in logger.handlers}
+    json_formatter = JsonFormatter() if settings.log_format == "json" else None
+    for handler in handlers:
+        handler.addFilter(RequestIdFilter())
+        if json_formatter:
+            handler.setFormatter(json_formatter)
+    if settings.log_queue_enabled:
+        # handler'ы (файлы, ротация, stdout) уходят в фоновые потоки, логгер только кладёт в очередь
+        queue_logging.install(loggers, settings.log_queue_size)
+
+
 def setup_logging(
     default_path='logging_config.yaml',
     default_level=logging.INFO,
-    env_key='LOG_CFG'
+    env_key='LOG_CFG',
+    log_dir=None,
 ):
     """
     Настройка логирования для FastAPI проекта с RotatingFileHandler.
-    Работает на Windows и Linux, создаёт logs/ в корне проекта.
+    Работает на Windows и Linux, создаёт logs/ в корне проекта (или settings.log_dir).
+    С settings.log_queue_enabled запись в handler'ы идёт из фонового потока.
     """
 
     # Абсолютный путь до корня проекта
     BASE_DIR = Path(__file__).resolve().parents[3]  # project/
 
     # Папка для логов
-    log_dir = BASE_DIR / "logs"
+    log_dir = log_dir or settings.log_dir
+    log_dir = Path(log_dir) if log_dir else BASE_DIR / "logs"
     log_dir.mkdir(exist_ok=True)
 
+    # потоки прошлой конфигурации дописывают очереди до замены handler'ов
+    queue_logging.stop()
+
     # Абсолютный путь до YAML конфига
     config_file = BASE_DIR / "src" / "infrastructure" / "logging_config" / default_path
 
@@ -31,12 +60,17 @@ def setup_logging(
         # Подставляем абсолютные пути к файлам логов
         config["handlers"]["file"]["filename"] = str(log_dir / "app.log")
         config["handlers"]["error_file"]["filename"] = str(log_dir / "error.log")
+        config["handlers"]["slow_query_file"]["filename"] = str(log_dir / "slow_query.log")
 
         # Применяем конфигурацию
         try:
             logging.config.dictConfig(config)
+            _apply_pipeline(config)
         except Exception as e:
             print("Ошибка конфигурации логирования:", e)
             logging.basicConfig(level=default_level)
     else:
-        logging.basicConfig(level=default_level)
\ No newline at end of file
+        logging.basicConfig(level=default_level)
+
+
+atexit.register(queue_logging.stop)
@@ -0,0 +1,183 @@
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, List, Optional
+
+from src.infrastructure.metrics import metrics
+
+# id текущего HTTP-запроса, ставится middleware; "-" вне запроса
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+DROPPED = metrics.counter(
+    "log_records_dropped_total", "Log records dropped because the logging queue was full", ["queue"]
+)
+
+# стандартные атрибуты LogRecord - всё остальное считается полями из extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Кладёт request_id в запись в потоке, который логирует (в потоке listener'а contextvar пуст)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket на логгер: не больше rate записей в секунду со всплеском до burst.
+    Записи уровня WARNING и выше проходят всегда.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self.suppressed += 1
+        return False
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю rate записей ниже WARNING."""
+
+    def __init__(self, rate: float = 0.01, random_fn: Callable[[], float] = random.random):
+        super().__init__()
+        self.rate = rate
+        self._random = random_fn
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self._random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: время, уровень, логгер, сообщение, request_id и поля из extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in data:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler с ограниченной очередью: при переполнении запись отбрасывается
+    (и считается в log_records_dropped_total), а не блокирует event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue, name: str):
+        super().__init__(log_queue)
+        self.name = name
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # сообщение и traceback собираем сразу: аргументы могут измениться до записи,
+        # а traceback держит фреймы живыми; форматирование остаётся handler'ам listener'а
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            DROPPED.inc(self.name)
+
+
+class QueueLogging:
+    """Переносит handler'ы логгеров в фоновые потоки: логгер пишет только в очередь."""
+
+    def __init__(self):
+        self.listeners: List[QueueListener] = []
+        self.handlers: List[DroppingQueueHandler] = []
+        self._lock = threading.Lock()
+
+    def install(self, loggers: List[logging.Logger], queue_size: int) -> None:
+        with self._lock:
+            self._stop()
+            # логгеры с одинаковым набором handler'ов делят одну очередь и один поток
+            groups: Dict[tuple, List[logging.Logger]] = {}
+            for logger in loggers:
+                if logger.handlers:
+                    groups.setdefault(tuple(logger.handlers), []).append(logger)
+            for index, (handlers, group) in enumerate(groups.items()):
+                log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+                queue_handler = DroppingQueueHandler(log_queue, group[0].name or "root")
+                queue_handler.addFilter(RequestIdFilter())
+                listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+                for logger in group:
+                    logger.handlers = [queue_handler]
+                listener.start()
+                self.listeners.append(listener)
+                self.handlers.append(queue_handler)
+
+    def _stop(self) -> None:
+        for listener in self.listeners:
+            listener.stop()
+        self.listeners = []
+        self.handlers = []
+
+    def stop(self) -> None:
+        """Дописывает очереди и останавливает потоки (atexit)."""
+        with self._lock:
+            self._stop()
+
+    def queue_sizes(self) -> Dict[tuple, int]:
+        return {(handler.name,): handler.queue.qsize() for handler in self.handlers}
+
+
+queue_logging = QueueLogging()
+
+metrics.gauge_function(
+    "log_queue_size", "Records waiting in the logging queue", ["queue"], queue_logging.queue_sizes
+)
+
+
+def configured_loggers(names: Optional[List[str]] = None) -> List[logging.Logger]:
+    loggers = [logging.getLogger()]
+    loggers.extend(logging.getLogger(name) for name in names or ())
+    return loggers
@@ -0,0 +1,293 @@
+import json
+import os
+from bisect import bisect_left
+from glob import glob
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+# границы в секундах - от долей миллисекунды (запрос по индексу) до таймаута пула
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Labels = Tuple[str, ...]
+# снимок метрики одного процесса: (pid, значения из dump, жив ли процесс)
+WorkerDump = Tuple[int, List[Any], bool]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def dump(self) -> List[Any]:
+        """Значения в виде, пригодном для JSON."""
+        raise NotImplementedError
+
+    def merged(self, workers: Sequence[WorkerDump]) -> "_Metric":
+        """Метрика с объединёнными значениями всех воркеров."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+    def dump(self) -> List[Any]:
+        return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merged(self, workers: Sequence[WorkerDump]) -> "Counter":
+        # завершившиеся воркеры тоже суммируются - иначе счётчик падал бы при перезапуске
+        counter = Counter(self.name, self.help, self.labelnames)
+        for _, values, _ in workers:
+            for labels, value in values:
+                counter.inc(*labels, amount=value)
+        return counter
+
+
+class GaugeFunction(_Metric):
+    """Gauge, значения которого снимаются функцией в момент отдачи метрик - без записи на горячем пути."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        function: Callable[[], Dict[Labels, float]],
+    ):
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.function().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+    def dump(self) -> List[Any]:
+        return [[list(labels), value] for labels, value in self.function().items()]
+
+    def merged(self, workers: Sequence[WorkerDump]) -> "GaugeFunction":
+        # текущее значение есть только у живых воркеров, складывать их не всегда осмысленно
+        values = {
+            tuple(labels) + (str(pid),): value
+            for pid, items, alive in workers
+            if alive
+            for labels, value in items
+        }
+        return GaugeFunction(self.name, self.help, self.labelnames + ("worker",), lambda: values)
+
+
+class _HistogramChild:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """
+    Гистограмма с фиксированными границами. observe - bisect и три сложения,
+    кумулятивные суммы по бакетам считаются только при отдаче метрик.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[Labels, _HistogramChild] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children[labels] = _HistogramChild(len(self.buckets))
+        child.counts[bisect_left(self.buckets, value)] += 1
+        child.sum += value
+        child.count += 1
+
+    def count(self, *labels: str) -> int:
+        child = self._children.get(labels)
+        return child.count if child else 0
+
+    def samples(self) -> Iterable[str]:
+        bucket_labels = self.labelnames + ("le",)
+        for labels, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket"
+                    f"{_format_labels(bucket_labels, labels + (_format_value(bound),))} {cumulative}"
+                )
+            formatted = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{formatted} {_format_value(child.sum)}"
+            yield f"{self.name}_count{formatted} {child.count}"
+
+    def dump(self) -> List[Any]:
+        return [
+            [list(labels), child.counts, child.sum, child.count]
+            for labels, child in self._children.items()
+        ]
+
+    def merged(self, workers: Sequence[WorkerDump]) -> "Histogram":
+        histogram = Histogram(self.name, self.help, self.labelnames, self.buckets)
+        for _, values, _ in workers:
+            for labels, counts, total, count in values:
+                if len(counts) != len(self.buckets) + 1:
+                    # снимок воркера со старыми границами (до перезапуска с новым кодом)
+                    continue
+                labels = tuple(labels)
+                child = histogram._children.get(labels)
+                if child is None:
+                    child = histogram._children[labels] = _HistogramChild(len(self.buckets))
+                child.counts = [a + b for a, b in zip(child.counts, counts)]
+                child.sum += total
+                child.count += count
+        return histogram
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge_function(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        function: Callable[[], Dict[Labels, float]],
+    ) -> GaugeFunction:
+        return self._register(GaugeFunction(name, help, labelnames, function))
+
+    def unregister(self, name: str) -> None:
+        self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)."""
+        return self._render(self._metrics.values())
+
+    @staticmethod
+    def _render(metrics: Iterable[_Metric]) -> str:
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def dump(self) -> Dict[str, List[Any]]:
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def write(self, directory: str) -> None:
+        """Снимок метрик процесса в directory/<pid>.json - его читают остальные воркеры."""
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(self.dump(), file)
+        os.replace(f"{path}.tmp", path)
+
+    def render_multiprocess(self, directory: str) -> str:
+        """
+        Метрики всех воркеров supervisor'а: свои - текущие, остальных - из их последних
+        снимков в directory. Counter и histogram суммируются, gauge отдаются по живым
+        воркерам с меткой worker (pid).
+        """
+        own = os.getpid()
+        workers: List[Tuple[int, Dict[str, List[Any]], bool]] = [(own, self.dump(), True)]
+        for path in glob(os.path.join(directory, "*.json")):
+            pid = int(os.path.basename(path)[:-len(".json")])
+            if pid == own:
+                continue
+            try:
+                with open(path) as file:
+                    workers.append((pid, json.load(file), _is_alive(pid)))
+            except (OSError, ValueError):
+                continue
+        return self._render(
+            metric.merged([(pid, dump.get(name, []), alive) for pid, dump, alive in workers])
+            for name, metric in self._metrics.items()
+        )
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # процесс есть, но принадлежит другому пользователю
+        pass
+    return True
+
+
+def clear_snapshots(directory: str) -> None:
+    """Удаляет снимки прошлого запуска: их счётчики не относятся к новым воркерам."""
+    for path in glob(os.path.join(directory, "*.json")):
+        os.remove(path)
+
+
+metrics = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
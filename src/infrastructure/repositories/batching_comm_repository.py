@@ -0,0 +1,103 @@
+from copy import copy
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from src.domain.entities.comment import Comment
+from src.domain.entities.comment_stats import ActivityBucket, UserCommentStats
+from src.domain.entities.comment_search_hit import CommentSearchHit
+from src.domain.entities.total_count import TotalCount
+from src.domain.repositories.comment_repository import (
+    CommentRepository,
+    CommentUpdateResult,
+    DeletedComment,
+)
+from src.infrastructure.batch_loader import BatchLoader
+
+
+class BatchingCommentRepository(CommentRepository):
+    """get_by_id через общий BatchLoader: параллельные запросы уходят одним where id = any($1)."""
+
+    def __init__(self, repository: CommentRepository, loader: BatchLoader):
+        self.repository = repository
+        self.loader = loader
+
+    async def create(self, comment: Comment) -> Optional[Comment]:
+        return await self.repository.create(comment)
+
+    async def create_many(self, comments: List[Comment]) -> List[Comment]:
+        return await self.repository.create_many(comments)
+
+    async def get_all(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
+        return await self.repository.get_all(limit=limit, offset=offset, after_id=after_id)
+
+    async def get_by_id(self, comment_id: int) -> Optional[Comment]:
+        return copy(await self.loader.load(comment_id))
+
+    async def get_many(self, comment_ids: List[int]) -> Sequence[Comment]:
+        return await self.repository.get_many(comment_ids)
+
+    async def get_by_user_id(
+        self, user_id: int, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
+        return await self.repository.get_by_user_id(
+            user_id=user_id, limit=limit, offset=offset, after_id=after_id
+        )
+
+    async def count(
+        self, mode: str = "exact", user_id: Optional[int] = None, cap: Optional[int] = None
+    ) -> TotalCount:
+        return await self.repository.count(mode, user_id=user_id, cap=cap)
+
+    async def get_user_stats(self, user_id: int) -> UserCommentStats:
+        return await self.repository.get_user_stats(user_id)
+
+    async def get_activity(
+        self,
+        bucket: str = "day",
+        user_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[ActivityBucket]:
+        return await self.repository.get_activity(
+            bucket, user_id=user_id, date_from=date_from, date_to=date_to
+        )
+
+    async def search(
+        self,
+        query: str,
+        user_id: Optional[int] = None,
+        limit: int = 100,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> List[CommentSearchHit]:
+        return await self.repository.search(query, user_id=user_id, limit=limit, after=after)
+
+    async def update(self, comment: Comment) -> Optional[Comment]:
+        return await self.repository.update(comment)
+
+    async def update_owned(
+        self,
+        comment_id: int,
+        user_id: int,
+        comment: Optional[str],
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> CommentUpdateResult:
+        return await self.repository.update_owned(comment_id, user_id, comment, expected_versions)
+
+    async def delete(self, comment_id: int) -> Optional[DeletedComment]:
+        return await self.repository.delete(comment_id)
+
+    async def delete_many(self, comment_ids: List[int]) -> List[DeletedComment]:
+        return await self.repository.delete_many(comment_ids)
+
+    def export(
+        self,
+        fmt: str,
+        user_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        return self.repository.export(
+            fmt, user_id=user_id, created_from=created_from, created_to=created_to
+        )
@@ -0,0 +1,73 @@
+from copy import copy
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Set
+
+from src.domain.entities.total_count import TotalCount
+from src.domain.entities.user import User
+from src.domain.repositories.user_repository import UserRepository
+from src.infrastructure.batch_loader import BatchLoader
+
+
+class BatchingUserRepository(UserRepository):
+    """get_by_id через общий BatchLoader: параллельные запросы уходят одним where id = any($1)."""
+
+    def __init__(self, repository: UserRepository, loader: BatchLoader):
+        self.repository = repository
+        self.loader = loader
+
+    async def create(self, user: User) -> Optional[User]:
+        return await self.repository.create(user)
+
+    async def create_many(self, users: List[User]) -> List[User]:
+        return await self.repository.create_many(users)
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        return copy(await self.loader.load(user_id))
+
+    async def get_many(self, user_ids: List[int]) -> List[User]:
+        return await self.repository.get_many(user_ids)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await self.repository.get_by_email(email)
+
+    async def get_existing_ids(self, user_ids: List[int]) -> Set[int]:
+        return await self.repository.get_existing_ids(user_ids)
+
+    async def get_existing_emails(self, emails: List[str]) -> Set[str]:
+        return await self.repository.get_existing_emails(emails)
+
+    async def get_all(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> List[User]:
+        return await self.repository.get_all(limit=limit, offset=offset, after_id=after_id)
+
+    async def count(self, mode: str = "exact", cap: Optional[int] = None) -> TotalCount:
+        return await self.repository.count(mode, cap=cap)
+
+    async def update(self, user: User) -> Optional[User]:
+        return await self.repository.update(user)
+
+    async def update_fields(
+        self,
+        user_id: int,
+        email: Optional[str] = None,
+        name: Optional[str] = None,
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> Optional[User]:
+        return await self.repository.update_fields(
+            user_id, email=email, name=name, expected_versions=expected_versions
+        )
+
+    async def delete(self, user_id: int) -> bool:
+        return await self.repository.delete(user_id)
+
+    async def delete_many(self, user_ids: List[int]) -> List[int]:
+        return await self.repository.delete_many(user_ids)
+
+    def export(
+        self,
+        fmt: str,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        return self.repository.export(fmt, created_from=created_from, created_to=created_to)
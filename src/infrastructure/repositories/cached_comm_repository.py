@@ -0,0 +1,185 @@
+from copy import copy
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from src.domain.entities.comment import Comment
+from src.domain.entities.comment_stats import ActivityBucket, UserCommentStats
+from src.domain.entities.comment_search_hit import CommentSearchHit
+from src.domain.entities.total_count import TotalCount
+from src.domain.repositories.comment_repository import (
+    CommentRepository,
+    CommentUpdateResult,
+    DeletedComment,
+)
+from src.infrastructure.cache import MISSING, LRUTTLCache
+from src.infrastructure.database.routing import reading_primary
+
+
+class CachedCommentRepository(CommentRepository):
+    """
+    Read-through кэш get_by_id поверх любого CommentRepository. Точные count кэшируются
+    в counts по фильтру (ключ - user_id, None - все комментарии) с коротким TTL.
+    cache=None - кэш сущностей выключен, кэшируется только count.
+    """
+
+    def __init__(
+        self,
+        repository: CommentRepository,
+        cache: Optional[LRUTTLCache],
+        counts: Optional[LRUTTLCache] = None,
+    ):
+        self.repository = repository
+        self.cache = cache
+        self.counts = counts
+
+    async def create(self, comment: Comment) -> Optional[Comment]:
+        created = await self.repository.create(comment)
+        if created:
+            if self.cache is not None:
+                self.cache.invalidate(created.id)
+                self.cache.set(created.id, created)
+            self._invalidate_counts([created.user_id])
+        return copy(created)
+
+    async def create_many(self, comments: List[Comment]) -> List[Comment]:
+        created = await self.repository.create_many(comments)
+        for comment in created:
+            self._invalidate(comment.id)
+        if created:
+            self._invalidate_counts({comment.user_id for comment in created})
+        return created
+
+    async def get_all(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
+        return await self.repository.get_all(limit=limit, offset=offset, after_id=after_id)
+
+    async def get_by_id(self, comment_id: int) -> Optional[Comment]:
+        if self.cache is None:
+            return await self.repository.get_by_id(comment_id)
+        cached = self.cache.get(comment_id)
+        if cached is not MISSING:
+            return copy(cached)
+        generation = self.cache.generation
+        with reading_primary():
+            comment = await self.repository.get_by_id(comment_id)
+        self.cache.set(comment_id, comment, generation=generation)
+        return copy(comment)
+
+    async def get_many(self, comment_ids: List[int]) -> List[Comment]:
+        if self.cache is None:
+            return await self.repository.get_many(comment_ids)
+        found = {}
+        missing = []
+        for comment_id in dict.fromkeys(comment_ids):
+            cached = self.cache.get(comment_id)
+            if cached is MISSING:
+                missing.append(comment_id)
+            elif cached is not None:
+                found[comment_id] = copy(cached)
+        if missing:
+            generation = self.cache.generation
+            with reading_primary():
+                loaded = {comment.id: comment for comment in await self.repository.get_many(missing)}
+            for comment_id in missing:
+                comment = loaded.get(comment_id)
+                self.cache.set(comment_id, comment, generation=generation)
+                if comment:
+                    found[comment_id] = copy(comment)
+        return [found[comment_id] for comment_id in sorted(found)]
+
+    async def get_by_user_id(
+        self, user_id: int, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
+        return await self.repository.get_by_user_id(
+            user_id=user_id, limit=limit, offset=offset, after_id=after_id
+        )
+
+    async def count(
+        self, mode: str = "exact", user_id: Optional[int] = None, cap: Optional[int] = None
+    ) -> TotalCount:
+        if mode != "exact" or self.counts is None:
+            return await self.repository.count(mode, user_id=user_id, cap=cap)
+        cached = self.counts.get(user_id)
+        if cached is not MISSING:
+            return copy(cached)
+        generation = self.counts.generation
+        with reading_primary():
+            total = await self.repository.count(mode, user_id=user_id)
+        self.counts.set(user_id, total, generation=generation)
+        return copy(total)
+
+    async def get_user_stats(self, user_id: int) -> UserCommentStats:
+        return await self.repository.get_user_stats(user_id)
+
+    async def get_activity(
+        self,
+        bucket: str = "day",
+        user_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[ActivityBucket]:
+        return await self.repository.get_activity(
+            bucket, user_id=user_id, date_from=date_from, date_to=date_to
+        )
+
+    async def search(
+        self,
+        query: str,
+        user_id: Optional[int] = None,
+        limit: int = 100,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> List[CommentSearchHit]:
+        return await self.repository.search(query, user_id=user_id, limit=limit, after=after)
+
+    async def update(self, comment: Comment) -> Optional[Comment]:
+        updated = await self.repository.update(comment)
+        self._invalidate(comment.id)
+        return updated
+
+    async def update_owned(
+        self,
+        comment_id: int,
+        user_id: int,
+        comment: Optional[str],
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> CommentUpdateResult:
+        result = await self.repository.update_owned(comment_id, user_id, comment, expected_versions)
+        self._invalidate(comment_id)
+        return result
+
+    async def delete(self, comment_id: int) -> Optional[DeletedComment]:
+        deleted = await self.repository.delete(comment_id)
+        self._invalidate(comment_id)
+        if deleted:
+            self._invalidate_counts([deleted.user_id])
+        return deleted
+
+    async def delete_many(self, comment_ids: List[int]) -> List[DeletedComment]:
+        deleted = await self.repository.delete_many(comment_ids)
+        for comment_id in comment_ids:
+            self._invalidate(comment_id)
+        if deleted:
+            self._invalidate_counts({comment.user_id for comment in deleted})
+        return deleted
+
+    def _invalidate(self, comment_id: int) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(comment_id)
+
+    def _invalidate_counts(self, user_ids) -> None:
+        if self.counts is not None:
+            self.counts.invalidate(None)
+            for user_id in user_ids:
+                self.counts.invalidate(user_id)
+
+    def export(
+        self,
+        fmt: str,
+        user_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        return self.repository.export(
+            fmt, user_id=user_id, created_from=created_from, created_to=created_to
+        )
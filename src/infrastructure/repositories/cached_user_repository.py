@@ -0,0 +1,160 @@
+from copy import copy
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Set
+
+from src.domain.entities.total_count import TotalCount
+from src.domain.entities.user import User
+from src.domain.repositories.user_repository import UserRepository
+from src.infrastructure.cache import MISSING, LRUTTLCache
+from src.infrastructure.database.routing import reading_primary
+
+
+class CachedUserRepository(UserRepository):
+    """
+    Read-through кэш get_by_id поверх любого UserRepository. Точный count кэшируется
+    отдельно в counts (короткий TTL) и сбрасывается при создании и удалении.
+    cache=None - кэш сущностей выключен, кэшируется только count.
+    """
+
+    def __init__(
+        self,
+        repository: UserRepository,
+        cache: Optional[LRUTTLCache],
+        counts: Optional[LRUTTLCache] = None,
+    ):
+        self.repository = repository
+        self.cache = cache
+        self.counts = counts
+
+    async def create(self, user: User) -> Optional[User]:
+        created = await self.repository.create(user)
+        if created:
+            if self.cache is not None:
+                self.cache.invalidate(created.id)
+                self.cache.set(created.id, created)
+            self._invalidate_counts()
+        return copy(created)
+
+    async def create_many(self, users: List[User]) -> List[User]:
+        created = await self.repository.create_many(users)
+        for user in created:
+            self._invalidate(user.id)
+        if created:
+            self._invalidate_counts()
+        return created
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        if self.cache is None:
+            return await self.repository.get_by_id(user_id)
+        cached = self.cache.get(user_id)
+        if cached is not MISSING:
+            return copy(cached)
+        generation = self.cache.generation
+        with reading_primary():
+            user = await self.repository.get_by_id(user_id)
+        self.cache.set(user_id, user, generation=generation)
+        return copy(user)
+
+    async def get_many(self, user_ids: List[int]) -> List[User]:
+        if self.cache is None:
+            return await self.repository.get_many(user_ids)
+        found = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = self.cache.get(user_id)
+            if cached is MISSING:
+                missing.append(user_id)
+            elif cached is not None:
+                found[user_id] = copy(cached)
+        if missing:
+            generation = self.cache.generation
+            with reading_primary():
+                loaded = {user.id: user for user in await self.repository.get_many(missing)}
+            for user_id in missing:
+                user = loaded.get(user_id)
+                self.cache.set(user_id, user, generation=generation)
+                if user:
+                    found[user_id] = copy(user)
+        return [found[user_id] for user_id in sorted(found)]
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        if self.cache is None:
+            return await self.repository.get_by_email(email)
+        generation = self.cache.generation
+        with reading_primary():
+            user = await self.repository.get_by_email(email)
+        if user:
+            self.cache.set(user.id, user, generation=generation)
+        return copy(user)
+
+    async def get_existing_ids(self, user_ids: List[int]) -> Set[int]:
+        return await self.repository.get_existing_ids(user_ids)
+
+    async def get_existing_emails(self, emails: List[str]) -> Set[str]:
+        return await self.repository.get_existing_emails(emails)
+
+    async def get_all(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> List[User]:
+        return await self.repository.get_all(limit=limit, offset=offset, after_id=after_id)
+
+    async def count(self, mode: str = "exact", cap: Optional[int] = None) -> TotalCount:
+        if mode != "exact" or self.counts is None:
+            return await self.repository.count(mode, cap=cap)
+        cached = self.counts.get(None)
+        if cached is not MISSING:
+            return copy(cached)
+        generation = self.counts.generation
+        with reading_primary():
+            total = await self.repository.count(mode)
+        self.counts.set(None, total, generation=generation)
+        return copy(total)
+
+    async def update(self, user: User) -> Optional[User]:
+        updated = await self.repository.update(user)
+        self._invalidate(user.id)
+        return updated
+
+    async def update_fields(
+        self,
+        user_id: int,
+        email: Optional[str] = None,
+        name: Optional[str] = None,
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> Optional[User]:
+        updated = await self.repository.update_fields(
+            user_id, email=email, name=name, expected_versions=expected_versions
+        )
+        self._invalidate(user_id)
+        return updated
+
+    async def delete(self, user_id: int) -> bool:
+        result = await self.repository.delete(user_id)
+        self._invalidate(user_id)
+        if result:
+            self._invalidate_counts()
+        return result
+
+    async def delete_many(self, user_ids: List[int]) -> List[int]:
+        deleted = await self.repository.delete_many(user_ids)
+        for user_id in user_ids:
+            self._invalidate(user_id)
+        if deleted:
+            self._invalidate_counts()
+        return deleted
+
+    def _invalidate(self, user_id: int) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(user_id)
+
+    def _invalidate_counts(self) -> None:
+        if self.counts is not None:
+            self.counts.invalidate(None)
+
+    def export(
+        self,
+        fmt: str,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        return self.repository.export(fmt, created_from=created_from, created_to=created_to)
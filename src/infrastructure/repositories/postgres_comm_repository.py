@@ -1,92 +1,447 @@
-from typing import List, Optional
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+import asyncpg
 
 from src.domain.entities.comment import Comment
-from src.domain.repositories.comment_repository import CommentRepository
+from src.domain.entities.comment_stats import ActivityBucket, UserCommentStats
+from src.domain.entities.comment_batch import CommentBatch
+from src.domain.entities.comment_search_hit import CommentSearchHit
+from src.domain.entities.total_count import TotalCount
+from src.domain.exceptions import EntityNotFound
+from src.domain.repositories.comment_repository import (
+    CommentRepository,
+    CommentUpdateResult,
+    DeletedComment,
+)
+from src.infrastructure.config import settings
 from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.counting import CountQueries
+from src.infrastructure.database.export import build_export_query, build_where
+from src.infrastructure.database.records import CommentRecord, CommentSearchRecord
+from src.infrastructure.database.statements import statements
+
+# comments секционирована по месяцам created_at (миграция 010), а запросы приходят по id.
+# comment_id_ranges (миграция 008) хранит диапазон id каждого месяца: границы created_at по
+# нему считаются один раз на запрос (InitPlan), и Postgres пропускает остальные партиции
+# при выполнении - в том числе в generic-плане prepared statement'а.
+def _months_of(ids: str) -> str:
+    """created_at в месяцах, диапазоны id которых задевает условие ids."""
+    return f"""created_at >= (select min(month)::timestamp from comment_id_ranges where {ids})
+      and created_at < (select max(month)::timestamp + interval '1 month' from comment_id_ranges where {ids})"""
+
+
+def _months_after(after_id: str) -> str:
+    """created_at в месяцах, где есть id больше after_id."""
+    return f"created_at >= (select min(month)::timestamp from comment_id_ranges where max_id > {after_id})"
+
+
+_MONTHS_OF_ID = _months_of("$1 between min_id and max_id")
+_MONTHS_OF_IDS = _months_of("exists (select 1 from unnest($1::int[]) as i where i between min_id and max_id)")
+
+
+# проверка автора и вставка - один statement, без отдельного get_by_id
+CREATE = statements.register(
+    "comments.create",
+    """
+    insert into comments (user_id, comment)
+    select $1, $2
+    where exists (select 1 from users where id = $1)
+    returning id, user_id, comment, created_at, updated_at
+    """,
+    CommentRecord,
+)
+
+RESERVE_IDS = statements.register(
+    "comments.reserve_ids",
+    """
+    select nextval(pg_get_serial_sequence('comments', 'id')) as id,
+           localtimestamp as now
+    from generate_series(1, $1)
+    """,
+)
+
+GET_ALL_AFTER = statements.register(
+    "comments.get_all_after",
+    """
+    select id, user_id, comment, created_at, updated_at
+    from comments
+    where id > $1 and {after}
+    order by id
+    limit $2
+    """.format(after=_months_after("$1")),
+    CommentRecord,
+    readonly=True,
+)
+
+GET_ALL = statements.register(
+    "comments.get_all",
+    """
+    select id, user_id, comment, created_at, updated_at
+    from comments
+    order by id
+    limit $1 offset $2
+    """,
+    CommentRecord,
+    readonly=True,
+)
+
+GET_BY_ID = statements.register(
+    "comments.get_by_id",
+    """
+    select id, user_id, comment, created_at, updated_at
+    from comments
+    where id = $1 and {months}
+    """.format(months=_MONTHS_OF_ID),
+    CommentRecord,
+    readonly=True,
+)
+
+GET_MANY = statements.register(
+    "comments.get_many",
+    """
+    select id, user_id, comment, created_at, updated_at
+    from comments
+    where id = any($1::int[]) and {months}
+    order by id
+    """.format(months=_MONTHS_OF_IDS),
+    CommentRecord,
+    readonly=True,
+)
+
+GET_BY_USER_ID_AFTER = statements.register(
+    "comments.get_by_user_id_after",
+    """
+    select id, user_id, comment, created_at, updated_at
+    from comments
+    where user_id = $1 and id > $2 and {after}
+    order by id
+    limit $3
+    """.format(after=_months_after("$2")),
+    CommentRecord,
+    readonly=True,
+)
+
+GET_BY_USER_ID = statements.register(
+    "comments.get_by_user_id",
+    """
+    select id, user_id, comment, created_at, updated_at
+    from comments
+    where user_id = $1
+    order by id
+    limit $2 offset $3
+    """,
+    CommentRecord,
+    readonly=True,
+)
+
+UPDATE = statements.register(
+    "comments.update",
+    """
+    update comments
+    set comment = $1, updated_at = current_timestamp
+    where id = $2 and {months}
+    returning id, user_id, comment, created_at, updated_at
+    """.format(months=_months_of("$2 between min_id and max_id")),
+    CommentRecord,
+)
+
+UPDATE_OWNED = statements.register(
+    "comments.update_owned",
+    """
+    with target as (
+        select id, user_id
+        from comments
+        where id = $1 and {months}
+    ), updated as (
+        -- версия проверяется в where самого update: при параллельной записи Postgres
+        -- перепроверяет его на новой версии строки, а колонку из снимка CTE - нет
+        update comments c
+        set comment = coalesce(nullif($3::text, ''), c.comment),
+            updated_at = current_timestamp
+        where c.id = $1 and {months} and c.user_id = $2
+          and ($4::timestamp[] is null or c.updated_at = any($4))
+        returning c.id, c.user_id, c.comment, c.created_at, c.updated_at
+    )
+    select exists (select 1 from users where id = $2) as user_exists,
+           exists (select 1 from target) as comment_exists,
+           exists (select 1 from target where user_id = $2) as owned,
+           u.id, u.user_id, u.comment, u.created_at, u.updated_at
+    from (select 1) as one
+    left join updated u on true
+    """.format(months=_MONTHS_OF_ID),
+)
+
+DELETE = statements.register(
+    "comments.delete",
+    """
+    delete from comments
+    where id = $1 and {months}
+    returning id, user_id
+    """.format(months=_MONTHS_OF_ID),
+)
+
+DELETE_MANY = statements.register(
+    "comments.delete_many",
+    """
+    delete from comments
+    where id = any($1::int[]) and {months}
+    returning id, user_id
+    """.format(months=_MONTHS_OF_IDS),
+)
+
+# Поиск: GIN-индекс отдаёт совпадения без порядка, поэтому ранжируются не больше
+# settings.search_max_candidates первых найденных строк - стоимость запроса ограничена
+# и для слов, которые встречаются в миллионах комментариев. Страница - keyset по (rank, id);
+# ts_headline (дорогой, читает весь текст) считается только для строк страницы.
+_SEARCH_PAGE = """
+    with candidates as (
+        select id, user_id, comment, created_at, updated_at,
+               ts_rank_cd(search_vector, websearch_to_tsquery('simple', $1)) as rank
+        from {source}
+        where search_vector @@ websearch_to_tsquery('simple', $1)
+        limit $2
+    ), page as (
+        select id, user_id, comment, created_at, updated_at, rank
+        from candidates
+        where (rank, id) < ($3::real, $4::int)
+        order by rank desc, id desc
+        limit $5
+    )
+    select id, user_id, comment, created_at, updated_at, rank,
+           ts_headline('simple', comment, websearch_to_tsquery('simple', $1),
+                       'MaxFragments=2, MaxWords=20, MinWords=5') as snippet
+    from page
+    order by rank desc, id desc
+"""
+
+SEARCH = statements.register(
+    "comments.search", _SEARCH_PAGE.format(source="comments"), CommentSearchRecord, readonly=True
+)
+
+# комментарии пользователя читаются по idx_comments_user_id_id и фильтруются по @@ на месте:
+# offset 0 не даёт планировщику поднять подзапрос и склеить индексы через BitmapAnd - в generic
+# плане (prepared statement) он не знает частоту слова и строил бы bitmap по всем совпадениям
+SEARCH_BY_USER_ID = statements.register(
+    "comments.search_by_user_id",
+    _SEARCH_PAGE.format(
+        source="""(
+            select id, user_id, comment, created_at, updated_at, search_vector
+            from comments
+            where user_id = $6
+            offset 0
+        ) as own"""
+    ),
+    CommentSearchRecord,
+    readonly=True,
+)
+
+# rollup-таблицы поддерживаются триггерами на comments (миграция 007)
+USER_STATS = statements.register(
+    "comments.user_stats",
+    """
+    select $1::int as user_id,
+           coalesce((select comment_count from user_comment_stats where user_id = $1), 0) as comment_count,
+           (select min(day) from user_comment_daily_stats where user_id = $1 and comment_count > 0)
+               as first_comment_day,
+           (select max(day) from user_comment_daily_stats where user_id = $1 and comment_count > 0)
+               as last_comment_day
+    """,
+    readonly=True,
+)
+
+ACTIVITY = statements.register(
+    "comments.activity",
+    """
+    select date_trunc($1, day::timestamp)::date as start, sum(comment_count)::bigint as comment_count
+    from comment_daily_stats
+    where day >= $2 and day < $3
+    group by 1
+    having sum(comment_count) <> 0
+    order by 1
+    """,
+    readonly=True,
+)
+
+ACTIVITY_BY_USER_ID = statements.register(
+    "comments.activity_by_user_id",
+    """
+    select date_trunc($1, day::timestamp)::date as start, sum(comment_count)::bigint as comment_count
+    from user_comment_daily_stats
+    where user_id = $4 and day >= $2 and day < $3
+    group by 1
+    having sum(comment_count) <> 0
+    order by 1
+    """,
+    readonly=True,
+)
+
+COUNT_ALL = CountQueries("comments", "comments")
+COUNT_BY_USER_ID = CountQueries("comments.by_user_id", "comments", "where user_id = $1", params=1)
+
 
 class PostgresCommentRepository(CommentRepository):
     def __init__(self, db: DatabaseConnection):
         self.db = db
 
-    def _map_row_to_comment(self, row) -> Optional[Comment]:
+    def _map_row_to_comment(self, row: Optional[CommentRecord]) -> Optional[Comment]:
         if not row:
             return None
-        return Comment(
-            id=row['id'],
-            user_id=row['user_id'],
-            comment=row['comment'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at']
-        )
-    
-    async def create(self, comment: Comment) -> Comment:
-        row = await self.db.fetchrow(
-            """
-            insert into comments (user_id, comment)
-            values ($1, $2)
-            returning id, user_id, comment, created_at, updated_at
-            """,
-            comment.user_id, comment.comment
-        )
+        return row.to_entity()
+
+    def _map_rows(self, rows: List[CommentRecord]) -> Sequence[Comment]:
+        if settings.columnar_comment_lists:
+            return CommentBatch.from_rows(rows)
+        return [row.to_entity() for row in rows]
+
+    async def create(self, comment: Comment) -> Optional[Comment]:
+        try:
+            row = await self.db.fetchrow(CREATE, comment.user_id, comment.comment)
+        except asyncpg.ForeignKeyViolationError:
+            return None
         return self._map_row_to_comment(row)
-    
-    async def get_all(self, limit: int = 100, offset: int = 0) -> List[Comment]:
-        rows = await self.db.fetch(
-            """
-            select id, user_id, comment, created_at, updated_at
-            from comments
-            order by id
-            limit $1 offset $2
-            """,
-            limit, offset
-        )
-        return [self._map_row_to_comment(row) for row in rows]
-    
-    
+
+    async def create_many(self, comments: List[Comment]) -> List[Comment]:
+        if not comments:
+            return []
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await self.db.fetch(RESERVE_IDS, len(comments), connection=conn)
+                records = [
+                    (row['id'], comment.user_id, comment.comment, row['now'], row['now'])
+                    for row, comment in zip(rows, comments)
+                ]
+                try:
+                    await conn.copy_records_to_table(
+                        'comments',
+                        records=records,
+                        columns=['id', 'user_id', 'comment', 'created_at', 'updated_at'],
+                    )
+                except asyncpg.ForeignKeyViolationError as e:
+                    raise EntityNotFound(str(e)) from e
+        return [Comment(*record) for record in records]
+
+    async def get_all(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
+        if after_id is not None:
+            rows = await self.db.fetch(GET_ALL_AFTER, after_id, limit)
+        else:
+            rows = await self.db.fetch(GET_ALL, limit, offset)
+        return self._map_rows(rows)
+
     async def get_by_id(self, comment_id: int) -> Optional[Comment]:
-        row = await self.db.fetchrow(
-            """
-            select id, user_id, comment, created_at, updated_at
-            from comments
-            where id = $1
-            """,
-            comment_id
-        )
+        row = await self.db.fetchrow(GET_BY_ID, comment_id)
         return self._map_row_to_comment(row)
-    
-    
-    async def get_by_user_id(self, user_id: int, limit: int = 100, offset: int = 0) -> List[Comment]:
-        rows = await self.db.fetch(
-            """
-            select id, user_id, comment, created_at, updated_at
-            from comments
-            where user_id = $1
-            order by id
-            limit $2 offset $3
-        """, user_id, limit, offset
-        )
-        return [self._map_row_to_comment(row) for row in rows]
-    
-        
+
+    async def get_many(self, comment_ids: List[int]) -> Sequence[Comment]:
+        rows = await self.db.fetch(GET_MANY, comment_ids)
+        return self._map_rows(rows)
+
+    async def get_by_user_id(
+        self, user_id: int, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> Sequence[Comment]:
+        if after_id is not None:
+            rows = await self.db.fetch(GET_BY_USER_ID_AFTER, user_id, after_id, limit)
+        else:
+            rows = await self.db.fetch(GET_BY_USER_ID, user_id, limit, offset)
+        return self._map_rows(rows)
+
+    async def count(
+        self, mode: str = "exact", user_id: Optional[int] = None, cap: Optional[int] = None
+    ) -> TotalCount:
+        if user_id is not None:
+            return await COUNT_BY_USER_ID.count(self.db, mode, (user_id,), cap=cap)
+        return await COUNT_ALL.count(self.db, mode, cap=cap)
+
+    async def get_user_stats(self, user_id: int) -> UserCommentStats:
+        row = await self.db.fetchrow(USER_STATS, user_id)
+        return UserCommentStats(*row.values())
+
+    async def get_activity(
+        self,
+        bucket: str = "day",
+        user_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[ActivityBucket]:
+        args = (bucket, date_from or date.min, date_to or date.max)
+        if user_id is not None:
+            rows = await self.db.fetch(ACTIVITY_BY_USER_ID, *args, user_id)
+        else:
+            rows = await self.db.fetch(ACTIVITY, *args)
+        return [ActivityBucket(row['start'], row['comment_count']) for row in rows]
+
+    async def search(
+        self,
+        query: str,
+        user_id: Optional[int] = None,
+        limit: int = 100,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> List[CommentSearchHit]:
+        # первая страница - курсор (+inf, 0): под условие (rank, id) < курсора подходит любая строка
+        rank, after_id = after if after is not None else (float("inf"), 0)
+        args = (query, settings.search_max_candidates, rank, after_id, limit)
+        if user_id is not None:
+            rows = await self.db.fetch(SEARCH_BY_USER_ID, *args, user_id)
+        else:
+            rows = await self.db.fetch(SEARCH, *args)
+        return [row.to_entity() for row in rows]
+
     async def update(self, comment: Comment) -> Optional[Comment]:
-        row = await self.db.fetchrow(
-            """
-            update comments
-            set comment = $1, updated_at = current_timestamp
-            where id = $2
-            returning  id, user_id, comment, created_at, updated_at
-            """, comment.comment, comment.id
-        )
+        row = await self.db.fetchrow(UPDATE, comment.comment, comment.id)
         return self._map_row_to_comment(row)
 
+    async def update_owned(
+        self,
+        comment_id: int,
+        user_id: int,
+        comment: Optional[str],
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> CommentUpdateResult:
+        row = await self.db.fetchrow(UPDATE_OWNED, comment_id, user_id, comment, expected_versions)
+        updated = None
+        if row['id'] is not None:
+            updated = Comment(row['id'], row['user_id'], row['comment'], row['created_at'], row['updated_at'])
+        return CommentUpdateResult(
+            comment=updated,
+            user_exists=row['user_exists'],
+            comment_exists=row['comment_exists'],
+            owned=row['owned'],
+            # свой существующий комментарий не обновился - не совпала версия
+            version_matches=updated is not None or expected_versions is None,
+        )
+
+    async def delete(self, comment_id: int) -> Optional[DeletedComment]:
+        row = await self.db.fetchrow(DELETE, comment_id)
+        return DeletedComment(row['id'], row['user_id']) if row else None
 
-    
-    async def delete(self, comment_id: int) -> bool:
-        result = await self.db.execute(
-            """
-            delete from comments
-            where id = $1
+    async def delete_many(self, comment_ids: List[int]) -> List[DeletedComment]:
+        rows = await self.db.fetch(DELETE_MANY, comment_ids)
+        return [DeletedComment(row['id'], row['user_id']) for row in rows]
+
+    async def export(
+        self,
+        fmt: str,
+        user_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        where, args = build_where([
+            ("user_id = {}", user_id),
+            ("created_at >= {}", created_from),
+            ("created_at < {}", created_to),
+        ])
+        query, options = build_export_query(
+            f"""
+            select id, user_id, comment, created_at, updated_at
+            from comments
+            {where}
+            order by id
             """,
-            comment_id
+            fmt
         )
-        return result == "DELETE 1"
\ No newline at end of file
+        async for chunk in self.db.copy_from_query_stream(
+            query, *args, queue_size=settings.export_queue_size, **options
+        ):
+            yield chunk
@@ -1,89 +1,274 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Set
 
+import asyncpg
+
+from src.domain.entities.total_count import TotalCount
 from src.domain.entities.user import User
+from src.domain.exceptions import EntityAlreadyExists
 from src.domain.repositories.user_repository import UserRepository
+from src.infrastructure.config import settings
 from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.counting import CountQueries
+from src.infrastructure.database.export import build_export_query, build_where
+from src.infrastructure.database.records import UserRecord
+from src.infrastructure.database.statements import statements
+
+# on conflict вместо get_by_email перед вставкой: один round trip и без гонки
+CREATE = statements.register(
+    "users.create",
+    """
+    insert into users (email, name)
+    values ($1, $2)
+    on conflict (email) do nothing
+    returning id, email, name, created_at, updated_at
+    """,
+    UserRecord,
+)
+
+# id и время выдаём заранее одним запросом, чтобы COPY не требовал returning
+RESERVE_IDS = statements.register(
+    "users.reserve_ids",
+    """
+    select nextval(pg_get_serial_sequence('users', 'id')) as id,
+           localtimestamp as now
+    from generate_series(1, $1)
+    """,
+)
+
+GET_BY_ID = statements.register(
+    "users.get_by_id",
+    """
+    select id, email, name, created_at, updated_at
+    from users
+    where id = $1
+    """,
+    UserRecord,
+    readonly=True,
+)
+
+GET_MANY = statements.register(
+    "users.get_many",
+    """
+    select id, email, name, created_at, updated_at
+    from users
+    where id = any($1::int[])
+    order by id
+    """,
+    UserRecord,
+    readonly=True,
+)
+
+GET_BY_EMAIL = statements.register(
+    "users.get_by_email",
+    """
+    select id, email, name, created_at, updated_at
+    from users
+    where email = $1
+    """,
+    UserRecord,
+    readonly=True,
+)
+
+GET_EXISTING_IDS = statements.register(
+    "users.get_existing_ids",
+    """
+    select id
+    from users
+    where id = any($1::int[])
+    """,
+)
+
+GET_EXISTING_EMAILS = statements.register(
+    "users.get_existing_emails",
+    """
+    select email
+    from users
+    where email = any($1::varchar[])
+    """,
+)
+
+GET_ALL_AFTER = statements.register(
+    "users.get_all_after",
+    """
+    select id, email, name, created_at, updated_at
+    from users
+    where id > $1
+    order by id
+    limit $2
+    """,
+    UserRecord,
+    readonly=True,
+)
+
+GET_ALL = statements.register(
+    "users.get_all",
+    """
+    select id, email, name, created_at, updated_at
+    from users
+    order by id
+    limit $1 offset $2
+    """,
+    UserRecord,
+    readonly=True,
+)
+
+UPDATE = statements.register(
+    "users.update",
+    """
+    update users
+    set email = $1, name = $2, updated_at = current_timestamp
+    where id = $3
+    returning id, email, name, created_at, updated_at
+    """,
+    UserRecord,
+)
+
+UPDATE_FIELDS = statements.register(
+    "users.update_fields",
+    """
+    update users
+    set email = coalesce($2, email),
+        name = coalesce($3, name),
+        updated_at = current_timestamp
+    where id = $1 and ($4::timestamp[] is null or updated_at = any($4))
+    returning id, email, name, created_at, updated_at
+    """,
+    UserRecord,
+)
+
+DELETE = statements.register(
+    "users.delete",
+    """
+    delete from users
+    where id = $1
+    """,
+)
+
+DELETE_MANY = statements.register(
+    "users.delete_many",
+    """
+    delete from users
+    where id = any($1::int[])
+    returning id
+    """,
+)
+
+COUNT_ALL = CountQueries("users", "users")
 
 
 class PostgresUserRepository(UserRepository):
     def __init__(self, db: DatabaseConnection):
         self.db = db
-    
-    def _map_row_to_user(self, row) -> User:
+
+    def _map_row_to_user(self, row: Optional[UserRecord]) -> Optional[User]:
         if not row:
             return None
-        return User(
-            id=row['id'],
-            email=row['email'],
-            name=row['name'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at']
-        )
-    
-    async def create(self, user: User) -> User:
-        row = await self.db.fetchrow(
-            """
-            insert into users (email, name)
-            values ($1, $2)
-            returning id, email, name, created_at, updated_at
-            """,
-            user.email, user.name
-        )
+        return row.to_entity()
+
+    async def create(self, user: User) -> Optional[User]:
+        row = await self.db.fetchrow(CREATE, user.email, user.name)
         return self._map_row_to_user(row)
-    
+
+    async def create_many(self, users: List[User]) -> List[User]:
+        if not users:
+            return []
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await self.db.fetch(RESERVE_IDS, len(users), connection=conn)
+                records = [
+                    (row['id'], user.email, user.name, row['now'], row['now'])
+                    for row, user in zip(rows, users)
+                ]
+                try:
+                    await conn.copy_records_to_table(
+                        'users',
+                        records=records,
+                        columns=['id', 'email', 'name', 'created_at', 'updated_at'],
+                    )
+                except asyncpg.UniqueViolationError as e:
+                    raise EntityAlreadyExists(str(e)) from e
+        return [User(*record) for record in records]
+
     async def get_by_id(self, user_id: int) -> Optional[User]:
-        row = await self.db.fetchrow(
-            """
-            select id, email, name, created_at, updated_at
-            from users
-            where id = $1
-            """,
-            user_id
-        )
+        row = await self.db.fetchrow(GET_BY_ID, user_id)
         return self._map_row_to_user(row)
-    
+
+    async def get_many(self, user_ids: List[int]) -> List[User]:
+        rows = await self.db.fetch(GET_MANY, user_ids)
+        return [row.to_entity() for row in rows]
+
     async def get_by_email(self, email: str) -> Optional[User]:
-        row = await self.db.fetchrow(
-            """
-            select id, email, name, created_at, updated_at
-            from users
-            where email = $1
-            """,
-            email.lower()
-        )
+        row = await self.db.fetchrow(GET_BY_EMAIL, email.lower())
         return self._map_row_to_user(row)
-    
-    async def get_all(self, limit: int = 100, offset: int = 0) -> List[User]:
-        rows = await self.db.fetch(
-            """
-            select id, email, name, created_at, updated_at
-            from users
-            order by id
-            limit $1 offset $2
-            """,
-            limit, offset
-        )
-        return [self._map_row_to_user(row) for row in rows]
-    
+
+    async def get_existing_ids(self, user_ids: List[int]) -> Set[int]:
+        rows = await self.db.fetch(GET_EXISTING_IDS, user_ids)
+        return {row['id'] for row in rows}
+
+    async def get_existing_emails(self, emails: List[str]) -> Set[str]:
+        rows = await self.db.fetch(GET_EXISTING_EMAILS, [email.lower() for email in emails])
+        return {row['email'] for row in rows}
+
+    async def get_all(
+        self, limit: int = 100, offset: int = 0, after_id: Optional[int] = None
+    ) -> List[User]:
+        if after_id is not None:
+            rows = await self.db.fetch(GET_ALL_AFTER, after_id, limit)
+        else:
+            rows = await self.db.fetch(GET_ALL, limit, offset)
+        return [row.to_entity() for row in rows]
+
+    async def count(self, mode: str = "exact", cap: Optional[int] = None) -> TotalCount:
+        return await COUNT_ALL.count(self.db, mode, cap=cap)
+
     async def update(self, user: User) -> Optional[User]:
-        row = await self.db.fetchrow(
-            """
-            update users
-            set email = $1, name = $2, updated_at = current_timestamp
-            where id = $3
-            returning id, email, name, created_at, updated_at
-            """,
-            user.email, user.name, user.id
-        )
+        row = await self.db.fetchrow(UPDATE, user.email, user.name, user.id)
+        return self._map_row_to_user(row)
+
+    async def update_fields(
+        self,
+        user_id: int,
+        email: Optional[str] = None,
+        name: Optional[str] = None,
+        expected_versions: Optional[List[datetime]] = None,
+    ) -> Optional[User]:
+        try:
+            row = await self.db.fetchrow(
+                UPDATE_FIELDS, user_id, email.lower() if email else None, name or None, expected_versions
+            )
+        except asyncpg.UniqueViolationError as e:
+            raise EntityAlreadyExists(f"User with email {email} already exists") from e
         return self._map_row_to_user(row)
-    
+
     async def delete(self, user_id: int) -> bool:
-        result = await self.db.execute(
-            """
-            delete from users
-            where id = $1
-            """,
-            user_id
-        )
+        result = await self.db.execute(DELETE, user_id)
         return result == "DELETE 1"
 
+    async def delete_many(self, user_ids: List[int]) -> List[int]:
+        rows = await self.db.fetch(DELETE_MANY, user_ids)
+        return [row['id'] for row in rows]
+
+    async def export(
+        self,
+        fmt: str,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        where, args = build_where([
+            ("created_at >= {}", created_from),
+            ("created_at < {}", created_to),
+        ])
+        query, options = build_export_query(
+            f"""
+            select id, email, name, created_at, updated_at
+            from users
+            {where}
+            order by id
+            """,
+            fmt
+        )
+        async for chunk in self.db.copy_from_query_stream(
+            query, *args, queue_size=settings.export_queue_size, **options
+        ):
+            yield chunk
@@ -0,0 +1,229 @@
+"""
+Запуск API. debug - один процесс uvicorn с reload. Иначе pre-fork supervisor: N воркеров
+(APP_WORKERS, 0 - по числу доступных CPU) принимают соединения с одного сокета или каждый
+со своего через SO_REUSEPORT (APP_REUSE_PORT). SIGHUP - поочерёдный перезапуск воркеров
+без простоя, SIGTERM/SIGINT - graceful остановка, упавший воркер поднимается заново.
+Воркеры пишут снимки метрик в общий каталог, /metrics в любом из них отдаёт сумму.
+"""
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from multiprocessing.synchronize import Event
+from typing import List, Optional
+
+import uvicorn
+
+from src.infrastructure.config import settings
+from src.infrastructure.metrics import clear_snapshots
+
+APP = "src.presentation.api.app:app"
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def cpu_count() -> int:
+    try:
+        # учитывает cpuset контейнера, в отличие от os.cpu_count()
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def resolve_workers(workers: int) -> int:
+    return workers if workers > 0 else cpu_count()
+
+
+def server_config(**overrides) -> uvicorn.Config:
+    options = dict(
+        host=settings.app_host,
+        port=settings.app_port,
+        backlog=settings.app_backlog,
+        timeout_keep_alive=settings.app_keepalive_timeout,
+        limit_concurrency=settings.app_limit_concurrency or None,
+        limit_max_requests=settings.app_limit_max_requests or None,
+        loop=settings.app_loop,
+        http=settings.app_http,
+        timeout_graceful_shutdown=settings.app_graceful_timeout,
+    )
+    options.update(overrides)
+    return uvicorn.Config(APP, **options)
+
+
+def bind_socket(host: str, port: int, backlog: int, reuse_port: bool = False) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn.Server, который сообщает supervisor'у, что lifespan startup прошёл."""
+
+    def __init__(self, config: uvicorn.Config, ready: Event):
+        super().__init__(config)
+        self._ready = ready
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            self._ready.set()
+
+
+def _serve(config: uvicorn.Config, sock: Optional[socket.socket], ready: Event) -> None:
+    if sock is None:
+        sock = bind_socket(config.host, config.port, config.backlog, reuse_port=True)
+    _WorkerServer(config, ready).run(sockets=[sock])
+
+
+class Worker:
+    __slots__ = ("process", "ready")
+
+    def __init__(self, process: SpawnProcess, ready: Event):
+        self.process = process
+        self.ready = ready
+
+
+class Supervisor:
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        workers: int,
+        reuse_port: bool = False,
+        graceful_timeout: float = 30.0,
+        start_timeout: float = 60.0,
+    ):
+        self.config = config
+        self.workers = workers
+        self.reuse_port = reuse_port
+        self.graceful_timeout = graceful_timeout
+        self.start_timeout = start_timeout
+        self.processes: List[Worker] = []
+        self._context = multiprocessing.get_context("spawn")
+        self._socket: Optional[socket.socket] = None
+        self._signals: List[int] = []
+        self._wakeup = threading.Event()
+
+    def run(self) -> None:
+        if not self.reuse_port:
+            self._socket = bind_socket(self.config.host, self.config.port, self.config.backlog)
+        for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(sig, self._on_signal)
+        logger.info(
+            "Supervisor [%d] starting %d workers on %s:%d (%s)",
+            os.getpid(), self.workers, self.config.host, self.config.port,
+            "SO_REUSEPORT" if self.reuse_port else "shared socket",
+        )
+        self.processes = [self._spawn() for _ in range(self.workers)]
+        try:
+            while True:
+                self._wakeup.wait(0.5)
+                self._wakeup.clear()
+                while self._signals:
+                    sig = self._signals.pop(0)
+                    if sig == signal.SIGHUP:
+                        self.reload()
+                    else:
+                        return
+                self._respawn_dead()
+        finally:
+            self._stop(self.processes)
+            if self._socket is not None:
+                self._socket.close()
+            logger.info("Supervisor [%d] stopped", os.getpid())
+
+    def _on_signal(self, sig: int, frame) -> None:
+        self._signals.append(sig)
+        self._wakeup.set()
+
+    def _spawn(self) -> Worker:
+        ready = self._context.Event()
+        process = self._context.Process(
+            target=_serve,
+            kwargs={"config": self.config, "sock": self._socket, "ready": ready},
+        )
+        process.start()
+        return Worker(process, ready)
+
+    def _respawn_dead(self) -> None:
+        for index, worker in enumerate(self.processes):
+            if worker.process.is_alive():
+                continue
+            logger.warning(
+                "Worker [%d] exited with code %s, restarting", worker.process.pid, worker.process.exitcode
+            )
+            if not worker.ready.is_set():
+                # не дошёл до startup (нет БД, ошибка импорта) - не крутим перезапуск вхолостую
+                time.sleep(1.0)
+            self.processes[index] = self._spawn()
+
+    def reload(self) -> None:
+        """
+        Заменяет воркеры по одному: новый процесс (со свежим кодом) поднимается и проходит
+        startup, только потом старый получает SIGTERM и дообслуживает текущие запросы.
+        Если новый воркер не стартовал, перезапуск прерывается и старые остаются работать.
+        """
+        logger.info("Supervisor [%d] reloading %d workers", os.getpid(), len(self.processes))
+        for index, old in enumerate(list(self.processes)):
+            new = self._spawn()
+            deadline = time.monotonic() + self.start_timeout
+            while not new.ready.wait(0.1):
+                if not new.process.is_alive() or time.monotonic() > deadline:
+                    logger.error("Reload aborted: worker [%d] failed to start", new.process.pid)
+                    self._stop([new])
+                    return
+            self.processes[index] = new
+            self._stop([old])
+        logger.info("Supervisor [%d] reload complete", os.getpid())
+
+    def _stop(self, workers: List[Worker]) -> None:
+        for worker in workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        # uvicorn сам ограничивает дообслуживание timeout_graceful_shutdown, тут - запас на lifespan
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        for worker in workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning("Worker [%d] did not stop in time, killing", worker.process.pid)
+                worker.process.kill()
+                worker.process.join()
+
+
+def run() -> None:
+    if settings.debug:
+        # reload-режим uvicorn запускает приложение в одном дочернем процессе
+        os.environ["APP_WORKERS"] = "1"
+        uvicorn.run(APP, host=settings.app_host, port=settings.app_port, reload=True)
+        return
+
+    workers = resolve_workers(settings.app_workers)
+    # воркеры - spawn-процессы со своим Settings: так они знают, на сколько делить пул
+    os.environ["APP_WORKERS"] = str(workers)
+    settings.app_workers = workers
+    # /metrics обслуживает один воркер - остальные оставляют ему снимки своих метрик
+    directory = settings.metrics_multiprocess_dir or tempfile.mkdtemp(prefix="metrics-")
+    os.makedirs(directory, exist_ok=True)
+    clear_snapshots(directory)
+    os.environ["METRICS_MULTIPROCESS_DIR"] = directory
+    try:
+        Supervisor(
+            server_config(),
+            workers,
+            reuse_port=settings.app_reuse_port,
+            graceful_timeout=settings.app_graceful_timeout,
+        ).run()
+    finally:
+        if not settings.metrics_multiprocess_dir:
+            shutil.rmtree(directory, ignore_errors=True)
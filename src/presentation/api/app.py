@@ -1,23 +1,69 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
+from src.infrastructure.config import settings
 from src.infrastructure.database.connection import db_connection
+from src.infrastructure.database.partitions import ensure_comment_partitions
+from src.infrastructure.database.statements import statements
+from src.infrastructure.metrics import CONTENT_TYPE, metrics
+from src.presentation.api.middleware import (
+    REQUEST_ID_HEADER,
+    ClientKeyMiddleware,
+    RequestIdMiddleware,
+    RequestMetricsMiddleware,
+)
+from src.presentation.api.dependencies import (
+    comment_cache,
+    comment_loader,
+    user_cache,
+    user_loader,
+)
+from src.presentation.api.compression import CompressionMiddleware, parse_route_levels
+from src.presentation.api.conditional import ETAG_HEADER
+from src.presentation.api.pagination import NEXT_CURSOR_HEADER
 from src.presentation.api.routes.users import router as users_router
 from src.presentation.api.routes.comments import router as comments_router
+from src.presentation.api.routes.admin import router as admin_router
 from src.infrastructure.logging_config.logging_config import setup_logging
 
 setup_logging()
 logger = logging.getLogger('my_app')
+health_logger = logging.getLogger('my_app.health')
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await db_connection.connect()
+    # партиции наперёд - на случай, если cron (migration_runner partitions) давно не запускался;
+    # без них новые комментарии уходят в comments_default
+    try:
+        async with db_connection.acquire() as connection:
+            created = await ensure_comment_partitions(connection)
+        if created:
+            logger.info("Created comment partitions: %s", ", ".join(created))
+    except Exception:
+        logger.warning("Could not ensure comment partitions", exc_info=True)
+    directory = settings.metrics_multiprocess_dir
+    flusher = asyncio.create_task(_flush_metrics(directory)) if directory else None
     yield
+    if flusher:
+        flusher.cancel()
+        with suppress(asyncio.CancelledError):
+            await flusher
+        # последний снимок - счётчики остановленного воркера остаются в общем /metrics
+        metrics.write(directory)
     await db_connection.disconnect()
 
 
+async def _flush_metrics(directory: str) -> None:
+    while True:
+        metrics.write(directory)
+        await asyncio.sleep(settings.metrics_flush_interval_seconds)
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Clean Architecture Template",
@@ -32,16 +78,52 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER, ETAG_HEADER],
     )
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            gzip_level=settings.compression_gzip_level,
+            zstd_level=settings.compression_zstd_level,
+            route_levels=parse_route_levels(settings.compression_route_levels),
+            thread_threshold=settings.compression_thread_threshold,
+        )
+    app.add_middleware(ClientKeyMiddleware)
+    app.add_middleware(RequestIdMiddleware)
+    app.add_middleware(RequestMetricsMiddleware)
 
     app.include_router(users_router)
     app.include_router(comments_router)
+    app.include_router(admin_router)
 
     @app.get("/health")
     async def health_check():
-        logger.info("Info message")
+        health_logger.info("Info message")
         return {"status": "ok"}
 
+    @app.get("/health/cache")
+    async def cache_stats():
+        return {"users": user_cache.stats(), "comments": comment_cache.stats()}
+
+    @app.get("/health/loaders")
+    async def loader_stats():
+        return {"users": user_loader.stats(), "comments": comment_loader.stats()}
+
+    @app.get("/health/statements")
+    async def statement_stats():
+        return statements.stats()
+
+    @app.get("/health/replicas")
+    async def replica_stats():
+        return db_connection.router.stats()
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        directory = settings.metrics_multiprocess_dir
+        text = metrics.render_multiprocess(directory) if directory else metrics.render()
+        return PlainTextResponse(text, media_type=CONTENT_TYPE)
+
     return app
 
 
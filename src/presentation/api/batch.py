@@ -0,0 +1,58 @@
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+
+from src.application.use_cases.bulk import BatchDeleteResult, BatchGetResult
+from src.infrastructure.config import settings
+from src.presentation.api.pagination import INT4_MAX
+from src.presentation.api.renderers import FastJSONResponse, FieldPlan
+
+
+def check_ids(ids: List[int]) -> List[int]:
+    if not ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids are required")
+    if len(ids) > settings.batch_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.batch_max_ids} ids per request",
+        )
+    # id вне int4 asyncpg не передаст в int[] - запрос упал бы с 500
+    if not all(1 <= value <= INT4_MAX for value in ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ids must be between 1 and {INT4_MAX}",
+        )
+    return ids
+
+
+def parse_ids(values: Optional[List[str]]) -> Optional[List[int]]:
+    """ids из query: повтором (?ids=1&ids=2) и/или через запятую (?ids=1,2)."""
+    if values is None:
+        return None
+    try:
+        ids = [int(part) for value in values for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be integers")
+    return check_ids(ids)
+
+
+def render_batch_get(results: Iterable[BatchGetResult], plan: FieldPlan, key: str) -> Response:
+    """Результат на каждый id: найденная сущность под key или error."""
+    rows = []
+    found = 0
+    for result in results:
+        if result.item is not None:
+            found += 1
+        rows.append({
+            "id": result.id,
+            key: plan.row(result.item) if result.item is not None else None,
+            "error": result.error,
+        })
+    return FastJSONResponse({"found": found, "missing": len(rows) - found, "results": rows})
+
+
+def render_batch_delete(results: Iterable[BatchDeleteResult]) -> Response:
+    rows = [{"id": r.id, "deleted": r.deleted, "error": r.error} for r in results]
+    deleted = sum(row["deleted"] for row in rows)
+    return FastJSONResponse({"deleted": deleted, "missing": len(rows) - deleted, "results": rows})
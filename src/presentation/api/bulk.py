@@ -0,0 +1,139 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+from pydantic import BaseModel
+from pydantic import ValidationError as SchemaValidationError
+
+from src.application.use_cases.bulk import BulkRowResult
+from src.infrastructure.config import settings
+from src.presentation.api.renderers import FastJSONResponse, FieldPlan
+from src.presentation.schemas.bulk_schemas import BulkRowResultResponse
+
+JSON_CONTENT_TYPES = {"application/json"}
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_CONTENT_TYPES = {"text/csv"}
+
+RawRow = Tuple[int, Any, Optional[str]]
+
+RESULT_FIELDS = FieldPlan(BulkRowResultResponse)
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def _iter_json_array(request: Request) -> AsyncIterator[RawRow]:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON body")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array")
+    for index, row in enumerate(body):
+        yield index, row, None
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[RawRow]:
+    index = 0
+    async for line in _iter_lines(request):
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line), None
+        except ValueError:
+            yield index, None, "Invalid JSON line"
+        index += 1
+
+
+async def _iter_csv(request: Request) -> AsyncIterator[RawRow]:
+    header = None
+    record = ""
+    index = 0
+    async for line in _iter_lines(request):
+        record = f"{record}\n{line}" if record else line
+        # поле в кавычках может содержать перевод строки - копим строки до закрывающей кавычки
+        if record.count('"') % 2:
+            continue
+        if not record.strip():
+            record = ""
+            continue
+        values = next(csv.reader([record]))
+        record = ""
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield index, dict(zip(header, values)), None
+        index += 1
+    if record:
+        yield index, None, "Unterminated quoted field"
+
+
+def iter_bulk_rows(request: Request) -> AsyncIterator[RawRow]:
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type in JSON_CONTENT_TYPES:
+        return _iter_json_array(request)
+    if content_type in NDJSON_CONTENT_TYPES:
+        return _iter_ndjson(request)
+    if content_type in CSV_CONTENT_TYPES:
+        return _iter_csv(request)
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f"Unsupported content type {content_type}",
+    )
+
+
+def _format_errors(error: SchemaValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+async def run_bulk_create(
+    request: Request,
+    schema: Type[BaseModel],
+    to_row: Callable[[int, Any], tuple],
+    execute: Callable[[List[tuple]], Awaitable[List[BulkRowResult]]],
+) -> Response:
+    """Валидирует строки тела запроса и отдаёт их в use case чанками по settings.bulk_chunk_size."""
+    results: List[BulkRowResult] = []
+    chunk: List[tuple] = []
+    try:
+        async for index, raw, error in iter_bulk_rows(request):
+            if error is None:
+                try:
+                    item = schema.model_validate(raw)
+                except SchemaValidationError as e:
+                    error = _format_errors(e)
+            if error is not None:
+                results.append(BulkRowResult(index=index, error=error))
+                continue
+            chunk.append(to_row(index, item))
+            if len(chunk) >= settings.bulk_chunk_size:
+                results.extend(await execute(chunk))
+                chunk = []
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body is not valid UTF-8")
+    if chunk:
+        results.extend(await execute(chunk))
+
+    results.sort(key=lambda result: result.index)
+    created = sum(1 for result in results if result.error is None)
+    return FastJSONResponse({
+        "created": created,
+        "failed": len(results) - created,
+        "results": RESULT_FIELDS.rows(results),
+    })
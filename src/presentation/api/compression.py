@@ -0,0 +1,287 @@
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import anyio
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.infrastructure.metrics import metrics
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP = "gzip"
+ZSTD = "zstd"
+# порядок предпочтения сервера при равном q у клиента: zstd жмёт не хуже gzip и в разы быстрее
+ENCODINGS: Tuple[str, ...] = (ZSTD, GZIP) if zstandard is not None else (GZIP,)
+# типы, которые уже сжаты: повторное сжатие тратит CPU и почти не уменьшает тело
+ALREADY_COMPRESSED = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/zstd",
+    "application/x-7z-compressed",
+)
+GZIP_MAX_LEVEL = 9
+
+COMPRESSION_INPUT_BYTES = metrics.counter(
+    "http_compression_input_bytes_total", "Response bytes before compression", ["encoding"]
+)
+COMPRESSION_OUTPUT_BYTES = metrics.counter(
+    "http_compression_output_bytes_total", "Response bytes after compression", ["encoding"]
+)
+
+
+def parse_route_levels(spec: str) -> Dict[str, int]:
+    """'/comments/export=1,/metrics=0' -> {шаблон маршрута: уровень}; 0 - не сжимать."""
+    levels = {}
+    for item in spec.split(","):
+        route, _, level = item.strip().rpartition("=")
+        if route:
+            levels[route] = int(level)
+    return levels
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: str, available: Tuple[str, ...] = ENCODINGS) -> Optional[str]:
+    """
+    Кодировка из Accept-Encoding с учётом q-значений; None - отдавать как есть.
+    При равном q побеждает порядок available. Заголовки у клиентов одни и те же,
+    поэтому разбор кешируется.
+    """
+    qualities = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip()] = quality
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = qualities.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _GzipCompressor:
+    __slots__ = ("_compressor",)
+
+    def __init__(self, level: int):
+        # wbits=31 - gzip-обёртка вокруг deflate, mtime в заголовке нулевой
+        self._compressor = zlib.compressobj(min(level, GZIP_MAX_LEVEL), zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+    @staticmethod
+    def compress_body(level: int, data: bytes, shared: bool = True) -> bytes:
+        return zlib.compress(data, min(level, GZIP_MAX_LEVEL), wbits=31)
+
+
+@lru_cache(maxsize=None)
+def _shared_zstd(level: int):
+    # контекст zstd дорого создавать на каждый ответ; общий компрессор - только из event loop,
+    # конкурентно из потоков он не используется
+    return zstandard.ZstdCompressor(level=level)
+
+
+class _ZstdCompressor:
+    __slots__ = ("_compressor",)
+
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+    @staticmethod
+    def compress_body(level: int, data: bytes, shared: bool = True) -> bytes:
+        compressor = _shared_zstd(level) if shared else zstandard.ZstdCompressor(level=level)
+        return compressor.compress(data)
+
+
+COMPRESSORS = {GZIP: _GzipCompressor, ZSTD: _ZstdCompressor}
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы gzip или zstd (если установлен zstandard) по Accept-Encoding.
+
+    Тело целиком (обычный Response) сжимается, только если оно не меньше minimum_size.
+    Стриминговые ответы (выгрузки) сжимаются по чанкам одним компрессором: в памяти
+    только его окно, а не весь ответ. Ответы с Content-Encoding и уже сжатые типы
+    (ALREADY_COMPRESSED) не трогаются. CPU ограничивают уровни: общие на кодировку и
+    route_levels по шаблону маршрута (0 - маршрут не сжимается); чанки от
+    thread_threshold байт сжимаются в потоке, чтобы не держать event loop.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        zstd_level: int = 3,
+        route_levels: Optional[Dict[str, int]] = None,
+        skip_content_types: Iterable[str] = ALREADY_COMPRESSED,
+        thread_threshold: int = 64 * 1024,
+        encodings: Tuple[str, ...] = ENCODINGS,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {GZIP: gzip_level, ZSTD: zstd_level}
+        self.route_levels = route_levels or {}
+        self.skip_content_types = tuple(skip_content_types)
+        self.thread_threshold = thread_threshold
+        self.encodings = encodings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate(accept_encoding, self.encodings) if accept_encoding else None
+        await _CompressedResponse(self, scope, encoding, send)(receive)
+
+
+class _CompressedResponse:
+    """Состояние одного ответа: start придерживается до первого чанка тела."""
+
+    __slots__ = ("middleware", "scope", "encoding", "send", "start", "compressor")
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.scope = scope
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor = None
+
+    async def __call__(self, receive: Receive) -> None:
+        await self.middleware.app(self.scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            if self._compressible(message):
+                self.start = message
+            else:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            await self._begin(start, message)
+            return
+        if self.compressor is None:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        data = await self._run(self.compressor.compress if more_body else self.compressor.finish, body)
+        self._count(len(body), len(data))
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _compressible(self, start: Message) -> bool:
+        status = start["status"]
+        if status < 200 or status in (204, 304):
+            return False
+        content_type = ""
+        for name, value in start.get("headers", ()):
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1").lower()
+        if content_type.startswith(self.middleware.skip_content_types):
+            return False
+        start["headers"] = _with_vary(list(start.get("headers", ())))
+        if self.encoding is None:
+            return False
+        return self._level() > 0
+
+    def _level(self) -> int:
+        # маршрут FastAPI кладёт в scope при матчинге - к началу ответа он уже есть
+        route = getattr(self.scope.get("route"), "path", None)
+        routes = self.middleware.route_levels
+        if route in routes:
+            return routes[route]
+        return routes.get(self.scope["path"], self.middleware.levels[self.encoding])
+
+    async def _begin(self, start: Message, message: Message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not more_body and len(body) < self.middleware.minimum_size:
+            await self.send(start)
+            await self.send(message)
+            return
+
+        level = self._level()
+        codec = COMPRESSORS[self.encoding]
+        headers = [(name, value) for name, value in start["headers"] if name != b"content-length"]
+        if more_body:
+            # у стрима длина сжатого тела заранее неизвестна - остаётся chunked
+            self.compressor = codec(level)
+            data = await self._run(self.compressor.compress, body)
+        else:
+            if len(body) >= self.middleware.thread_threshold:
+                data = await anyio.to_thread.run_sync(codec.compress_body, level, body, False)
+            else:
+                data = codec.compress_body(level, body)
+            headers.append((b"content-length", str(len(data)).encode("latin-1")))
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        start["headers"] = _weak_etag(headers)
+        self._count(len(body), len(data))
+        await self.send(start)
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _run(self, compress, data: bytes) -> bytes:
+        if len(data) >= self.middleware.thread_threshold:
+            return await anyio.to_thread.run_sync(compress, data)
+        return compress(data)
+
+    def _count(self, before: int, after: int) -> None:
+        COMPRESSION_INPUT_BYTES.inc(self.encoding, amount=before)
+        COMPRESSION_OUTPUT_BYTES.inc(self.encoding, amount=after)
+
+
+def _with_vary(headers: list) -> list:
+    for index, (name, value) in enumerate(headers):
+        if name == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[index] = (name, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+def _weak_etag(headers: list) -> list:
+    # сильный ETag обещает побайтово то же тело, а сжатое тело другое
+    return [
+        (name, b"W/" + value) if name == b"etag" and not value.startswith(b"W/") else (name, value)
+        for name, value in headers
+    ]
@@ -0,0 +1,127 @@
+"""
+Условные запросы по версии строки (updated_at).
+
+ETag сущности - W/"<id>-<updated_at в микросекундах, hex>": он вычисляется из уже
+загруженной сущности, поэтому на If-None-Match ответ 304 уходит без сборки и сериализации
+тела. Тот же тег в If-Match на PUT превращается в условие updated_at = any(...) в самом
+update - без чтения перед записью. Теги слабые (тело зависит от сериализатора и сжатия),
+но If-Match сравнивает их по версии: версия однозначно задаёт содержимое строки.
+ETag списка - хэш (id, updated_at) строк страницы и параметров ответа.
+"""
+import hashlib
+from array import array
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import Request, status
+from fastapi.responses import Response
+
+from src.presentation.api.renderers import FieldPlan, render_entity
+
+ETAG_HEADER = "ETag"
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _version(updated_at: Optional[datetime]) -> int:
+    if updated_at is None:
+        return 0
+    return (updated_at - _EPOCH) // _MICROSECOND
+
+
+def entity_etag(entity: Any) -> str:
+    return f'W/"{entity.id}-{_version(entity.updated_at):x}"'
+
+
+def collection_etag(items: Sequence[Any], *extra: Any) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    versions = getattr(items, "versions", None)
+    if versions is not None:
+        # колоночный батч: id и версии уже лежат в array('q')
+        digest.update(items.ids.tobytes())
+        digest.update(array("q", versions()).tobytes())
+    else:
+        digest.update(array("q", [item.id for item in items]).tobytes())
+        digest.update(array("q", [_version(item.updated_at) for item in items]).tobytes())
+    for value in extra:
+        digest.update(repr(value).encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _opaque_tags(header: str) -> List[str]:
+    """Теги из If-Match/If-None-Match без префикса W/ (слабое сравнение)."""
+    tags = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.append(tag)
+    return tags
+
+
+def _last_modified(updated_at: datetime) -> str:
+    # timestamp без зоны в БД трактуется как UTC
+    return format_datetime(updated_at.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _matches(request: Request, etag: str, updated_at: Optional[datetime] = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = _opaque_tags(if_none_match)
+        return "*" in tags or _opaque_tags(etag)[0] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and updated_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return updated_at.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def entity_headers(entity: Any) -> dict:
+    headers = {ETAG_HEADER: entity_etag(entity)}
+    if entity.updated_at is not None:
+        headers["Last-Modified"] = _last_modified(entity.updated_at)
+    return headers
+
+
+def render_conditional(
+    request: Optional[Request], entity: Any, plan: FieldPlan, status_code: int = 200
+) -> Response:
+    """render_entity с ETag/Last-Modified; на совпавший If-None-Match - 304 без тела."""
+    headers = entity_headers(entity)
+    if request is not None and _matches(request, headers[ETAG_HEADER], entity.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return render_entity(entity, plan, status_code=status_code, headers=headers)
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    return _matches(request, etag)
+
+
+def expected_versions(if_match: Optional[str], entity_id: int) -> Optional[List[datetime]]:
+    """
+    Версии updated_at из If-Match для условного update; None - проверять нечего (нет заголовка
+    или "*"). Чужие и битые теги пропускаются: пустой список не совпадёт ни с одной версией.
+    """
+    if if_match is None:
+        return None
+    tags = _opaque_tags(if_match)
+    if "*" in tags:
+        return None
+    versions = []
+    for tag in tags:
+        tag_id, _, version = tag.strip('"').partition("-")
+        if tag_id != str(entity_id):
+            continue
+        try:
+            versions.append(_EPOCH + timedelta(microseconds=int(version, 16)))
+        except ValueError:
+            continue
+    return versions
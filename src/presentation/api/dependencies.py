@@ -1,33 +1,118 @@
 from src.application.use_cases.user_use_cases import (
     CreateUserUseCase,
+    BulkCreateUsersUseCase,
     GetUserUseCase,
     GetAllUsersUseCase,
+    GetUsersByIdsUseCase,
+    CountUsersUseCase,
     UpdateUserUseCase,
     DeleteUserUseCase,
+    ExportUsersUseCase,
 )
 from src.application.use_cases.comment_use_cases import (
     CreateCommentUseCase,
+    BulkCreateCommentsUseCase,
     GetAllCommentsUseCase,
     GetCommentUseCase,
+    BatchGetCommentsUseCase,
     GetAllCommentsUserIdUseCase,
+    CountCommentsUseCase,
+    SearchCommentsUseCase,
+    GetUserCommentStatsUseCase,
+    GetCommentActivityUseCase,
     UpdateCommentUseCase,
-    DeleteCommentUseCase
+    DeleteCommentUseCase,
+    BatchDeleteCommentsUseCase,
+    ExportCommentsUseCase,
 )
 
+from src.infrastructure.batch_loader import BatchLoader
+from src.infrastructure.cache import LRUTTLCache
+from src.infrastructure.config import settings
 from src.infrastructure.database.connection import db_connection
 from src.infrastructure.repositories.postgres_user_repository import PostgresUserRepository
 from src.infrastructure.repositories.postgres_comm_repository import PostgresCommentRepository
+from src.infrastructure.repositories.cached_user_repository import CachedUserRepository
+from src.infrastructure.repositories.cached_comm_repository import CachedCommentRepository
+from src.infrastructure.repositories.batching_user_repository import BatchingUserRepository
+from src.infrastructure.repositories.batching_comm_repository import BatchingCommentRepository
+from src.presentation.api.pagination import is_int4
 
 
+user_cache = LRUTTLCache(
+    max_size=settings.cache_max_size,
+    ttl=settings.cache_ttl_seconds,
+    negative_ttl=settings.cache_negative_ttl_seconds,
+)
+comment_cache = LRUTTLCache(
+    max_size=settings.cache_max_size,
+    ttl=settings.cache_ttl_seconds,
+    negative_ttl=settings.cache_negative_ttl_seconds,
+)
+# точные count(*) по фильтру: короткий TTL, на больших таблицах это полный проход
+user_count_cache = LRUTTLCache(
+    max_size=settings.cache_max_size,
+    ttl=settings.pagination_count_cache_ttl_seconds,
+)
+comment_count_cache = LRUTTLCache(
+    max_size=settings.cache_max_size,
+    ttl=settings.pagination_count_cache_ttl_seconds,
+)
+
+user_loader = BatchLoader(
+    lambda user_ids: PostgresUserRepository(db_connection).get_many(user_ids),
+    window=settings.batching_window_ms / 1000,
+    max_batch_size=settings.batching_max_size,
+    partition=db_connection.read_partition,
+    loadable=is_int4,
+)
+comment_loader = BatchLoader(
+    lambda comment_ids: PostgresCommentRepository(db_connection).get_many(comment_ids),
+    window=settings.batching_window_ms / 1000,
+    max_batch_size=settings.batching_max_size,
+    partition=db_connection.read_partition,
+    loadable=is_int4,
+)
+
+
+def cache_enabled() -> bool:
+    """
+    Кэш у каждого воркера свой, а запись сбрасывает только кэш воркера, который её обработал:
+    остальные отдавали бы старые данные до TTL. Поэтому без явного CACHE_ENABLED кэш включён,
+    только когда воркер один (APP_WORKERS выставляет supervisor).
+    """
+    if settings.cache_enabled is not None:
+        return settings.cache_enabled
+    return settings.app_workers <= 1
+
+
+def cached_repository(cls, repository, cache: LRUTTLCache, counts: LRUTTLCache):
+    """
+    Кэш сущностей - по cache_enabled(), кэш точных count - по COUNT_CACHE_ENABLED: его TTL
+    короткий, и с несколькими воркерами он остаётся включён.
+    """
+    cache = cache if cache_enabled() else None
+    counts = counts if settings.count_cache_enabled else None
+    if cache is None and counts is None:
+        return repository
+    return cls(repository, cache, counts)
+
 
 def get_user_repository():
-    return PostgresUserRepository(db_connection)
+    repository = PostgresUserRepository(db_connection)
+    if settings.batching_enabled:
+        repository = BatchingUserRepository(repository, user_loader)
+    return cached_repository(CachedUserRepository, repository, user_cache, user_count_cache)
 
 
 def get_create_user_use_case():
     return CreateUserUseCase(get_user_repository())
 
 
+def get_bulk_create_users_use_case():
+    return BulkCreateUsersUseCase(get_user_repository())
+
+
 def get_get_user_use_case():
     return GetUserUseCase(get_user_repository())
 
@@ -36,6 +121,14 @@ def get_get_all_users_use_case():
     return GetAllUsersUseCase(get_user_repository())
 
 
+def get_count_users_use_case():
+    return CountUsersUseCase(get_user_repository())
+
+
+def get_get_users_by_ids_use_case():
+    return GetUsersByIdsUseCase(get_user_repository())
+
+
 def get_update_user_use_case():
     return UpdateUserUseCase(get_user_repository())
 
@@ -44,11 +137,21 @@ def get_delete_user_use_case():
     return DeleteUserUseCase(get_user_repository())
 
 
+def get_export_users_use_case():
+    return ExportUsersUseCase(get_user_repository())
+
+
 def get_comment_repository():
-    return PostgresCommentRepository(db_connection)
+    repository = PostgresCommentRepository(db_connection)
+    if settings.batching_enabled:
+        repository = BatchingCommentRepository(repository, comment_loader)
+    return cached_repository(CachedCommentRepository, repository, comment_cache, comment_count_cache)
 
 def get_create_comment_use_case():
-    return CreateCommentUseCase(get_comment_repository(), get_user_repository())
+    return CreateCommentUseCase(get_comment_repository())
+
+def get_bulk_create_comments_use_case():
+    return BulkCreateCommentsUseCase(get_comment_repository(), get_user_repository())
 
 def get_get_all_comments_use_case():
     return GetAllCommentsUseCase(get_comment_repository())
@@ -56,11 +159,32 @@ def get_get_all_comments_use_case():
 def get_get_comment_use_case():
     return GetCommentUseCase(get_comment_repository())
 
+def get_batch_get_comments_use_case():
+    return BatchGetCommentsUseCase(get_comment_repository())
+
 def get_get_all_comments_by_user_id_use_case():
     return GetAllCommentsUserIdUseCase(get_comment_repository(), get_user_repository())
 
+def get_count_comments_use_case():
+    return CountCommentsUseCase(get_comment_repository())
+
+def get_search_comments_use_case():
+    return SearchCommentsUseCase(get_comment_repository())
+
+def get_user_comment_stats_use_case():
+    return GetUserCommentStatsUseCase(get_comment_repository(), get_user_repository())
+
+def get_comment_activity_use_case():
+    return GetCommentActivityUseCase(get_comment_repository())
+
 def get_update_comment_use_case():
-    return UpdateCommentUseCase(get_comment_repository(), get_user_repository())
+    return UpdateCommentUseCase(get_comment_repository())
 
 def get_delete_comment_use_case():
-    return DeleteCommentUseCase(get_comment_repository())
\ No newline at end of file
+    return DeleteCommentUseCase(get_comment_repository())
+
+def get_batch_delete_comments_use_case():
+    return BatchDeleteCommentsUseCase(get_comment_repository())
+
+def get_export_comments_use_case():
+    return ExportCommentsUseCase(get_comment_repository())
@@ -0,0 +1,22 @@
+from typing import AsyncIterator, Literal
+
+from fastapi.responses import StreamingResponse
+
+ExportFormat = Literal["csv", "ndjson", "binary"]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "binary": "application/octet-stream",
+}
+EXPORT_EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "binary": "pgcopy"}
+
+
+def export_response(chunks: AsyncIterator[bytes], fmt: str, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{EXPORT_EXTENSIONS[fmt]}"',
+        },
+    )
@@ -0,0 +1,108 @@
+import time
+import uuid
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.infrastructure.database.routing import client_key
+from src.infrastructure.logging_config.queue_logging import request_id
+from src.infrastructure.metrics import metrics
+
+CLIENT_ID_HEADER = b"x-client-id"
+REQUEST_ID_HEADER = "X-Request-Id"
+_REQUEST_ID_HEADER = REQUEST_ID_HEADER.lower().encode()
+# запросы мимо всех маршрутов идут одной меткой, иначе сканеры раздуют число серий
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Request latency by route", ["method", "route"]
+)
+REQUESTS = metrics.counter(
+    "http_requests_total", "Requests by route and response status", ["method", "route", "status"]
+)
+
+
+class ClientKeyMiddleware:
+    """
+    Запоминает ключ клиента в contextvar на время запроса: заголовок X-Client-Id,
+    иначе адрес клиента. По нему чтения после записи того же клиента идут на primary.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        key = None
+        for name, value in scope["headers"]:
+            if name == CLIENT_ID_HEADER:
+                key = value.decode("latin-1")
+                break
+        if key is None and scope.get("client"):
+            key = scope["client"][0]
+        token = client_key.set(key)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            client_key.reset(token)
+
+
+class RequestMetricsMiddleware:
+    """Гистограмма длительности и счётчик ответов по шаблону маршрута (/users/{user_id})."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # маршрут FastAPI кладёт в scope при матчинге
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            REQUEST_DURATION.observe(time.perf_counter() - started, method, route)
+            REQUESTS.inc(method, route, str(status))
+
+
+class RequestIdMiddleware:
+    """Берёт X-Request-Id из запроса (или генерирует), кладёт в логи и возвращает в ответе."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        value = None
+        for name, header in scope["headers"]:
+            if name == _REQUEST_ID_HEADER:
+                value = header.decode("latin-1")[:128]
+                break
+        value = value or uuid.uuid4().hex
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (_REQUEST_ID_HEADER, value.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = request_id.set(value)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,146 @@
+import asyncio
+import base64
+import json
+import math
+from typing import Awaitable, Callable, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Request, Response, status
+
+from src.domain.entities.total_count import TotalCount, TotalMode
+from src.infrastructure.config import settings
+from src.presentation.api.conditional import ETAG_HEADER, collection_etag, not_modified
+from src.presentation.api.renderers import FieldPlan, render_entities, render_page
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# id - integer в Postgres: значение вне int4 asyncpg не передаст и запрос упадёт с 500
+INT4_MIN, INT4_MAX = -2**31, 2**31 - 1
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def is_int4(value) -> bool:
+    # bool - подкласс int: курсор [true] иначе стал бы id 1
+    return type(value) is int and INT4_MIN <= value <= INT4_MAX
+
+
+# rank - real в Postgres: NaN и Infinity из курсора ломают keyset, значение вне real - ошибка запроса
+REAL_MAX = 3.4028234663852886e38
+
+
+def is_real(value) -> bool:
+    if type(value) is int:
+        return abs(value) <= REAL_MAX
+    return type(value) is float and math.isfinite(value) and abs(value) <= REAL_MAX
+
+
+class PageParams:
+    """
+    Параметры страницы для list-эндпоинтов.
+
+    cursor (keyset) имеет приоритет над offset; offset оставлен для старых клиентов.
+    limit молча обрезается до settings.pagination_max_limit.
+    envelope=true отдаёт {"items", "next", "total", "total_exact"} вместо голого списка;
+    total=exact|estimated|capped включает envelope и подсчёт строк под тем же фильтром.
+    Ответ несёт ETag страницы; на совпавший If-None-Match - 304 без тела.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        limit: int = Query(settings.pagination_default_limit, ge=1),
+        offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None),
+        envelope: bool = Query(False),
+        total: Optional[TotalMode] = Query(None),
+    ):
+        self.request = request
+        self.limit = min(limit, settings.pagination_max_limit)
+        self.envelope = envelope or total is not None
+        self.total = total
+        self.offset = offset
+        self.after_id: Optional[int] = None
+        if cursor:
+            after_id = decode_cursor(cursor)[0]
+            if not is_int4(after_id):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            self.after_id = after_id
+            self.offset = 0
+
+    def next_cursor(self, items: Sequence) -> Optional[str]:
+        if len(items) < self.limit:
+            return None
+        return encode_cursor(items[-1].id)
+
+    def apply(self, response: Response, items: Sequence) -> None:
+        cursor = self.next_cursor(items)
+        if cursor:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
+
+    async def fetch(
+        self,
+        items: Awaitable[Sequence],
+        count: Callable[..., Awaitable[TotalCount]],
+        **filters,
+    ) -> Tuple[Sequence, Optional[TotalCount]]:
+        """Страница и, если запрошен total, подсчёт - параллельно, на разных соединениях."""
+        if self.total is None:
+            return await items, None
+        page, total = await asyncio.gather(
+            items, count(self.total, cap=settings.pagination_total_cap, **filters)
+        )
+        return page, total
+
+    def render(self, items: Sequence, plan: FieldPlan, total: Optional[TotalCount] = None) -> Response:
+        next_cursor = self.next_cursor(items)
+        etag = collection_etag(
+            items, self.envelope, next_cursor, total.value if total else None, total.exact if total else None
+        )
+        if not_modified(self.request, etag):
+            response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+        elif self.envelope:
+            response = render_page(items, plan, next_cursor, total)
+        else:
+            response = render_entities(items, plan)
+        response.headers[ETAG_HEADER] = etag
+        self.apply(response, items)
+        return response
+
+
+class SearchPageParams:
+    """
+    Параметры страницы поиска: keyset по (rank, id), курсор - тот же X-Next-Cursor.
+    offset нет - у ранжированной выдачи нет стабильной нумерации строк.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(settings.pagination_default_limit, ge=1),
+        cursor: Optional[str] = Query(None),
+    ):
+        self.limit = min(limit, settings.pagination_max_limit)
+        self.after: Optional[Tuple[float, int]] = None
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 2 or not is_real(values[0]) or not is_int4(values[1]):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            self.after = (float(values[0]), values[1])
+
+    def render(self, hits: Sequence, plan: FieldPlan) -> Response:
+        response = render_entities(hits, plan)
+        if len(hits) >= self.limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(hits[-1].rank, hits[-1].id)
+        return response
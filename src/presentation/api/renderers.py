@@ -0,0 +1,91 @@
+import json
+from datetime import date, datetime
+from operator import attrgetter
+from typing import Any, Iterable, Mapping, Optional, Type
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from src.domain.entities.total_count import TotalCount
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson опционален, есть fallback на json
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FieldPlan:
+    """
+    Заранее собранный план полей response-схемы: сущность -> dict одним attrgetter,
+    без создания Pydantic-модели на каждую строку. Порядок полей - как в схеме.
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.fields = tuple(schema.model_fields)
+        getter = attrgetter(*self.fields)
+        self._values = getter if len(self.fields) > 1 else lambda entity: (getter(entity),)
+
+    def row(self, entity: Any) -> dict:
+        return dict(zip(self.fields, self._values(entity)))
+
+    def rows(self, entities: Iterable[Any]) -> list:
+        fields = self.fields
+        column = getattr(entities, "column", None)
+        if column is not None:
+            # колоночный батч (CommentBatch): строки собираются из колонок, без объектов-сущностей
+            return [dict(zip(fields, values)) for values in zip(*map(column, fields))]
+        values = self._values
+        return [dict(zip(fields, values(entity))) for entity in entities]
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse на orjson (если установлен); годится и как default_response_class."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def render_entity(
+    entity: Any,
+    plan: FieldPlan,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    return FastJSONResponse(plan.row(entity), status_code=status_code, headers=headers)
+
+
+def render_entities(
+    entities: Iterable[Any],
+    plan: FieldPlan,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    return FastJSONResponse(plan.rows(entities), status_code=status_code, headers=headers)
+
+
+def render_page(
+    entities: Iterable[Any],
+    plan: FieldPlan,
+    next_cursor: Optional[str],
+    total: Optional[TotalCount] = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    content = {
+        "items": plan.rows(entities),
+        "next": next_cursor,
+        "total": total.value if total else None,
+        "total_exact": total.exact if total else None,
+    }
+    return FastJSONResponse(content, headers=headers)
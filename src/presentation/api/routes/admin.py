@@ -0,0 +1,23 @@
+from typing import Literal
+from fastapi import APIRouter, Query
+
+from src.infrastructure.database.connection import db_connection
+
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=1000),
+    order_by: Literal["total", "max", "count"] = "total",
+    include_plans: bool = False,
+):
+    slow_queries = db_connection.slow_queries
+    return {
+        "threshold_ms": slow_queries.threshold * 1000,
+        "queries": [
+            stats.to_dict(include_plan=include_plans)
+            for stats in slow_queries.top(limit=limit, order_by=order_by)
+        ],
+    }
@@ -1,27 +1,54 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date, datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 import logging
 
 from src.application.use_cases.comment_use_cases import (
     CreateCommentUseCase,
+    BulkCreateCommentsUseCase,
     GetAllCommentsUseCase,
     GetCommentUseCase,
+    BatchGetCommentsUseCase,
     GetAllCommentsUserIdUseCase,
+    CountCommentsUseCase,
+    SearchCommentsUseCase,
+    GetCommentActivityUseCase,
     UpdateCommentUseCase,
     DeleteCommentUseCase,
+    BatchDeleteCommentsUseCase,
+    ExportCommentsUseCase,
 )
-from src.domain.exceptions import EntityAlreadyExists, EntityNotFound, ValidationError
+from src.domain.entities.comment_stats import ActivityBucketSize
+from src.domain.exceptions import EntityAlreadyExists, EntityNotFound, PreconditionFailed, ValidationError
 from src.presentation.api.dependencies import (
     get_create_comment_use_case,
+    get_bulk_create_comments_use_case,
     get_get_all_comments_use_case,
     get_get_comment_use_case,
+    get_batch_get_comments_use_case,
     get_get_all_comments_by_user_id_use_case,
+    get_count_comments_use_case,
+    get_search_comments_use_case,
+    get_comment_activity_use_case,
     get_update_comment_use_case, 
-    get_delete_comment_use_case
+    get_delete_comment_use_case,
+    get_batch_delete_comments_use_case,
+    get_export_comments_use_case,
 )
+from src.presentation.api.batch import check_ids, render_batch_delete, render_batch_get
+from src.presentation.api.bulk import run_bulk_create
+from src.presentation.api.conditional import expected_versions, render_conditional
+from src.presentation.api.export import ExportFormat, export_response
+from src.presentation.api.pagination import PageParams, SearchPageParams
+from src.presentation.api.renderers import FieldPlan, render_entities
+from src.presentation.schemas.batch_schemas import BatchDeleteResponse, BatchIdsRequest
+from src.presentation.schemas.bulk_schemas import BulkCreateResponse
 from src.presentation.schemas.comment_schemas import (
+    ActivityBucketResponse,
+    CommentBatchGetResponse,
     CommentCreateRequest,
     CommentResponse,
+    CommentSearchResponse,
     CommentUpdateRequest,
 )
 
@@ -29,6 +56,11 @@ router = APIRouter(prefix='/comments', tags=['comments'])
 
 logger = logging.getLogger(__name__)
 
+# ответы рендерятся напрямую из сущностей; response_model остаётся для OpenAPI
+COMMENT_FIELDS = FieldPlan(CommentResponse)
+SEARCH_FIELDS = FieldPlan(CommentSearchResponse)
+ACTIVITY_FIELDS = FieldPlan(ActivityBucketResponse)
+
 @router.post("/", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
 async def create_comment(
     request: CommentCreateRequest,
@@ -37,13 +69,7 @@ async def create_comment(
     try:
         comment = await use_case.execute(user_id=request.user_id, comment=request.comment)
         logger.info(f"API call: create comment")
-        return CommentResponse(
-            id = comment.id,
-            user_id = comment.user_id,
-            comment = comment.comment,
-            created_at = comment.created_at,
-            updated_at = comment.updated_at        
-        )
+        return render_conditional(None, comment, COMMENT_FIELDS, status_code=status.HTTP_201_CREATED)
     except EntityAlreadyExists as e:
         logger.error("Error message")
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
@@ -55,58 +81,135 @@ async def create_comment(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     
 
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def bulk_create_comments(
+    request: Request,
+    use_case: BulkCreateCommentsUseCase = Depends(get_bulk_create_comments_use_case),
+):
+    """Принимает JSON-массив, NDJSON или CSV (user_id,comment); грузит чанками через COPY."""
+    return await run_bulk_create(
+        request,
+        CommentCreateRequest,
+        lambda index, item: (index, item.user_id, item.comment),
+        use_case.execute,
+    )
+
+
+@router.post("/batch-get", response_model=CommentBatchGetResponse)
+async def batch_get_comments(
+    request: BatchIdsRequest,
+    use_case: BatchGetCommentsUseCase = Depends(get_batch_get_comments_use_case),
+):
+    """Комментарии по списку id одним запросом; результат на каждый id (comment или error)."""
+    results = await use_case.execute(check_ids(request.ids))
+    return render_batch_get(results, COMMENT_FIELDS, "comment")
+
+
+@router.post("/batch-delete", response_model=BatchDeleteResponse)
+async def batch_delete_comments(
+    request: BatchIdsRequest,
+    use_case: BatchDeleteCommentsUseCase = Depends(get_batch_delete_comments_use_case),
+):
+    """Удаляет комментарии по списку id одним delete ... where id = any($1)."""
+    results = await use_case.execute(check_ids(request.ids))
+    logger.info("Info message")
+    return render_batch_delete(results)
+
+
 @router.get("/", response_model=List[CommentResponse])
 async def get_all_comments(
-    limit: int = 100,
-    offset: int = 0,
-    use_case: GetAllCommentsUseCase = Depends(get_get_all_comments_use_case)
+    page: PageParams = Depends(),
+    use_case: GetAllCommentsUseCase = Depends(get_get_all_comments_use_case),
+    count_use_case: CountCommentsUseCase = Depends(get_count_comments_use_case),
+):
+    comments, total = await page.fetch(
+        use_case.execute(limit=page.limit, offset=page.offset, after_id=page.after_id),
+        count_use_case.execute,
+    )
+    return page.render(comments, COMMENT_FIELDS, total)
+
+@router.get("/export")
+async def export_comments(
+    format: ExportFormat = "csv",
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    use_case: ExportCommentsUseCase = Depends(get_export_comments_use_case),
 ):
-    comments = await use_case.execute(limit=limit, offset=offset)
-    return [
-        CommentResponse(
-            id=comment.id,
-            user_id=comment.user_id,
-            comment=comment.comment,
-            created_at=comment.created_at,
-            updated_at=comment.updated_at,
+    """Потоковая выгрузка через COPY TO STDOUT; память не зависит от числа строк."""
+    try:
+        chunks = use_case.execute(
+            format, user_id=user_id, created_from=created_from, created_to=created_to
         )
-        for comment in comments
-    ]
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return export_response(chunks, format, "comments")
+
+
+@router.get("/stats", response_model=List[ActivityBucketResponse])
+async def get_comment_activity(
+    bucket: ActivityBucketSize = "day",
+    user_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    use_case: GetCommentActivityUseCase = Depends(get_comment_activity_use_case),
+):
+    """Число комментариев по дням/неделям/месяцам из rollup-таблиц; date_to не включается."""
+    try:
+        buckets = await use_case.execute(
+            bucket, user_id=user_id, date_from=date_from, date_to=date_to
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return render_entities(buckets, ACTIVITY_FIELDS)
+
+
+@router.get("/search", response_model=List[CommentSearchResponse])
+async def search_comments(
+    q: str = Query(..., min_length=1, max_length=1000),
+    user_id: Optional[int] = None,
+    page: SearchPageParams = Depends(),
+    use_case: SearchCommentsUseCase = Depends(get_search_comments_use_case),
+):
+    """
+    Полнотекстовый поиск, синтаксис websearch: слова через пробел (and), "фраза", or, -слово.
+    По убыванию релевантности; следующая страница - по курсору из X-Next-Cursor.
+    """
+    try:
+        hits = await use_case.execute(q, user_id=user_id, limit=page.limit, after=page.after)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return page.render(hits, SEARCH_FIELDS)
+
 
 @router.get("/{comment_id}", response_model=CommentResponse)
 async def get_comment(
     comment_id: int, 
+    http_request: Request,
     use_case: GetCommentUseCase  = Depends(get_get_comment_use_case)
 ):
     try:
         comment = await use_case.execute(comment_id=comment_id)
-        return CommentResponse(
-            id=comment.id,
-            user_id=comment.user_id,
-            comment=comment.comment,
-            created_at=comment.created_at,
-            updated_at=comment.updated_at,
-        )
+        return render_conditional(http_request, comment, COMMENT_FIELDS)
     except EntityNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 @router.get("/user/{user_id}", response_model=List[CommentResponse])
 async def get_comments_by_user_id(
     user_id: int, 
-    use_case: GetAllCommentsUserIdUseCase  = Depends(get_get_all_comments_by_user_id_use_case)
+    page: PageParams = Depends(),
+    use_case: GetAllCommentsUserIdUseCase  = Depends(get_get_all_comments_by_user_id_use_case),
+    count_use_case: CountCommentsUseCase = Depends(get_count_comments_use_case),
 ):
     try:
-        comments = await use_case.execute(user_id=user_id)
-        return [
-        CommentResponse(
-            id=comment.id,
-            user_id=comment.user_id,
-            comment=comment.comment,
-            created_at=comment.created_at,
-            updated_at=comment.updated_at,
+        comments, total = await page.fetch(
+            use_case.execute(
+                user_id=user_id, limit=page.limit, offset=page.offset, after_id=page.after_id
+            ),
+            count_use_case.execute,
+            user_id=user_id,
         )
-        for comment in comments
-    ]
+        return page.render(comments, COMMENT_FIELDS, total)
     except EntityNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     
@@ -114,21 +217,24 @@ async def get_comments_by_user_id(
 async def update_comment(
     comment_id: int,
     request: CommentUpdateRequest,
+    if_match: Optional[str] = Header(None),
     use_case: UpdateCommentUseCase = Depends(get_update_comment_use_case)
 ):
+    """If-Match: <ETag> - обновление только если комментарий не менялся с этой версии, иначе 412."""
     try:
-        comment = await use_case.execute(comment_id=comment_id, user_id=request.user_id, comment=request.comment)
-        logger.info("Info message")
-        return CommentResponse(
-            id=comment.id,
-            user_id=comment.user_id,
-            comment=comment.comment,
-            created_at=comment.created_at,
-            updated_at=comment.updated_at,    
+        comment = await use_case.execute(
+            comment_id=comment_id,
+            user_id=request.user_id,
+            comment=request.comment,
+            expected_versions=expected_versions(if_match, comment_id),
         )
+        logger.info("Info message")
+        return render_conditional(None, comment, COMMENT_FIELDS)
     except EntityNotFound as e:
         logger.error("Error message")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PreconditionFailed as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
     
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_comment(
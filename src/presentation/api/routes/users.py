@@ -1,30 +1,59 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 
 from src.application.use_cases.user_use_cases import (
     CreateUserUseCase,
+    BulkCreateUsersUseCase,
     GetUserUseCase,
     GetAllUsersUseCase,
+    GetUsersByIdsUseCase,
+    CountUsersUseCase,
     UpdateUserUseCase,
     DeleteUserUseCase,
+    ExportUsersUseCase,
 )
-from src.domain.exceptions import EntityAlreadyExists, EntityNotFound, ValidationError
+from src.application.use_cases.comment_use_cases import GetUserCommentStatsUseCase
+from src.domain.exceptions import EntityAlreadyExists, EntityNotFound, PreconditionFailed, ValidationError
 from src.presentation.api.dependencies import (
     get_create_user_use_case,
+    get_bulk_create_users_use_case,
     get_get_user_use_case,
     get_get_all_users_use_case,
+    get_get_users_by_ids_use_case,
+    get_count_users_use_case,
     get_update_user_use_case,
     get_delete_user_use_case,
+    get_export_users_use_case,
+    get_user_comment_stats_use_case,
 )
+from src.presentation.api.batch import parse_ids, render_batch_get
+from src.presentation.api.bulk import run_bulk_create
+from src.presentation.api.conditional import (
+    ETAG_HEADER,
+    collection_etag,
+    expected_versions,
+    not_modified,
+    render_conditional,
+)
+from src.presentation.api.export import ExportFormat, export_response
+from src.presentation.api.pagination import PageParams
+from src.presentation.api.renderers import FieldPlan, render_entity
+from src.presentation.schemas.bulk_schemas import BulkCreateResponse
 from src.presentation.schemas.user_schemas import (
     UserCreateRequest,
     UserUpdateRequest,
     UserResponse,
+    UserStatsResponse,
 )
 
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# ответы рендерятся напрямую из сущностей; response_model остаётся для OpenAPI
+USER_FIELDS = FieldPlan(UserResponse)
+STATS_FIELDS = FieldPlan(UserStatsResponse)
+
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
@@ -33,73 +62,118 @@ async def create_user(
 ):
     try:
         user = await use_case.execute(email=request.email, name=request.name)
-        return UserResponse(
-            id=user.id,
-            email=user.email,
-            name=user.name,
-            created_at=user.created_at,
-            updated_at=user.updated_at,
-        )
+        return render_conditional(None, user, USER_FIELDS, status_code=status.HTTP_201_CREATED)
     except EntityAlreadyExists as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValidationError as e:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
 
 
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def bulk_create_users(
+    request: Request,
+    use_case: BulkCreateUsersUseCase = Depends(get_bulk_create_users_use_case),
+):
+    """Принимает JSON-массив, NDJSON или CSV (email,name); грузит чанками через COPY."""
+    return await run_bulk_create(
+        request,
+        UserCreateRequest,
+        lambda index, item: (index, item.email, item.name),
+        use_case.execute,
+    )
+
+
+@router.get("/export")
+async def export_users(
+    format: ExportFormat = "csv",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    use_case: ExportUsersUseCase = Depends(get_export_users_use_case),
+):
+    """Потоковая выгрузка через COPY TO STDOUT; память не зависит от числа строк."""
+    try:
+        chunks = use_case.execute(format, created_from=created_from, created_to=created_to)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return export_response(chunks, format, "users")
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
+    http_request: Request,
     use_case: GetUserUseCase = Depends(get_get_user_use_case),
 ):
     try:
         user = await use_case.execute(user_id=user_id)
-        return UserResponse(
-            id=user.id,
-            email=user.email,
-            name=user.name,
-            created_at=user.created_at,
-            updated_at=user.updated_at,
-        )
+        return render_conditional(http_request, user, USER_FIELDS)
+    except EntityNotFound as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.get("/{user_id}/stats", response_model=UserStatsResponse)
+async def get_user_stats(
+    user_id: int,
+    use_case: GetUserCommentStatsUseCase = Depends(get_user_comment_stats_use_case),
+):
+    """Число комментариев и дни первого/последнего - из rollup-таблиц, O(1) по числу комментариев."""
+    try:
+        stats = await use_case.execute(user_id=user_id)
+        return render_entity(stats, STATS_FIELDS)
     except EntityNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 @router.get("/", response_model=List[UserResponse])
 async def get_all_users(
-    limit: int = 100,
-    offset: int = 0,
+    page: PageParams = Depends(),
+    ids: Optional[List[str]] = Query(None),
     use_case: GetAllUsersUseCase = Depends(get_get_all_users_use_case),
+    count_use_case: CountUsersUseCase = Depends(get_count_users_use_case),
+    by_ids_use_case: GetUsersByIdsUseCase = Depends(get_get_users_by_ids_use_case),
 ):
-    users = await use_case.execute(limit=limit, offset=offset)
-    return [
-        UserResponse(
-            id=user.id,
-            email=user.email,
-            name=user.name,
-            created_at=user.created_at,
-            updated_at=user.updated_at,
-        )
-        for user in users
-    ]
+    """
+    ?ids=1,2,3 - результат на каждый id в порядке ids одним запросом, как у batch-get:
+    {"found", "missing", "results": [{"id", "user", "error"}]}; пагинация не применяется.
+    """
+    user_ids = parse_ids(ids)
+    if user_ids is not None:
+        results = await by_ids_use_case.execute(user_ids)
+        etag = collection_etag([result.item for result in results if result.item is not None])
+        if not_modified(page.request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={ETAG_HEADER: etag})
+        response = render_batch_get(results, USER_FIELDS, "user")
+        response.headers[ETAG_HEADER] = etag
+        return response
+    users, total = await page.fetch(
+        use_case.execute(limit=page.limit, offset=page.offset, after_id=page.after_id),
+        count_use_case.execute,
+    )
+    return page.render(users, USER_FIELDS, total)
 
 
 @router.put("/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: int,
     request: UserUpdateRequest,
+    if_match: Optional[str] = Header(None),
     use_case: UpdateUserUseCase = Depends(get_update_user_use_case),
 ):
+    """If-Match: <ETag> - обновление только если пользователь не менялся с этой версии, иначе 412."""
     try:
-        user = await use_case.execute(user_id=user_id, email=request.email, name=request.name)
-        return UserResponse(
-            id=user.id,
-            email=user.email,
-            name=user.name,
-            created_at=user.created_at,
-            updated_at=user.updated_at,
+        user = await use_case.execute(
+            user_id=user_id,
+            email=request.email,
+            name=request.name,
+            expected_versions=expected_versions(if_match, user_id),
         )
+        return render_conditional(None, user, USER_FIELDS)
     except EntityNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PreconditionFailed as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
+    except EntityAlreadyExists as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
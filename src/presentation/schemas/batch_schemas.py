@@ -0,0 +1,18 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class BatchIdsRequest(BaseModel):
+    ids: List[int]
+
+
+class BatchDeleteResultResponse(BaseModel):
+    id: int
+    deleted: bool
+    error: Optional[str] = None
+
+
+class BatchDeleteResponse(BaseModel):
+    deleted: int
+    missing: int
+    results: List[BatchDeleteResultResponse]
@@ -0,0 +1,14 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class BulkRowResultResponse(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkCreateResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkRowResultResponse]
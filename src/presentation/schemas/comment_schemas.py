@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 from pydantic import BaseModel, ConfigDict
 
 class CommentCreateRequest(BaseModel):
@@ -15,6 +15,25 @@ class CommentResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class CommentSearchResponse(CommentResponse):
+    rank: float
+    # фрагменты текста, найденные слова обёрнуты в <b></b>; текст не экранируется
+    snippet: str
+
 class CommentUpdateRequest(BaseModel):
     comment: Optional[str] = None
-    user_id: int
\ No newline at end of file
+    user_id: int
+class ActivityBucketResponse(BaseModel):
+    # начало корзины: день, понедельник недели или первое число месяца
+    start: date
+    comment_count: int
+
+class CommentBatchGetResultResponse(BaseModel):
+    id: int
+    comment: Optional[CommentResponse] = None
+    error: Optional[str] = None
+
+class CommentBatchGetResponse(BaseModel):
+    found: int
+    missing: int
+    results: List[CommentBatchGetResultResponse]
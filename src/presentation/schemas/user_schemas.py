@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 from pydantic import BaseModel, EmailStr, ConfigDict
 
@@ -22,3 +22,9 @@ class UserResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+
+class UserStatsResponse(BaseModel):
+    user_id: int
+    comment_count: int
+    first_comment_day: Optional[date] = None
+    last_comment_day: Optional[date] = None
@@ -1,9 +1,26 @@
+import os
+
+import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from fastapi import FastAPI
 
 from src.infrastructure.database.connection import db_connection
+from src.infrastructure.logging_config.logging_config import setup_logging
+from src.presentation.api.dependencies import comment_cache, user_cache
+from src.presentation.api.middleware import ClientKeyMiddleware
 from src.presentation.api.routes.users import router as users_router
+from src.presentation.api.routes.comments import router as comments_router
+
+
+@pytest.fixture(scope="session", autouse=True)
+def log_dir(tmp_path_factory):
+    # логи тестов не должны попадать в logs/ проекта; LOG_DIR - для запускаемых тестами воркеров
+    path = tmp_path_factory.mktemp("logs")
+    os.environ["LOG_DIR"] = str(path)
+    setup_logging(log_dir=path)
+    yield path
+    os.environ.pop("LOG_DIR", None)
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -13,8 +30,13 @@ async def client():
     
     await db_connection.connect()
     
+    user_cache.clear()
+    comment_cache.clear()
+
     app = FastAPI(title="Test App")
+    app.add_middleware(ClientKeyMiddleware)
     app.include_router(users_router)
+    app.include_router(comments_router)
     
     pool = db_connection.pool
     async with pool.acquire() as conn:
@@ -28,4 +50,5 @@ async def client():
     
     async with pool.acquire() as conn:
         await conn.execute("truncate table users cascade;")
+    await db_connection.disconnect()
 
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.infrastructure.batch_loader import BatchLoader
+
+
+class RecordingSource:
+    def __init__(self, existing):
+        self.existing = existing
+        self.calls = []
+
+    async def get_many(self, ids):
+        self.calls.append(sorted(ids))
+        return [SimpleNamespace(id=i) for i in ids if i in self.existing]
+
+
+async def test_loads_in_one_tick_are_coalesced_and_deduplicated():
+    source = RecordingSource(existing={1, 2, 3})
+    loader = BatchLoader(source.get_many)
+
+    results = await asyncio.gather(*(loader.load(i) for i in [1, 2, 2, 3, 4]))
+
+    assert [r.id if r else None for r in results] == [1, 2, 2, 3, None]
+    assert source.calls == [[1, 2, 3, 4]]
+    stats = loader.stats()
+    assert stats["batches"] == 1
+    assert stats["deduplicated"] == 1
+    assert stats["max_batch_size"] == 4
+
+
+async def test_max_batch_size_splits_batches():
+    source = RecordingSource(existing=set(range(10)))
+    loader = BatchLoader(source.get_many, max_batch_size=4)
+
+    await asyncio.gather(*(loader.load(i) for i in range(10)))
+
+    assert [len(call) for call in source.calls] == [4, 4, 2]
+
+
+async def test_window_collects_loads_across_ticks():
+    source = RecordingSource(existing={1, 2})
+    loader = BatchLoader(source.get_many, window=0.01)
+
+    async def delayed_load(key):
+        await asyncio.sleep(0)
+        return await loader.load(key)
+
+    await asyncio.gather(loader.load(1), delayed_load(2))
+
+    assert source.calls == [[1, 2]]
+
+
+async def test_unloadable_keys_resolve_to_none_without_joining_the_batch():
+    source = RecordingSource(existing={1, 2})
+    loader = BatchLoader(source.get_many, loadable=lambda key: key < 100)
+
+    results = await asyncio.gather(loader.load(1), loader.load(2**31), loader.load(2))
+
+    assert [r.id if r else None for r in results] == [1, None, 2]
+    assert source.calls == [[1, 2]]
+
+
+async def test_errors_are_propagated_to_every_waiter():
+    async def failing(ids):
+        raise RuntimeError("db is down")
+
+    loader = BatchLoader(failing)
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        await loader.load(3)
@@ -0,0 +1,97 @@
+from src.domain.entities.total_count import TotalCount
+from src.domain.entities.user import User
+from src.infrastructure.cache import MISSING, LRUTTLCache
+from src.infrastructure.repositories.cached_user_repository import CachedUserRepository
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingUserRepository:
+    def __init__(self, users):
+        self.users = users
+        self.calls = 0
+
+    async def get_by_id(self, user_id):
+        self.calls += 1
+        return self.users.get(user_id)
+
+    async def update(self, user):
+        self.users[user.id] = user
+        return user
+
+    async def count(self, mode="exact", cap=None):
+        self.calls += 1
+        return TotalCount(len(self.users), exact=True)
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = LRUTTLCache(max_size=2, ttl=10, negative_ttl=1, clock=clock)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"
+    cache.set(3, "c")
+
+    assert cache.get(2) is MISSING
+    assert cache.evictions == 1
+
+    clock.now = 11
+    assert cache.get(1) is MISSING
+    assert cache.expirations == 1
+
+
+def test_negative_entries_use_negative_ttl():
+    clock = FakeClock()
+    cache = LRUTTLCache(max_size=10, ttl=10, negative_ttl=1, clock=clock)
+    cache.set(1, None)
+    assert cache.get(1) is None
+    assert cache.negative_hits == 1
+
+    clock.now = 2
+    assert cache.get(1) is MISSING
+
+
+def test_stale_generation_is_not_stored():
+    cache = LRUTTLCache()
+    generation = cache.generation
+    cache.invalidate(1)
+    cache.set(1, "stale", generation=generation)
+    assert cache.get(1) is MISSING
+
+
+async def test_cached_repository_hits_and_invalidation():
+    inner = CountingUserRepository({1: User(id=1, email="a@example.com", name="A")})
+    repository = CachedUserRepository(inner, LRUTTLCache())
+
+    assert (await repository.get_by_id(1)).name == "A"
+    assert (await repository.get_by_id(1)).name == "A"
+    assert await repository.get_by_id(2) is None
+    assert await repository.get_by_id(2) is None
+    assert inner.calls == 2
+
+    user = await repository.get_by_id(1)
+    user.name = "Mutated"
+    assert (await repository.get_by_id(1)).name == "A"
+
+    await repository.update(User(id=1, email="a@example.com", name="B"))
+    assert (await repository.get_by_id(1)).name == "B"
+    assert inner.calls == 3
+
+
+async def test_count_cache_works_without_entity_cache():
+    inner = CountingUserRepository({1: User(id=1, email="a@example.com", name="A")})
+    repository = CachedUserRepository(inner, None, LRUTTLCache())
+
+    assert (await repository.get_by_id(1)).name == "A"
+    assert (await repository.get_by_id(1)).name == "A"
+    assert inner.calls == 2
+
+    assert (await repository.count()).value == 1
+    assert (await repository.count()).value == 1
+    assert inner.calls == 3
@@ -0,0 +1,450 @@
+import asyncio
+
+from httpx import AsyncClient
+
+from src.infrastructure.config import settings
+from src.infrastructure.database.connection import db_connection
+from src.infrastructure.database.partitions import archive_comment_partitions, ensure_comment_partitions
+from src.infrastructure.repositories.postgres_comm_repository import PostgresCommentRepository
+from src.presentation.api.dependencies import comment_cache
+from src.presentation.api.pagination import encode_cursor
+
+
+async def create_user(client: AsyncClient, email: str) -> int:
+    response = await client.post("/users/", json={"email": email, "name": "Comment Author"})
+    return response.json()["id"]
+
+
+async def test_create_comment(client: AsyncClient):
+    user_id = await create_user(client, "author@example.com")
+
+    response = await client.post("/comments/", json={"user_id": user_id, "comment": "Hello"})
+    assert response.status_code == 201
+
+    data = response.json()
+    assert data["user_id"] == user_id
+    assert data["comment"] == "Hello"
+
+
+async def test_create_comment_user_not_found(client: AsyncClient):
+    response = await client.post("/comments/", json={"user_id": 999999, "comment": "Hello"})
+    assert response.status_code == 404
+
+
+async def test_get_comments_by_user_id_cursor_pagination(client: AsyncClient):
+    user_id = await create_user(client, "pager@example.com")
+    other_id = await create_user(client, "other@example.com")
+    created_ids = []
+    for i in range(5):
+        response = await client.post("/comments/", json={"user_id": user_id, "comment": f"c{i}"})
+        created_ids.append(response.json()["id"])
+        await client.post("/comments/", json={"user_id": other_id, "comment": f"o{i}"})
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = await client.get(f"/comments/user/{user_id}", params=params)
+        assert response.status_code == 200
+        seen.extend(c["id"] for c in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+        params = {"limit": 2, "cursor": cursor}
+
+    assert seen == created_ids
+
+    for bad in ([2**40], [True], ["1"], [1.5]):
+        response = await client.get(f"/comments/user/{user_id}", params={"cursor": encode_cursor(*bad)})
+        assert response.status_code == 400
+
+
+async def test_comments_envelope_with_totals(client: AsyncClient, monkeypatch):
+    user_id = await create_user(client, "counted@example.com")
+    other_id = await create_user(client, "other@example.com")
+    for i in range(3):
+        await client.post("/comments/", json={"user_id": user_id, "comment": f"c{i}"})
+    await client.post("/comments/", json={"user_id": other_id, "comment": "noise"})
+
+    response = await client.get(f"/comments/user/{user_id}", params={"limit": 2, "total": "exact"})
+    body = response.json()
+    assert [item["comment"] for item in body["items"]] == ["c0", "c1"]
+    assert body["next"] == response.headers["x-next-cursor"]
+    assert (body["total"], body["total_exact"]) == (3, True)
+
+    # точный count кэшируется, но создание комментария его сбрасывает
+    await client.post("/comments/", json={"user_id": user_id, "comment": "c3"})
+    body = (await client.get(f"/comments/user/{user_id}", params={"total": "exact"})).json()
+    assert body["total"] == 4
+    assert body["next"] is None
+
+    # удаление сбрасывает счётчик автора - и по одному, и пакетом
+    ids = [item["id"] for item in body["items"]]
+    assert (await client.delete(f"/comments/{ids[0]}")).status_code == 204
+    assert (await client.get(f"/comments/user/{user_id}", params={"total": "exact"})).json()["total"] == 3
+    await client.post("/comments/batch-delete", json={"ids": ids[1:3]})
+    assert (await client.get(f"/comments/user/{user_id}", params={"total": "exact"})).json()["total"] == 1
+    for i in range(4, 7):
+        await client.post("/comments/", json={"user_id": user_id, "comment": f"c{i}"})
+
+    monkeypatch.setattr(settings, "pagination_total_cap", 2)
+    body = (await client.get("/comments/", params={"total": "capped"})).json()
+    assert (body["total"], body["total_exact"]) == (2, False)
+
+    # оценка ниже порога досчитывается точно, иначе отдаётся оценка планировщика
+    monkeypatch.setattr(settings, "pagination_exact_total_below", 10**6)
+    body = (await client.get("/comments/", params={"total": "estimated"})).json()
+    assert (body["total"], body["total_exact"]) == (5, True)
+    monkeypatch.setattr(settings, "pagination_exact_total_below", 0)
+    body = (await client.get(f"/comments/user/{user_id}", params={"total": "estimated"})).json()
+    assert body["total_exact"] is False
+    assert body["total"] >= 0
+
+    body = (await client.get("/comments/", params={"envelope": True})).json()
+    assert body["total"] is None
+    assert len(body["items"]) == 5
+    assert (await client.get("/comments/", params={"total": "approx"})).status_code == 422
+
+
+async def test_search_comments_ranked_with_cursor(client: AsyncClient):
+    user_id = await create_user(client, "searcher@example.com")
+    other_id = await create_user(client, "quiet@example.com")
+    texts = [
+        (user_id, "postgres is fast"),
+        (user_id, "postgres postgres postgres everywhere"),
+        (other_id, "postgres indexes are fast"),
+        (other_id, "nothing relevant here"),
+    ]
+    for author, text in texts:
+        await client.post("/comments/", json={"user_id": author, "comment": text})
+
+    response = await client.get("/comments/search", params={"q": "postgres"})
+    assert response.status_code == 200
+    hits = response.json()
+    assert len(hits) == 3
+    assert hits[0]["comment"] == "postgres postgres postgres everywhere"
+    assert [h["rank"] for h in hits] == sorted((h["rank"] for h in hits), reverse=True)
+    assert "<b>postgres</b>" in hits[0]["snippet"]
+
+    response = await client.get("/comments/search", params={"q": "postgres fast", "user_id": user_id})
+    assert [h["comment"] for h in response.json()] == ["postgres is fast"]
+
+    seen = []
+    params = {"q": "postgres", "limit": 2}
+    while True:
+        response = await client.get("/comments/search", params=params)
+        seen.extend(h["id"] for h in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+        params = {"q": "postgres", "limit": 2, "cursor": cursor}
+    assert seen == [h["id"] for h in hits]
+
+    response = await client.get("/comments/search", params={"q": "   "})
+    assert response.status_code == 400
+    response = await client.get("/comments/search", params={"q": "postgres", "cursor": "bad"})
+    assert response.status_code == 400
+    for bad in ([float("nan"), 1], [float("inf"), 1], [1e39, 1], [10**400, 1], [0.1, 2**31], [0.1, True]):
+        response = await client.get("/comments/search", params={"q": "postgres", "cursor": encode_cursor(*bad)})
+        assert response.status_code == 400
+
+
+async def test_comment_rollups_follow_writes(client: AsyncClient):
+    user_id = await create_user(client, "rollup@example.com")
+    other_id = await create_user(client, "rollup-other@example.com")
+    ids = []
+    for i in range(3):
+        response = await client.post("/comments/", json={"user_id": user_id, "comment": f"r{i}"})
+        ids.append(response.json()["id"])
+    await client.post(
+        "/comments/bulk", json=[{"user_id": other_id, "comment": "b"}, {"user_id": user_id, "comment": "b"}]
+    )
+    await client.delete(f"/comments/{ids[0]}")
+
+    response = await client.get(f"/users/{user_id}/stats")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["comment_count"] == 3
+    assert stats["first_comment_day"] == stats["last_comment_day"] is not None
+
+    response = await client.get("/comments/stats", params={"bucket": "day"})
+    assert [b["comment_count"] for b in response.json()] == [4]
+    assert response.json()[0]["start"] == stats["last_comment_day"]
+    response = await client.get("/comments/stats", params={"bucket": "month", "user_id": other_id})
+    assert [b["comment_count"] for b in response.json()] == [1]
+    response = await client.get(
+        "/comments/stats", params={"date_from": stats["last_comment_day"], "date_to": stats["last_comment_day"]}
+    )
+    assert response.json() == []
+
+    assert (await client.get("/users/999999/stats")).status_code == 404
+    assert (await client.get("/comments/stats", params={"bucket": "year"})).status_code == 422
+    response = await client.get("/comments/stats", params={"date_from": "2024-02-01", "date_to": "2024-01-01"})
+    assert response.status_code == 400
+
+
+async def test_daily_rollup_is_sharded_by_backend(client: AsyncClient):
+    user_id = await create_user(client, "shards@example.com")
+    other_id = await create_user(client, "shards-other@example.com")
+
+    # общий счётчик дня - строка на backend (pid % 16), а не одна на всех
+    async with db_connection.acquire() as first, db_connection.acquire() as second:
+        shards = {await conn.fetchval("select pg_backend_pid() % 16") for conn in (first, second)}
+        await first.execute("insert into comments (user_id, comment) values ($1, 'a')", user_id)
+        await second.execute("insert into comments (user_id, comment) values ($1, 'b')", other_id)
+        rows = await first.fetchval("select count(*) from comment_daily_stats")
+        async with first.transaction():
+            drifted = await first.fetchval("select rebuild_comment_rollups()")
+
+    assert rows == len(shards)
+    assert drifted == 0
+    response = await client.get("/comments/stats", params={"bucket": "day"})
+    assert [b["comment_count"] for b in response.json()] == [2]
+
+
+async def test_concurrent_inserts_do_not_queue_on_shared_rollup_rows(client: AsyncClient):
+    user_id = await create_user(client, "writer@example.com")
+    other_id = await create_user(client, "writer-other@example.com")
+    insert = "insert into comments (user_id, comment) values ($1, 'c')"
+
+    async with db_connection.acquire() as first:
+        # второму соединению нужен другой шард comment_daily_stats
+        held = [await db_connection.pool.acquire()]
+        shard = "select pg_backend_pid() % 16"
+        while await held[-1].fetchval(shard) == await first.fetchval(shard):
+            held.append(await db_connection.pool.acquire())
+        second = held[-1]
+        try:
+            # следующие id - в начале блока comment_id_ranges: первая вставка расширяет
+            # диапазон до края блока, остальные его не трогают
+            await first.execute(
+                "select setval('comments_id_seq', (nextval('comments_id_seq') / 1024 + 1) * 1024)"
+            )
+            await first.execute(insert, user_id)
+            async with first.transaction():
+                await first.execute(insert, user_id)
+                await second.execute("set lock_timeout = '1s'")
+                await second.execute(insert, other_id)
+        finally:
+            await second.execute("reset lock_timeout")
+            for conn in held:
+                await db_connection.pool.release(conn)
+
+    response = await client.get("/comments/stats", params={"bucket": "day"})
+    assert [b["comment_count"] for b in response.json()] == [3]
+
+
+async def test_batch_get_and_delete_comments(client: AsyncClient):
+    user_id = await create_user(client, "batch@example.com")
+    ids = []
+    for i in range(3):
+        response = await client.post("/comments/", json={"user_id": user_id, "comment": f"b{i}"})
+        ids.append(response.json()["id"])
+
+    response = await client.post("/comments/batch-get", json={"ids": [ids[1], 999999, ids[0]]})
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["found"], data["missing"]) == (2, 1)
+    assert [r["id"] for r in data["results"]] == [ids[1], 999999, ids[0]]
+    assert data["results"][0]["comment"]["comment"] == "b1"
+    assert data["results"][1]["comment"] is None and data["results"][1]["error"]
+
+    # get_by_id прогревает кеш - batch-delete обязан его сбросить
+    await client.get(f"/comments/{ids[0]}")
+    response = await client.post("/comments/batch-delete", json={"ids": [ids[0], ids[1], 999999]})
+    data = response.json()
+    assert (data["deleted"], data["missing"]) == (2, 1)
+    assert [r["deleted"] for r in data["results"]] == [True, True, False]
+    assert (await client.get(f"/comments/{ids[0]}")).status_code == 404
+    assert (await client.get(f"/users/{user_id}/stats")).json()["comment_count"] == 1
+
+    assert (await client.post("/comments/batch-delete", json={"ids": []})).status_code == 400
+    assert (await client.post("/comments/batch-get", json={"ids": [2**31]})).status_code == 400
+
+
+async def test_comment_partitions_and_retention(client: AsyncClient, monkeypatch):
+    user_id = await create_user(client, "partitions@example.com")
+    recent_id = (await client.post("/comments/", json={"user_id": user_id, "comment": "recent"})).json()["id"]
+
+    # комментарий задним числом: партиции его месяца нет - строка ложится в default и
+    # переносится при ensure_comment_partitions
+    async with db_connection.acquire() as conn:
+        old_id = await conn.fetchval(
+            "insert into comments (user_id, comment, created_at) values ($1, 'old', '2001-05-10') returning id",
+            user_id,
+        )
+        partition_of = "select tableoid::regclass::text from comments where id = $1"
+        assert await conn.fetchval(partition_of, old_id) == "comments_default"
+        assert "comments_p2001_05" in await ensure_comment_partitions(conn)
+        assert await conn.fetchval(partition_of, old_id) == "comments_p2001_05"
+
+    assert (await client.get(f"/comments/{old_id}")).json()["comment"] == "old"
+    response = await client.post("/comments/batch-get", json={"ids": [old_id, recent_id]})
+    assert response.json()["found"] == 2
+    response = await client.get("/comments/", params={"user_id": user_id})
+    assert {c["id"] for c in response.json()} == {old_id, recent_id}
+    assert (await client.get(f"/users/{user_id}/stats")).json()["comment_count"] == 2
+
+    monkeypatch.setattr(settings, "comment_retention_months", 12)
+    monkeypatch.setattr(settings, "comment_retention_mode", "drop")
+    async with db_connection.acquire() as conn:
+        assert await archive_comment_partitions(conn) == ["comments_p2001_05"]
+    comment_cache.clear()
+
+    assert (await client.get(f"/comments/{old_id}")).status_code == 404
+    assert (await client.get(f"/comments/{recent_id}")).status_code == 200
+    assert (await client.get(f"/users/{user_id}/stats")).json()["comment_count"] == 1
+
+
+async def test_get_all_comments_limit_is_capped(client: AsyncClient):
+    response = await client.get("/comments/", params={"limit": 10**6})
+    assert response.status_code == 200
+
+
+async def test_bulk_create_comments_ndjson(client: AsyncClient):
+    user_id = await create_user(client, "bulkauthor@example.com")
+    body = "\n".join([
+        f'{{"user_id": {user_id}, "comment": "first"}}',
+        '{"user_id": 999999, "comment": "orphan"}',
+        "not json",
+        f'{{"user_id": {user_id}, "comment": "second"}}',
+    ])
+    response = await client.post(
+        "/comments/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["created"] == 2
+    assert [r["error"] is None for r in data["results"]] == [True, False, False, True]
+
+    comments = (await client.get(f"/comments/user/{user_id}")).json()
+    assert [c["comment"] for c in comments] == ["first", "second"]
+
+
+async def test_bulk_create_comments_unsupported_content_type(client: AsyncClient):
+    response = await client.post("/comments/bulk", content="x", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+
+async def test_update_comment(client: AsyncClient):
+    user_id = await create_user(client, "editor@example.com")
+    comment_id = (await client.post("/comments/", json={"user_id": user_id, "comment": "draft"})).json()["id"]
+
+    response = await client.put(f"/comments/{comment_id}", json={"user_id": user_id, "comment": "final"})
+    assert response.status_code == 200
+    assert response.json()["comment"] == "final"
+
+    response = await client.put(f"/comments/{comment_id}", json={"user_id": user_id})
+    assert response.status_code == 200
+    assert response.json()["comment"] == "final"
+
+
+async def test_update_comment_if_match(client: AsyncClient):
+    user_id = await create_user(client, "ifmatch@example.com")
+    response = await client.post("/comments/", json={"user_id": user_id, "comment": "v1"})
+    comment_id = response.json()["id"]
+    etag = response.headers["etag"]
+
+    response = await client.put(
+        f"/comments/{comment_id}", json={"user_id": user_id, "comment": "v2"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    response = await client.put(
+        f"/comments/{comment_id}", json={"user_id": user_id, "comment": "v3"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    response = await client.get(f"/comments/{comment_id}")
+    assert response.json()["comment"] == "v2"
+
+    # не владелец со старым ETag - 404: ownership проверяется раньше версии
+    other_id = await create_user(client, "ifmatch-other@example.com")
+    response = await client.put(
+        f"/comments/{comment_id}", json={"user_id": other_id, "comment": "x"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 404
+
+    response = await client.get(f"/comments/user/{user_id}")
+    response = await client.get(
+        f"/comments/user/{user_id}", headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == 304
+
+
+async def test_update_owned_rechecks_version_after_concurrent_update(client: AsyncClient):
+    user_id = await create_user(client, "racer@example.com")
+    comment_id = (await client.post("/comments/", json={"user_id": user_id, "comment": "v1"})).json()["id"]
+    repository = PostgresCommentRepository(db_connection)
+
+    async with db_connection.acquire() as first:
+        version = await first.fetchval("select updated_at from comments where id = $1", comment_id)
+        async with first.transaction():
+            await first.execute(
+                "update comments set comment = 'first', updated_at = clock_timestamp() where id = $1", comment_id
+            )
+            # второй If-Match с той же версией ждёт row lock первой транзакции
+            second = asyncio.create_task(repository.update_owned(comment_id, user_id, "second", [version]))
+            # pg_locks в транзакции не кэшируется, в отличие от pg_stat_activity
+            blocked = "select exists (select 1 from pg_locks where not granted and locktype = 'transactionid')"
+            for _ in range(500):
+                if await first.fetchval(blocked):
+                    break
+                await asyncio.sleep(0.01)
+        result = await second
+
+    assert result.comment is None
+    assert result.owned and not result.version_matches
+    assert await db_connection.fetchval("select comment from comments where id = $1", comment_id) == "first"
+
+
+async def test_update_comment_errors(client: AsyncClient):
+    owner_id = await create_user(client, "owner@example.com")
+    stranger_id = await create_user(client, "stranger@example.com")
+    comment_id = (await client.post("/comments/", json={"user_id": owner_id, "comment": "mine"})).json()["id"]
+
+    for user_id, target_id in [(999999, comment_id), (owner_id, 999999), (stranger_id, comment_id)]:
+        response = await client.put(f"/comments/{target_id}", json={"user_id": user_id, "comment": "x"})
+        assert response.status_code == 404
+
+    assert (await client.get(f"/comments/{comment_id}")).json()["comment"] == "mine"
+
+
+async def test_export_comments_ndjson_and_csv(client: AsyncClient):
+    import json
+
+    user_id = await create_user(client, "exporter@example.com")
+    other_id = await create_user(client, "noise@example.com")
+    texts = ['plain', 'with "quotes", commas\nand newline', 'back\\slash']
+    for text in texts:
+        await client.post("/comments/", json={"user_id": user_id, "comment": text})
+    await client.post("/comments/", json={"user_id": other_id, "comment": "noise"})
+
+    response = await client.get("/comments/export", params={"format": "ndjson", "user_id": user_id})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["comment"] for row in rows] == texts
+
+    response = await client.get("/comments/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.text.startswith("id,user_id,comment,created_at,updated_at")
+
+
+async def test_copy_stream_closed_with_full_queue_stops_copy(client: AsyncClient):
+    query = "select repeat('x', 1000) from generate_series(1, 100000)"
+    stream = db_connection.copy_from_query_stream(query, queue_size=1)
+    assert await stream.__anext__()
+    # продюсер заполняет очередь и ждёт места в ней
+    await asyncio.sleep(0.2)
+    closing = asyncio.create_task(stream.aclose())
+    done, _ = await asyncio.wait([closing], timeout=5)
+    assert closing in done
+
+    running = await db_connection.fetchval(
+        "select count(*) from pg_stat_activity where state = 'active' and query = $1", query
+    )
+    assert running == 0
+
+
+async def test_export_comments_invalid_format(client: AsyncClient):
+    response = await client.get("/comments/export", params={"format": "xml"})
+    assert response.status_code == 422
@@ -0,0 +1,133 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from src.presentation.api.compression import (
+    GZIP,
+    ZSTD,
+    CompressionMiddleware,
+    negotiate,
+    parse_route_levels,
+    zstandard,
+)
+
+BODY = "comment number 42 with some typical text payload\n" * 200
+CHUNK = b"1\t42\tcomment with some typical text payload\t2024-01-01 00:00:00\n" * 2000
+
+
+async def _chunks():
+    for _ in range(5):
+        yield CHUNK
+
+
+def _app(**options) -> CompressionMiddleware:
+    app = Starlette(routes=[
+        Route("/text", lambda request: PlainTextResponse(BODY)),
+        Route("/small", lambda request: PlainTextResponse("ok")),
+        Route("/png", lambda request: Response(BODY.encode(), media_type="image/png")),
+        Route("/encoded", lambda request: Response(gzip.compress(BODY.encode()), headers={"Content-Encoding": "gzip"})),
+        Route("/export", lambda request: StreamingResponse(_chunks(), media_type="text/csv")),
+    ])
+    return CompressionMiddleware(app, **options)
+
+
+async def _call(app, path: str, accept_encoding: str) -> list:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "scheme": "http",
+        "server": ("test", 80),
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        # StreamingResponse слушает disconnect до конца стрима - после тела запроса ждём вечно
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def test_negotiate_respects_quality_and_server_preference():
+    assert negotiate("gzip, deflate", (ZSTD, GZIP)) == GZIP
+    assert negotiate("gzip, zstd", (ZSTD, GZIP)) == ZSTD
+    assert negotiate("zstd;q=0.5, gzip", (ZSTD, GZIP)) == GZIP
+    assert negotiate("*", (ZSTD, GZIP)) == ZSTD
+    assert negotiate("*, zstd;q=0", (ZSTD, GZIP)) == GZIP
+    assert negotiate("gzip;q=0, identity", (ZSTD, GZIP)) is None
+    assert parse_route_levels("/comments/export=1, /metrics=0") == {"/comments/export": 1, "/metrics": 0}
+
+
+async def test_gzip_applies_above_minimum_size_only():
+    async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as api:
+        response = await api.get("/text", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(BODY) // 10
+        assert response.text == BODY
+
+        small = await api.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+        assert small.headers["vary"] == "Accept-Encoding"
+
+        identity = await api.get("/text", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in identity.headers
+        assert identity.text == BODY
+
+
+async def test_already_compressed_bodies_pass_through():
+    async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as api:
+        png = await api.get("/png", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in png.headers
+        assert png.content == BODY.encode()
+
+        encoded = await api.get("/encoded", headers={"Accept-Encoding": "gzip"})
+        assert encoded.text == BODY
+
+
+async def test_streaming_response_is_compressed_incrementally():
+    messages = await _call(_app(), "/export", "gzip")
+
+    start, *bodies = messages
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # чанки уходят по мере готовности, а не одним телом в конце
+    assert len([m for m in bodies if m["body"]]) > 1
+    assert bodies[-1]["more_body"] is False
+    assert zlib.decompress(b"".join(m["body"] for m in bodies), 31) == CHUNK * 5
+
+
+async def test_route_level_zero_disables_compression():
+    messages = await _call(_app(route_levels={"/export": 0}), "/export", "gzip")
+
+    assert b"content-encoding" not in dict(messages[0]["headers"])
+    assert b"".join(m.get("body", b"") for m in messages[1:]) == CHUNK * 5
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+async def test_zstd_preferred_when_available():
+    messages = await _call(_app(), "/text", "gzip, zstd")
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-encoding"] == b"zstd"
+    body = messages[1]["body"]
+    assert int(headers[b"content-length"]) == len(body)
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(body) == BODY.encode()
@@ -0,0 +1,80 @@
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.domain.entities.comment import Comment
+from src.domain.entities.comment_batch import CommentBatch
+from src.presentation.api.renderers import FieldPlan
+from src.presentation.schemas.comment_schemas import CommentResponse
+
+ROWS = 10000
+
+
+@dataclass
+class DictComment:
+    id: Optional[int]
+    user_id: Optional[int]
+    comment: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+def _rows():
+    start = datetime(2024, 1, 1)
+    return [
+        (1000000 + i, 1000 + i % 50, f"comment {i}", start + timedelta(seconds=i), start + timedelta(seconds=i))
+        for i in range(ROWS)
+    ]
+
+
+def _retained(build, rows=None) -> int:
+    """
+    Память, которую удерживает результат build(rows). Без rows строки создаются внутри замера
+    и освобождаются - как записи asyncpg, которые живут только до конца запроса.
+    """
+    tracemalloc.start()
+    try:
+        result = build(_rows() if rows is None else rows)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def test_slotted_comment_uses_less_memory_than_dict_based():
+    # значения общие - меряем только сами объекты
+    rows = _rows()
+    dict_based = _retained(lambda rows: [DictComment(*row) for row in rows], rows)
+    slotted = _retained(lambda rows: [Comment(*row) for row in rows], rows)
+
+    assert not hasattr(Comment(1, 1, "text"), "__dict__")
+    assert slotted < dict_based * 0.75
+
+
+def test_comment_batch_uses_less_memory_than_entity_list():
+    entities = _retained(lambda rows: [Comment(*row) for row in rows])
+    batch = _retained(CommentBatch.from_rows)
+
+    # в батче остаются только строки текста и плоские массивы чисел
+    assert batch < entities * 0.5
+
+
+def test_comment_batch_behaves_like_entity_list():
+    rows = _rows()[:3] + [(7, 1, "no dates", None, None)]
+    entities = [Comment(*row) for row in rows]
+    batch = CommentBatch.from_rows(rows)
+
+    assert len(batch) == 4
+    assert batch == entities
+    assert batch[-1] == entities[-1]
+    assert batch[1:3] == entities[1:3]
+    assert CommentBatch(entities) == batch
+
+
+def test_field_plan_renders_batch_from_columns():
+    rows = _rows()[:5] + [(7, 1, "no dates", None, None)]
+    plan = FieldPlan(CommentResponse)
+
+    assert plan.rows(CommentBatch.from_rows(rows)) == plan.rows([Comment(*row) for row in rows])
@@ -0,0 +1,117 @@
+import json
+import logging
+import queue
+import threading
+
+from httpx import ASGITransport, AsyncClient
+
+from src.infrastructure.logging_config.queue_logging import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    QueueLogging,
+    RateLimitFilter,
+    RequestIdFilter,
+    SamplingFilter,
+    request_id,
+)
+from src.presentation.api.app import create_app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.get_ident())
+
+
+def _record(level=logging.INFO, msg="message", args=()):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_filter_refills_tokens():
+    clock = FakeClock()
+    rate_limit = RateLimitFilter(rate=2, burst=2, clock=clock)
+
+    assert [rate_limit.filter(_record()) for _ in range(3)] == [True, True, False]
+    assert rate_limit.filter(_record(logging.ERROR))
+    clock.now = 0.5
+    assert rate_limit.filter(_record())
+    assert not rate_limit.filter(_record())
+    assert rate_limit.suppressed == 2
+
+
+def test_sampling_filter_keeps_warnings():
+    values = iter([0.5, 0.005])
+    sampling = SamplingFilter(rate=0.01, random_fn=lambda: next(values))
+
+    assert not sampling.filter(_record())
+    assert sampling.filter(_record())
+    assert sampling.filter(_record(logging.WARNING))
+
+
+def test_json_formatter_includes_request_id_and_extra():
+    token = request_id.set("req-1")
+    try:
+        record = _record(msg="user %s", args=(42,))
+        record.user_id = 42
+        RequestIdFilter().filter(record)
+    finally:
+        request_id.reset(token)
+
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["message"] == "user 42"
+    assert data["request_id"] == "req-1"
+    assert data["user_id"] == 42
+    assert data["level"] == "INFO"
+
+
+def test_queue_handler_counts_dropped_records():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1), "test")
+
+    for _ in range(3):
+        handler.handle(_record())
+
+    assert handler.dropped == 2
+
+
+def test_handlers_run_on_listener_thread():
+    logger = logging.getLogger("test_queue_logging")
+    logger.propagate = False
+    target = ListHandler()
+    logger.handlers = [target]
+    pipeline = QueueLogging()
+    pipeline.install([logger], queue_size=100)
+
+    token = request_id.set("req-2")
+    try:
+        logger.info("hello %s", "world")
+    finally:
+        request_id.reset(token)
+    pipeline.stop()
+
+    assert [record.getMessage() for record in target.records] == ["hello world"]
+    assert target.records[0].request_id == "req-2"
+    assert threading.get_ident() not in target.threads
+
+
+async def test_request_id_is_echoed_in_response():
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as api:
+        given = await api.get("/health", headers={"X-Request-Id": "abc-123"})
+        generated = await api.get("/health")
+
+    assert given.headers["x-request-id"] == "abc-123"
+    assert len(generated.headers["x-request-id"]) == 32
@@ -0,0 +1,79 @@
+import json
+import os
+
+from httpx import ASGITransport, AsyncClient
+
+from src.infrastructure.metrics import MetricsRegistry
+from src.presentation.api.app import create_app
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("query_seconds", "Query latency", ["query"], buckets=(0.01, 0.1))
+    histogram.observe(0.005, "users.get_by_id")
+    histogram.observe(0.05, "users.get_by_id")
+    histogram.observe(0.01, "users.get_by_id")
+    histogram.observe(3.0, "users.get_by_id")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE query_seconds histogram" in lines
+    assert 'query_seconds_bucket{query="users.get_by_id",le="0.01"} 2' in lines
+    assert 'query_seconds_bucket{query="users.get_by_id",le="0.1"} 3' in lines
+    assert 'query_seconds_bucket{query="users.get_by_id",le="+Inf"} 4' in lines
+    assert 'query_seconds_count{query="users.get_by_id"} 4' in lines
+
+
+def test_counter_and_gauge_function():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests", ["status"])
+    counter.inc("200")
+    counter.inc("200")
+    registry.gauge_function("pool_idle", "Idle", ["pool"], lambda: {("primary",): 3})
+
+    text = registry.render()
+
+    assert 'requests_total{status="200"} 2' in text
+    assert 'pool_idle{pool="primary"} 3' in text
+
+
+def test_multiprocess_render_merges_worker_snapshots(tmp_path):
+    def registry(requests, latency, idle):
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests", ["status"]).inc("200", amount=requests)
+        registry.histogram("query_seconds", "Query latency", buckets=(0.1,)).observe(latency)
+        registry.gauge_function("pool_idle", "Idle", ["pool"], lambda: {("primary",): idle})
+        return registry
+
+    # живой воркер (pid родителя заведомо жив) и завершившийся (pid больше pid_max)
+    for pid, other in ((os.getppid(), registry(2, 0.5, 4)), (2**22 + 1, registry(3, 0.05, 7))):
+        (tmp_path / f"{pid}.json").write_text(json.dumps(other.dump()))
+    (tmp_path / "123.json").write_text("{truncated")
+
+    lines = registry(1, 0.01, 3).render_multiprocess(str(tmp_path)).splitlines()
+
+    assert 'requests_total{status="200"} 6' in lines
+    assert 'query_seconds_bucket{le="0.1"} 2' in lines
+    assert "query_seconds_count 3" in lines
+    assert f'pool_idle{{pool="primary",worker="{os.getpid()}"}} 3' in lines
+    assert f'pool_idle{{pool="primary",worker="{os.getppid()}"}} 4' in lines
+    assert len([line for line in lines if line.startswith("pool_idle{")]) == 2
+
+
+async def test_metrics_endpoint_reports_routes_queries_and_pool(client):
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as api:
+        response = await api.post("/users/", json={"email": "metrics@example.com", "name": "Metrics"})
+        await api.get(f"/users/{response.json()['id']}")
+        await api.get("/no-such-route")
+        response = await api.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}"}' in text
+    assert 'http_requests_total{method="POST",route="/users/",status="201"}' in text
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"}' in text
+    assert 'db_query_duration_seconds_count{query="users.create"}' in text
+    assert 'db_pool_acquire_wait_seconds_count{pool="primary"}' in text
+    assert 'db_pool_max_connections{pool="primary"} 20' in text
@@ -0,0 +1,145 @@
+import asyncio
+
+import asyncpg
+import pytest
+import pytest_asyncio
+
+from src.infrastructure.config import settings
+from src.infrastructure.database.migration_runner import MigrationRunner
+from src.infrastructure.database.migration_script import (
+    MigrationOptions,
+    concurrent_index,
+    parse_options,
+    split_statements,
+)
+
+
+def _connect():
+    return asyncpg.connect(
+        host=settings.database_host,
+        port=settings.database_port,
+        database=settings.database_name,
+        user=settings.database_user,
+        password=settings.database_password,
+    )
+
+
+@pytest_asyncio.fixture
+async def probe():
+    conn = await _connect()
+    await conn.execute("""
+        drop table if exists migration_probe;
+        create table migration_probe (id serial primary key, value integer, doubled integer);
+        insert into migration_probe (value) select i from generate_series(1, 25) as i;
+        delete from migration_probe where id between 5 and 15;
+    """)
+    yield conn
+    await conn.execute("drop table if exists migration_probe")
+    await conn.execute("delete from schema_migrations where version like '90%_probe%'")
+    await conn.close()
+
+
+def test_directives_and_statement_splitting():
+    assert parse_options("create table t (id int);") == MigrationOptions()
+    options = parse_options("-- migrate: no-transaction\n-- migrate: lock_timeout=2s, retries=5\nselect 1;")
+    assert options == MigrationOptions(transactional=False, lock_timeout="2s", retries=5)
+    with pytest.raises(ValueError):
+        parse_options("-- migrate: no-transactions")
+
+    sql = """
+    -- комментарий; не разделитель
+    create function f() returns text language sql as $$ select 'a;b' $$;
+    select 'it''s; fine', "odd;name" from t; /* ; */
+    create index concurrently if not exists t_value_idx on t (value);
+    """
+    statements = split_statements(sql)
+    assert len(statements) == 3
+    assert statements[0].endswith("$$ select 'a;b' $$")
+    index = concurrent_index(statements[2])
+    assert (index.name, index.table, index.definition) == ("t_value_idx", "t", "(value)")
+    assert index.create("t_p1", "t_p1_value_idx", only=False).startswith("create index concurrently if not exists t_p1_value_idx on t_p1")
+    assert concurrent_index(statements[1]) is None
+
+
+async def test_no_transaction_migration_with_concurrent_index_and_backfill(probe, tmp_path):
+    # невалидный индекс от прерванного create index concurrently пересоздаётся, а не пропускается
+    await probe.execute("create index migration_probe_value_idx on migration_probe (value)")
+    await probe.execute("update pg_index set indisvalid = false where indexrelid = 'migration_probe_value_idx'::regclass")
+    (tmp_path / "901_probe_online.sql").write_text(
+        "-- migrate: no-transaction\n"
+        "create index concurrently if not exists migration_probe_value_idx on migration_probe (value);\n"
+        "call batched_update('migration_probe', 'doubled = value * 2', 'doubled is null', 4);\n"
+    )
+
+    await MigrationRunner(str(tmp_path)).migrate()
+
+    valid = await probe.fetchval("select indisvalid from pg_index where indexrelid = 'migration_probe_value_idx'::regclass")
+    assert valid is True
+    assert await probe.fetchval("select count(*) from migration_probe where doubled = value * 2") == 14
+    assert await probe.fetchval("select count(*) from schema_migrations where version = '901_probe_online'") == 1
+
+
+async def test_lock_timeout_is_retried(probe, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "migration_retry_delay_seconds", 0.2)
+    (tmp_path / "902_probe_retry.sql").write_text(
+        "-- migrate: lock_timeout=100ms, retries=3\n"
+        "alter table migration_probe add column extra integer;\n"
+    )
+    blocker = await _connect()
+    transaction = blocker.transaction()
+    await transaction.start()
+    await blocker.execute("lock table migration_probe in access share mode")
+
+    async def release():
+        await asyncio.sleep(0.3)
+        await transaction.rollback()
+
+    try:
+        await asyncio.gather(MigrationRunner(str(tmp_path)).migrate(), release())
+    finally:
+        await blocker.close()
+
+    assert await probe.fetchval(
+        "select count(*) from information_schema.columns where table_name = 'migration_probe' and column_name = 'extra'"
+    ) == 1
+
+    (tmp_path / "903_probe_no_retry.sql").write_text(
+        "-- migrate: lock_timeout=50ms, retries=0\nalter table migration_probe add column other integer;\n"
+    )
+    blocker = await _connect()
+    try:
+        async with blocker.transaction():
+            await blocker.execute("lock table migration_probe in access share mode")
+            with pytest.raises(asyncpg.exceptions.LockNotAvailableError):
+                await MigrationRunner(str(tmp_path)).migrate()
+    finally:
+        await blocker.close()
+
+
+async def test_concurrent_runners_apply_once(probe, tmp_path):
+    # без advisory lock вторая реплика упала бы на create table / insert версии
+    (tmp_path / "904_probe_slow.sql").write_text(
+        "select pg_sleep(0.2);\ncreate table migration_probe_once (id integer);\n"
+    )
+    try:
+        await asyncio.gather(*(MigrationRunner(str(tmp_path)).migrate() for _ in range(3)))
+        assert await probe.fetchval("select count(*) from schema_migrations where version = '904_probe_slow'") == 1
+    finally:
+        await probe.execute("drop table if exists migration_probe_once")
+
+
+async def test_fast_path_and_changed_migration(probe, tmp_path, capsys):
+    migration = tmp_path / "905_probe_checksum.sql"
+    migration.write_text("alter table migration_probe add column note text;\n")
+    await MigrationRunner(str(tmp_path)).migrate()
+    await MigrationRunner(str(tmp_path)).migrate()
+    assert "Schema is current (1 migration(s))" in capsys.readouterr().out
+
+    # до checksum'ов версия записывалась без него - принимается текущий файл
+    await probe.execute("update schema_migrations set checksum = null where version = '905_probe_checksum'")
+    await MigrationRunner(str(tmp_path)).migrate()
+    assert await probe.fetchval("select checksum from schema_migrations where version = '905_probe_checksum'")
+
+    migration.write_text("alter table migration_probe add column note varchar(10);\n")
+    with pytest.raises(RuntimeError, match="905_probe_checksum"):
+        await MigrationRunner(str(tmp_path)).migrate()
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from src.domain.entities.user import User
+from src.infrastructure.batch_loader import BatchLoader
+from src.infrastructure.cache import LRUTTLCache
+from src.infrastructure.config import settings
+from src.infrastructure.database.connection import db_connection
+from src.infrastructure.database.routing import (
+    LEAST_BUSY,
+    ReadRouter,
+    Replica,
+    client_key,
+    parse_hosts,
+)
+from src.infrastructure.repositories.cached_user_repository import CachedUserRepository
+from src.infrastructure.repositories.postgres_user_repository import PostgresUserRepository
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _replica(name: str, lag: float = 0.0) -> Replica:
+    replica = Replica(name, 5432)
+    replica.lag = lag
+    return replica
+
+
+def test_parse_hosts():
+    assert parse_hosts("replica1, replica2:5433,", 5432) == [("replica1", 5432), ("replica2", 5433)]
+    assert parse_hosts("", 5432) == []
+
+
+def test_round_robin_skips_lagging_replicas():
+    first, second, lagging = _replica("a"), _replica("b"), _replica("c", lag=10.0)
+    router = ReadRouter([first, second, lagging], max_lag=1.0)
+
+    chosen = [router.choose(None) for _ in range(4)]
+
+    assert chosen == [first, second, first, second]
+    assert lagging.reads == 0
+
+
+def test_least_busy_picks_replica_with_fewest_queries_in_flight():
+    first, second = _replica("a"), _replica("b")
+    first.in_flight = 3
+    second.in_flight = 1
+    router = ReadRouter([first, second], strategy=LEAST_BUSY)
+
+    assert router.choose(None) is second
+
+
+def test_falls_back_to_primary_when_all_replicas_lag():
+    router = ReadRouter([_replica("a", lag=5.0), _replica("b", lag=float("inf"))], max_lag=1.0)
+
+    assert router.choose(None) is None
+    assert router.lag_fallbacks == 1
+
+
+def test_reads_after_write_go_to_primary_until_window_expires():
+    clock = FakeClock()
+    replica = _replica("a")
+    router = ReadRouter([replica], recent_writes=LRUTTLCache(ttl=5.0, clock=clock))
+
+    router.record_write("client-1")
+
+    assert router.choose("client-1") is None
+    assert router.choose("client-2") is replica
+    clock.now = 6.0
+    assert router.choose("client-1") is replica
+    assert router.read_your_writes_fallbacks == 1
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        ReadRouter([], strategy="random")
+
+
+async def test_batched_loads_keep_read_your_writes_per_client(monkeypatch):
+    replica = _replica("a")
+    router = ReadRouter([replica])
+    monkeypatch.setattr(db_connection, "router", router)
+    router.record_write("writer")
+    routes = []
+
+    async def batch_fn(ids):
+        # пакет выполняется в контексте открывшего его load - как запрос репозитория
+        routes.append((sorted(ids), router.choose(client_key.get())))
+        return []
+
+    loader = BatchLoader(batch_fn, partition=db_connection.read_partition)
+
+    async def load_as(client, key):
+        client_key.set(client)
+        return await loader.load(key)
+
+    # читатель открывает пакет первым - писатель не должен попасть в него и уйти на реплику
+    await asyncio.gather(load_as("reader", 1), load_as("writer", 2), load_as("other", 3))
+
+    assert sorted(routes) == [([1, 3], replica), ([2], None)]
+
+
+@pytest.mark.skipif(not settings.database_read_hosts, reason="DATABASE_READ_HOSTS is not configured")
+async def test_reads_are_routed_to_replicas(client):
+    router = db_connection.router
+    repository = PostgresUserRepository(db_connection)
+    assert router.replicas
+
+    token = client_key.set("writer")
+    try:
+        user = await repository.create(User(id=None, email="replica@example.com", name="Replica"))
+        fallbacks = router.read_your_writes_fallbacks
+        assert await repository.get_by_id(user.id) == user
+        assert router.read_your_writes_fallbacks == fallbacks + 1
+    finally:
+        client_key.reset(token)
+
+    reads = sum(replica.reads for replica in router.replicas)
+    await repository.get_all()
+    assert sum(replica.reads for replica in router.replicas) == reads + 1
+
+
+async def test_cache_fills_read_from_primary(monkeypatch):
+    replica = _replica("a")
+    router = ReadRouter([replica])
+    monkeypatch.setattr(db_connection, "router", router)
+    routes = []
+
+    class Repository:
+        async def get_by_id(self, user_id):
+            routes.append(router.choose(client_key.get()))
+            return User(id=user_id, email="fill@example.com", name="Fill")
+
+        async def get_existing_ids(self, user_ids):
+            routes.append(router.choose(client_key.get()))
+            return set(user_ids)
+
+    repository = CachedUserRepository(Repository(), LRUTTLCache())
+
+    # строка с реплики, отстающей от чужой записи, прожила бы в кэше весь TTL
+    await repository.get_by_id(1)
+    await repository.get_by_id(1)
+    await repository.get_existing_ids([1])
+
+    assert routes == [None, replica]
+    assert router.cache_fill_reads == 1
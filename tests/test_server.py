@@ -0,0 +1,107 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from src.infrastructure.config import settings
+from src.infrastructure.database.connection import pool_max_size
+from src.infrastructure.server import bind_socket, resolve_workers
+from src.infrastructure.repositories.cached_user_repository import CachedUserRepository
+from src.infrastructure.repositories.postgres_user_repository import PostgresUserRepository
+from src.presentation.api.dependencies import cache_enabled, get_user_repository, user_count_cache
+
+
+def test_pool_is_split_between_workers(monkeypatch):
+    monkeypatch.setattr(settings, "database_pool_max_size", 20)
+    monkeypatch.setattr(settings, "database_connection_budget", 80)
+
+    monkeypatch.setattr(settings, "app_workers", 0)
+    assert pool_max_size() == 20
+    monkeypatch.setattr(settings, "app_workers", 1)
+    assert pool_max_size() == 20
+    # при reload на время замены воркера пулов на один больше
+    monkeypatch.setattr(settings, "app_workers", 8)
+    assert pool_max_size() == 8
+    monkeypatch.setattr(settings, "app_workers", 200)
+    assert pool_max_size() == 1
+    monkeypatch.setattr(settings, "database_connection_budget", 0)
+    assert pool_max_size() == 20
+
+
+def test_cache_is_off_by_default_with_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "cache_enabled", None)
+    monkeypatch.setattr(settings, "app_workers", 1)
+    assert cache_enabled()
+    monkeypatch.setattr(settings, "app_workers", 4)
+    assert not cache_enabled()
+    monkeypatch.setattr(settings, "cache_enabled", True)
+    assert cache_enabled()
+
+
+def test_count_cache_stays_on_with_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "cache_enabled", None)
+    monkeypatch.setattr(settings, "app_workers", 4)
+    monkeypatch.setattr(settings, "batching_enabled", False)
+    repository = get_user_repository()
+    assert isinstance(repository, CachedUserRepository)
+    assert repository.cache is None
+    assert repository.counts is user_count_cache
+
+    monkeypatch.setattr(settings, "count_cache_enabled", False)
+    assert isinstance(get_user_repository(), PostgresUserRepository)
+
+
+def test_workers_default_to_cpu_count():
+    assert resolve_workers(3) == 3
+    assert resolve_workers(0) >= 1
+
+
+def test_reuse_port_sockets_share_address():
+    first = bind_socket("127.0.0.1", 0, 16, reuse_port=True)
+    try:
+        second = bind_socket("127.0.0.1", first.getsockname()[1], 16, reuse_port=True)
+        second.close()
+    finally:
+        first.close()
+
+
+def _wait_healthy(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert process.poll() is None, process.stdout.read()
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise AssertionError("server did not start")
+
+
+def test_supervisor_reloads_without_downtime():
+    sock = bind_socket("127.0.0.1", 0, 16)
+    port = sock.getsockname()[1]
+    sock.close()
+    env = dict(os.environ, APP_HOST="127.0.0.1", APP_PORT=str(port), APP_WORKERS="2", DEBUG="false")
+    process = subprocess.Popen(
+        [sys.executable, "main.py"], env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    url = f"http://127.0.0.1:{port}/health"
+    try:
+        _wait_healthy(url, process)
+        process.send_signal(signal.SIGHUP)
+        statuses = set()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            statuses.add(httpx.get(url).status_code)
+            time.sleep(0.05)
+        assert statuses == {200}
+    finally:
+        process.send_signal(signal.SIGTERM)
+        output, _ = process.communicate(timeout=60)
+
+    assert process.returncode == 0
+    assert "reload complete" in output
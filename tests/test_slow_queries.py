@@ -0,0 +1,57 @@
+from httpx import ASGITransport, AsyncClient
+
+from src.infrastructure.database.connection import db_connection
+from src.infrastructure.database.slow_queries import fingerprint, normalize, redact, seq_scans
+from src.presentation.api.app import create_app
+
+
+def test_fingerprint_ignores_literals_and_whitespace():
+    first = "select * from comments where user_id = 10 and comment = 'a'"
+    second = "SELECT *\n  FROM comments WHERE user_id = 42 AND comment = 'it''s'  -- note"
+
+    assert normalize(first) == "select * from comments where user_id = ? and comment = ?"
+    assert fingerprint(first) == fingerprint(second)
+    assert normalize("select * from users where id in (1, 2, 3) and id > $1") == (
+        "select * from users where id in (?) and id > $1"
+    )
+
+
+def test_redact_keeps_only_types():
+    assert redact([1, "secret@example.com", [1, 2]]) == ["<int>", "<str>", "<list[2]>"]
+
+
+def test_seq_scans_are_found_in_nested_plan():
+    plan = [{"Plan": {"Node Type": "Limit", "Plans": [
+        {"Node Type": "Seq Scan", "Relation Name": "comments"},
+        {"Node Type": "Index Scan", "Relation Name": "users"},
+    ]}}]
+
+    assert seq_scans(plan) == {"comments"}
+
+
+async def test_slow_queries_are_logged_with_caller_and_plan(client, monkeypatch):
+    slow_queries = db_connection.slow_queries
+    monkeypatch.setattr(slow_queries, "threshold", 0.0)
+    monkeypatch.setattr(slow_queries, "explain_sample_rate", 1.0)
+    slow_queries.clear()
+
+    app = create_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as api:
+        user = (await api.post("/users/", json={"email": "slow@example.com", "name": "Slow"})).json()
+        await api.post("/comments/", json={"user_id": user["id"], "comment": "hello"})
+        await api.get(f"/comments/user/{user['id']}")
+        await slow_queries.drain()
+        response = await api.get("/admin/slow-queries", params={"limit": 100, "include_plans": True})
+
+    assert response.status_code == 200
+    queries = {query["statement"]: query for query in response.json()["queries"]}
+
+    by_user = queries["comments.get_by_user_id"]
+    assert by_user["use_case"] == "GetAllCommentsUserIdUseCase.execute"
+    assert by_user["repository"] == "PostgresCommentRepository.get_by_user_id"
+    assert by_user["last_params"] == ["<int>", "<int>", "<int>"]
+    assert by_user["plan"][0]["Plan"]["Node Type"]
+    assert isinstance(by_user["seq_scans"], list)
+
+    # запись не повторяется ради EXPLAIN ANALYZE
+    assert queries["users.create"]["plan"] is None
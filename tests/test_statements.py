@@ -0,0 +1,49 @@
+import pytest
+
+from src.infrastructure.config import settings
+from src.infrastructure.database.connection import db_connection
+from src.infrastructure.database.statements import StatementRegistry, statements
+from src.infrastructure.repositories.postgres_user_repository import GET_BY_ID
+
+
+def test_register_is_idempotent_and_rejects_conflicts():
+    registry = StatementRegistry()
+    first = registry.register("users.count", "select count(*) from users")
+
+    assert registry.register("users.count", "select count(*) from users") is first
+    assert len(registry) == 1
+    with pytest.raises(ValueError):
+        registry.register("users.count", "select 1")
+
+
+async def test_statement_stats_and_reprepare_after_deallocate(client):
+    response = await client.post("/users/", json={"email": "stats@example.com", "name": "Stats"})
+    user_id = response.json()["id"]
+    calls = GET_BY_ID.calls
+    errors = GET_BY_ID.errors
+
+    async with db_connection.pool.acquire() as conn:
+        await db_connection.fetchrow(GET_BY_ID, user_id, connection=conn)
+        # statement из кэша asyncpg на сервере больше не существует
+        await conn.execute("deallocate all")
+        row = await db_connection.fetchrow(GET_BY_ID, user_id, connection=conn)
+
+    assert row.to_entity().email == "stats@example.com"
+    assert GET_BY_ID.calls == calls + 2
+    assert GET_BY_ID.errors == errors
+    assert statements.stats()["users.get_by_id"]["calls"] == GET_BY_ID.calls
+
+
+async def test_statement_is_prepared_once_per_connection_across_pool_leases(client):
+    pool = await db_connection._create_pool(settings.database_host, settings.database_port, 1)
+    try:
+        for _ in range(3):
+            async with pool.acquire() as conn:
+                await db_connection.fetchrow(GET_BY_ID, 1, connection=conn)
+        async with pool.acquire() as conn:
+            prepared = await conn.fetchval(
+                "select count(*) from pg_prepared_statements where statement = $1", GET_BY_ID.sql
+            )
+        assert prepared == 1
+    finally:
+        await pool.close()
@@ -1,5 +1,9 @@
+import asyncio
+
 from httpx import AsyncClient
 
+from src.presentation.api.dependencies import user_loader
+
 
 async def test_create_user_invalid_email(client: AsyncClient):
     user_data = {
@@ -60,6 +64,18 @@ async def test_get_user_not_found(client: AsyncClient):
     assert response.status_code == 404
 
 
+async def test_out_of_range_id_does_not_fail_shared_batch(client: AsyncClient):
+    response = await client.post("/users/", json={"email": "neighbour@example.com", "name": "Neighbour"})
+    user_id = response.json()["id"]
+
+    # id вне int4 попал бы в тот же get_many($1::int[]) и уронил бы пакет с 500
+    good, bad = await asyncio.gather(user_loader.load(user_id), user_loader.load(2**31))
+    assert good.id == user_id and bad is None
+
+    responses = await asyncio.gather(client.get(f"/users/{user_id}"), client.get(f"/users/{2**31}"))
+    assert [r.status_code for r in responses] == [200, 404]
+
+
 async def test_get_all_users(client: AsyncClient):
     response = await client.get("/users/")
     assert response.status_code == 200
@@ -115,3 +131,144 @@ async def test_delete_user_not_found(client: AsyncClient):
     response = await client.delete("/users/999999")
     assert response.status_code == 404
 
+
+
+async def test_get_all_users_cursor_pagination(client: AsyncClient):
+    created_ids = []
+    for i in range(5):
+        response = await client.post("/users/", json={"email": f"page{i}@example.com", "name": f"Page {i}"})
+        created_ids.append(response.json()["id"])
+
+    response = await client.get("/users/", params={"limit": 2})
+    assert response.status_code == 200
+    assert [u["id"] for u in response.json()] == created_ids[:2]
+
+    seen = [u["id"] for u in response.json()]
+    cursor = response.headers.get("x-next-cursor")
+    while cursor:
+        response = await client.get("/users/", params={"limit": 2, "cursor": cursor})
+        assert response.status_code == 200
+        seen.extend(u["id"] for u in response.json())
+        cursor = response.headers.get("x-next-cursor")
+
+    assert seen == created_ids
+
+
+async def test_get_all_users_offset_pagination_still_supported(client: AsyncClient):
+    created_ids = []
+    for i in range(3):
+        response = await client.post("/users/", json={"email": f"offset{i}@example.com", "name": f"Offset {i}"})
+        created_ids.append(response.json()["id"])
+
+    response = await client.get("/users/", params={"limit": 2, "offset": 1})
+    assert response.status_code == 200
+    assert [u["id"] for u in response.json()] == created_ids[1:3]
+
+
+async def test_get_users_by_ids(client: AsyncClient):
+    ids = []
+    for i in range(3):
+        response = await client.post("/users/", json={"email": f"ids{i}@example.com", "name": f"Ids {i}"})
+        ids.append(response.json()["id"])
+
+    response = await client.get("/users/", params={"ids": f"{ids[2]},{ids[0]},999999,{ids[2]}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["found"], body["missing"]) == (2, 1)
+    assert [(r["id"], r["user"] and r["user"]["id"]) for r in body["results"]] == [
+        (ids[2], ids[2]), (ids[0], ids[0]), (999999, None)
+    ]
+    assert body["results"][2]["error"] == "User with id 999999 not found"
+
+    response = await client.get("/users/", params=[("ids", ids[1]), ("ids", ids[0])])
+    assert [r["user"]["id"] for r in response.json()["results"]] == [ids[1], ids[0]]
+
+    for bad in ("1,abc", f"1,{2**31}", "0", "-5"):
+        response = await client.get("/users/", params={"ids": bad})
+        assert response.status_code == 400
+
+
+async def test_user_etag_conditional_get_and_put(client: AsyncClient):
+    response = await client.post("/users/", json={"email": "etag@example.com", "name": "Etag"})
+    user_id = response.json()["id"]
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    response = await client.get(f"/users/{user_id}")
+    assert response.headers["etag"] == etag
+    assert "last-modified" in response.headers
+    response = await client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = await client.put(f"/users/{user_id}", json={"name": "First"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    new_etag = response.headers["etag"]
+    assert new_etag != etag
+
+    # устаревшая версия - 412, строка не меняется
+    response = await client.put(f"/users/{user_id}", json={"name": "Lost"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    response = await client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "First"
+
+    response = await client.put("/users/999999", json={"name": "X"}, headers={"If-Match": etag})
+    assert response.status_code == 404
+    response = await client.put(f"/users/{user_id}", json={"name": "Any"}, headers={"If-Match": "*"})
+    assert response.status_code == 200
+
+    response = await client.get("/users/", params={"limit": 10})
+    list_etag = response.headers["etag"]
+    response = await client.get("/users/", params={"limit": 10}, headers={"If-None-Match": list_etag})
+    assert response.status_code == 304
+    await client.put(f"/users/{user_id}", json={"name": "Changed"})
+    response = await client.get("/users/", params={"limit": 10}, headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+
+
+async def test_get_all_users_invalid_cursor(client: AsyncClient):
+    response = await client.get("/users/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_bulk_create_users_json(client: AsyncClient):
+    await client.post("/users/", json={"email": "taken@example.com", "name": "Taken"})
+    rows = [
+        {"email": "bulk1@example.com", "name": "Bulk 1"},
+        {"email": "invalid-email", "name": "Bad"},
+        {"email": "taken@example.com", "name": "Taken again"},
+        {"email": "bulk1@example.com", "name": "Duplicate in batch"},
+        {"email": "bulk2@example.com", "name": "Bulk 2"},
+    ]
+    response = await client.post("/users/bulk", json=rows)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 3
+    results = data["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]["id"] is not None and results[4]["id"] is not None
+    assert all(results[i]["error"] for i in (1, 2, 3))
+
+    get_response = await client.get(f"/users/{results[4]['id']}")
+    assert get_response.json()["email"] == "bulk2@example.com"
+
+
+async def test_bulk_create_users_csv(client: AsyncClient):
+    body = 'email,name\ncsv1@example.com,"Doe, John"\ncsv2@example.com,"Multi\nLine"\n'
+    response = await client.post("/users/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
+
+    user_id = response.json()["results"][1]["id"]
+    assert (await client.get(f"/users/{user_id}")).json()["name"] == "Multi\nLine"
+
+
+async def test_update_user_email_conflict(client: AsyncClient):
+    await client.post("/users/", json={"email": "first@example.com", "name": "First"})
+    second = await client.post("/users/", json={"email": "second@example.com", "name": "Second"})
+
+    response = await client.put(f"/users/{second.json()['id']}", json={"email": "first@example.com"})
+    assert response.status_code == 409